@@ -1 +1,12 @@
 from .pyreedsolomon import *
+from .numpy_backend import NumpyReedSolomon
+from .stream import encode_stream, decode_stream, iter_encode, iter_decode
+from .files import encode_file, decode_file
+from .aio import AsyncReedSolomon
+from .shards import encode_shards, reconstruct_shards
+from .packing import pack_symbols, unpack_symbols, packed_size
+from .container import write_container, ContainerReader
+from .metrics import Stats, Histogram
+from .procpool import ProcessPool
+from .interleave import Interleaved
+from .simulation import simulate
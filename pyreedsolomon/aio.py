@@ -0,0 +1,126 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : aio.py
+# Description        : asyncio interface with micro-batching of concurrent requests
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+asyncio wrapper around Reed_Solomon
+
+Concurrent requests are gathered for up to max_delay seconds, or until max_batch of them
+are waiting, and then encoded or decoded with a single batched call to the library in an
+executor. The event loop is never blocked by the coding itself.
+"""
+
+import asyncio
+import numpy as np
+
+
+class AsyncReedSolomon(object):
+    def __init__(self,rs,max_batch=256,max_delay=0.0005,executor=None):
+        """
+        rs - Reed_Solomon instance to code with
+        max_batch - a batch is started as soon as this many requests are waiting
+        max_delay - longest time in seconds a request waits for others to join its batch
+        executor - concurrent.futures executor to run the batches on. Defaults to the
+                   default executor of the event loop
+        """
+        self.rs = rs
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.executor = executor
+
+        # requests waiting for a batch, per (operation, number of symbols)
+        self._pending = dict()
+        self._timers = dict()
+
+    async def encode(self,dat):
+        """
+        Encode the provided data, see Reed_Solomon.encode
+        """
+        return await self._submit('encode',dat)
+
+    async def decode(self,dat):
+        """
+        Decode the provided data, see Reed_Solomon.decode
+
+        returns the decoded data and the number of errors or -EBADMSG (-74)
+        """
+        return await self._submit('decode',dat)
+
+    def _submit(self,op,dat):
+        rs = self.rs
+        src = rs._symbols(dat)
+        n_symbols = len(src)
+        if op == 'encode' and n_symbols > rs.message_size:
+            raise ValueError(f'input data size {n_symbols} larger than max allowed {rs.message_size}')
+        if op == 'encode' and n_symbols == 0:
+            raise ValueError('input data is empty, a message needs at least one symbol')
+        if op == 'decode' and not rs.par_size < n_symbols <= rs.total_size:
+            raise ValueError(f'input data size {n_symbols} needs to be between {rs.par_size+1} and {rs.total_size}')
+
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+
+        # only requests of the same length can share a batch
+        key = (op,n_symbols)
+        pending = self._pending.setdefault(key,[])
+        pending.append((dat,src,fut))
+        if len(pending) >= self.max_batch:
+            self._flush(key)
+        elif len(pending) == 1:
+            self._timers[key] = loop.call_later(self.max_delay,self._flush,key)
+
+        return fut
+
+    def _flush(self,key):
+        """
+        Start a batch with the requests waiting for key
+        """
+        timer = self._timers.pop(key,None)
+        if timer is not None:
+            timer.cancel()
+        requests = self._pending.pop(key,None)
+        if not requests:
+            return
+
+        loop = asyncio.get_running_loop()
+        batch = loop.run_in_executor(self.executor,self._run,key,requests)
+        batch.add_done_callback(lambda batch: self._resolve(requests,batch))
+
+    def _run(self,key,requests):
+        """
+        Code one batch, runs in the executor
+        """
+        rs = self.rs
+        op, n_symbols = key
+
+        if op == 'encode':
+            dat = np.empty((len(requests),n_symbols+rs.par_size),dtype=rs.dtype)
+            for row, (_, src, _) in zip(dat,requests):
+                row[:n_symbols] = src
+            rs.encode_batch(dat)
+            return [rs._output(d,row,None) for row, (d, _, _) in zip(dat,requests)]
+
+        dat = np.empty((len(requests),n_symbols),dtype=rs.dtype)
+        for row, (_, src, _) in zip(dat,requests):
+            row[:] = src
+        dat, n_errors = rs.decode_batch(dat)
+        return [(rs._output(d,row[:-rs.par_size],None), int(n))
+                for row, n, (d, _, _) in zip(dat,n_errors,requests)]
+
+    def _resolve(self,requests,batch):
+        """
+        Hand the results of a finished batch to the waiting requests
+        """
+        if batch.cancelled() or batch.exception() is not None:
+            exc = asyncio.CancelledError() if batch.cancelled() else batch.exception()
+            for _, _, fut in requests:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+
+        for res, (_, _, fut) in zip(batch.result(),requests):
+            if not fut.done():
+                fut.set_result(res)
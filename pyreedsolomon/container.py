@@ -0,0 +1,294 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : container.py
+# Description        : Self-describing container with random access to the payload
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Container format for payloads encoded with a Reed_Solomon code, with a block index for
+random access
+
+Layout, all integers little-endian:
+
+  header   HEADER_FORMAT: magic, version, the code parameters, the number of payload bytes
+           per codeword, codewords per block, payload length, number of blocks, the
+           offset of the index and the crc32 of the preceding fields
+  blocks   the codewords of each block, packed as in packing.py
+  index    one INDEX_DTYPE entry per block: its offset in the file, the number of payload
+           bytes it holds and its length in the file. The index is encoded with the same
+           code as the payload
+
+Every codeword carries bytes_per_codeword = message_size * symsize // 8 payload bytes, in its
+packed message symbols. The end of the payload is a shortened codeword. A byte range of the
+payload therefore maps on a range of codewords directly, and read_range decodes only those.
+"""
+
+import struct
+import zlib
+import numpy as np
+
+from .pyreedsolomon import Reed_Solomon
+from .packing import packed_size
+
+MAGIC = b'PYRS'
+VERSION = 1
+HEADER_FORMAT = '<4sHHIHHHIIIIQQQI'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+INDEX_DTYPE = np.dtype([('offset','<u8'),('length','<u4'),('stored','<u4')])
+
+DEFAULT_BLOCK_CODEWORDS = 256 # codewords per block of the index
+
+
+def _layout(rs):
+    """
+    payload bytes per codeword and packed bytes per full codeword
+    """
+    bpc = rs.message_size * rs.symsize // 8
+    if bpc == 0:
+        raise ValueError(f'a message of {rs.message_size} symbols of {rs.symsize} bits holds less than a byte')
+    return bpc, packed_size(rs.total_size,rs.symsize)
+
+
+def _short_symbols(rs,n_bytes):
+    """
+    message symbols of the shortened codeword holding the last n_bytes of the payload
+    """
+    return -(-n_bytes * 8 // rs.symsize)
+
+
+def _read_chunk(reader,n):
+    """
+    Read up to n bytes, less only at the end of the stream
+    """
+    parts = []
+    while n:
+        data = reader.read(n)
+        if not data:
+            break
+        parts.append(data)
+        n -= len(data)
+    return b''.join(parts)
+
+
+def _read_exact(reader,n):
+    data = reader.read(n)
+    if len(data) != n:
+        raise ValueError(f'unexpected end of the container, expected {n} bytes, got {len(data)}')
+    return data
+
+
+def _encode_bytes(rs,chunk):
+    """
+    Codewords carrying the bytes of chunk, the last one shortened if chunk does not fill it
+    """
+    bpc, _ = _layout(rs)
+    chunk = np.frombuffer(chunk,dtype=np.uint8)
+    n_full, rest = divmod(len(chunk),bpc)
+    parts = []
+
+    if n_full:
+        msg = np.zeros((n_full,packed_size(rs.message_size,rs.symsize)),dtype=np.uint8)
+        msg[:,:bpc] = chunk[:n_full*bpc].reshape(n_full,bpc)
+        parts.append(rs.encode_packed(msg,rs.message_size))
+    if rest:
+        n_sym = _short_symbols(rs,rest)
+        last = np.zeros(packed_size(n_sym,rs.symsize),dtype=np.uint8)
+        last[:rest] = chunk[n_full*bpc:]
+        parts.append(rs.encode_packed(last,n_sym))
+    return b''.join(p.tobytes() for p in parts)
+
+
+def _stored_size(rs,n_bytes):
+    """
+    size of the codewords written by _encode_bytes for n_bytes bytes
+    """
+    bpc, cw_bytes = _layout(rs)
+    n_full, rest = divmod(n_bytes,bpc)
+    return n_full * cw_bytes + (packed_size(_short_symbols(rs,rest)+rs.par_size,rs.symsize) if rest else 0)
+
+
+def write_container(rs,writer,data,block_codewords=DEFAULT_BLOCK_CODEWORDS):
+    """
+    Encode data into a container
+
+    input:
+    \trs -- Reed_Solomon instance
+    \twriter -- seekable file-like object opened for writing, the header is written last
+    \tdata -- bytes-like payload, or a file-like object with a read method
+    \tblock_codewords -- number of codewords per entry of the index
+
+    returns the number of payload bytes written
+    """
+
+    bpc, _ = _layout(rs)
+    block_bytes = block_codewords * bpc
+    if not hasattr(data,'read'):
+        data = memoryview(data).cast('B')
+
+    start = writer.tell()
+    writer.write(b'\0' * HEADER_SIZE)
+    index = []
+    length = 0
+
+    while True:
+        if hasattr(data,'read'):
+            chunk = _read_chunk(data,block_bytes)
+        else:
+            chunk = data[length:length+block_bytes]
+        if not len(chunk):
+            break
+        offset = writer.tell() - start
+        writer.write(_encode_bytes(rs,chunk))
+        index.append((offset,len(chunk),writer.tell()-start-offset))
+        length += len(chunk)
+        if len(chunk) < block_bytes:
+            break
+
+    index_offset = writer.tell() - start
+    writer.write(_encode_bytes(rs,np.array(index,dtype=INDEX_DTYPE).tobytes()))
+    end = writer.tell()
+
+    header = struct.pack(HEADER_FORMAT[:-1],MAGIC,VERSION,rs.symsize,rs.gfpoly,rs.fcr,rs.prim,rs.nroots,
+                         rs.message_size,rs.total_size,bpc,block_codewords,length,len(index),index_offset)
+    writer.seek(start)
+    writer.write(header + struct.pack('<I',zlib.crc32(header)))
+    writer.seek(end)
+    return length
+
+
+class ContainerReader(object):
+    """
+    Random access to the payload of a container written by write_container
+
+    The codec is taken from Reed_Solomon.get with the parameters in the header. Use it as a
+    context manager, or call close, when it is opened from a path
+    """
+    def __init__(self,source,backend=None):
+        """
+        source -- path or seekable binary file-like object
+        backend -- 'native' or 'numpy', see Reed_Solomon
+        """
+        if isinstance(source,(str,bytes)) or hasattr(source,'__fspath__'):
+            self._file = open(source,'rb')
+            self._owner = True
+        else:
+            self._file = source
+            self._owner = False
+        self._start = self._file.tell()
+        try:
+            self._read_header(backend)
+        except BaseException:
+            self.close()
+            raise
+
+    def _read_header(self,backend):
+        """
+        Check the header, set up the codec and decode the index
+        """
+        header = _read_exact(self._file,HEADER_SIZE)
+        (magic,version,symsize,gfpoly,fcr,prim,nroots,message_size,total_size,bpc,
+         self.block_codewords,self.length,n_blocks,index_offset,crc) = struct.unpack(HEADER_FORMAT,header)
+        if magic != MAGIC:
+            raise ValueError('not a pyreedsolomon container')
+        if version != VERSION:
+            raise ValueError(f'unsupported container version {version}')
+        if crc != zlib.crc32(header[:-4]):
+            raise ValueError('the header of the container is corrupt')
+
+        self.rs = Reed_Solomon.get(symsize,gfpoly,fcr,prim,nroots,message_size,total_size,backend=backend)
+        self.bytes_per_codeword, self._cw_bytes = _layout(self.rs)
+        if bpc != self.bytes_per_codeword:
+            raise ValueError(f'corrupt header, {bpc} bytes per codeword for RS({total_size},{message_size},{symsize})')
+
+        self.n_corrected = 0
+        self.n_failed = 0
+        index_bytes = n_blocks * INDEX_DTYPE.itemsize
+        self._file.seek(self._start + index_offset)
+        raw = _read_exact(self._file,_stored_size(self.rs,index_bytes))
+        self.index = np.frombuffer(self._decode_bytes(raw,index_bytes,True,'the index'),dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        return self.length
+
+    def close(self):
+        if self._owner:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+    def _decode_bytes(self,raw,n_bytes,strict,what):
+        """
+        Decode codewords written by _encode_bytes for n_bytes bytes
+        """
+        rs, bpc, cw_bytes = self.rs, self.bytes_per_codeword, self._cw_bytes
+        raw = np.frombuffer(raw,dtype=np.uint8)
+        n_full, rest = divmod(n_bytes,bpc)
+        parts = []
+        n_errors = [np.zeros(0,dtype=np.intc)]
+
+        if n_full:
+            msg, n_err = rs.decode_packed(raw[:n_full*cw_bytes].reshape(n_full,cw_bytes),rs.total_size)
+            parts.append(msg[:,:bpc])
+            n_errors.append(n_err)
+        if rest:
+            n_sym = _short_symbols(rs,rest) + rs.par_size
+            msg, n_err = rs.decode_packed(raw[n_full*cw_bytes:].reshape(1,-1),n_sym)
+            parts.append(msg[:,:rest])
+            n_errors.append(n_err)
+
+        n_errors = np.concatenate(n_errors)
+        self.n_corrected += int(n_errors[n_errors > 0].sum())
+        self.n_failed += int(np.count_nonzero(n_errors < 0))
+        if strict and np.any(n_errors < 0):
+            raise ValueError(f'{np.count_nonzero(n_errors < 0)} codewords of {what} could not be decoded')
+        return b''.join(p.tobytes() for p in parts)
+
+    def read_range(self,offset,length,strict=True):
+        """
+        Decode a range of the payload
+
+        input:
+        \toffset -- first payload byte
+        \tlength -- number of bytes, the range is cut off at the end of the payload
+        \tstrict -- raise a ValueError when a codeword can not be corrected. Otherwise its
+        \t          bytes are returned as received, and counted in n_failed
+
+        returns the payload bytes. Only the codewords covering the range are read and decoded,
+        the corrected symbols are added to n_corrected
+        """
+
+        if offset < 0 or length < 0:
+            raise ValueError('offset and length need to be positive')
+        stop = min(offset+length,self.length)
+        if offset >= stop:
+            return b''
+        rs, bpc, B = self.rs, self.bytes_per_codeword, self.block_codewords
+        n_full, rest = divmod(self.length,bpc)
+        first, last = offset // bpc, (stop - 1) // bpc
+
+        parts = []
+        c = first
+        while c <= last:
+            # the codewords up to the end of the range, the block or the full codewords
+            block, pos = divmod(c,B)
+            count = min(last + 1, n_full, (block + 1) * B) - c if c < n_full else 1
+            n_bytes = count * bpc if c < n_full else rest
+            self._file.seek(self._start + int(self.index['offset'][block]) + pos * self._cw_bytes)
+            raw = _read_exact(self._file,_stored_size(rs,n_bytes))
+            parts.append(self._decode_bytes(raw,n_bytes,strict,f'block {block}'))
+            c += count
+
+        payload = b''.join(parts)
+        skip = offset - first * bpc
+        return payload[skip:skip+stop-offset]
+
+    def read(self,strict=True):
+        """
+        Decode the whole payload
+        """
+        return self.read_range(0,self.length,strict)
@@ -0,0 +1,97 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : files.py
+# Description        : In-place encoding and repair of memory-mapped files
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Encode and repair files in place through np.memmap
+
+The file is a sequence of codewords of total_size symbols (numpy.uint8 for symsize <= 8,
+numpy.uint16 in native byte order otherwise), as written by encode_stream. A trailing
+codeword shorter than total_size is treated as a shortened codeword.
+
+The file is mapped one block of batch_size codewords at a time and each block is unmapped
+after it has been processed, so the memory use does not grow with the size of the file.
+"""
+
+import os
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 65536 # codewords per mapped block
+
+
+def _blocks(rs,path,batch_size,mode):
+    """
+    Generator over memory-mapped blocks of the file, of shape (rows, total_size). The last
+    block holds the shortened codeword at the end of the file, if any
+    """
+    itemsize = np.dtype(rs.dtype).itemsize
+    n_symbols, rem = divmod(os.path.getsize(path),itemsize)
+    if rem:
+        raise ValueError(f'the size of {path} is not a multiple of the symbol size ({itemsize} bytes)')
+
+    n_full, rest = divmod(n_symbols,rs.total_size)
+    if 0 < rest <= rs.par_size:
+        raise ValueError(f'{path} ends with a truncated codeword of {rest} symbols')
+
+    row_bytes = rs.total_size * itemsize
+    for start in range(0,n_full,batch_size):
+        rows = min(batch_size,n_full-start)
+        block = np.memmap(path,dtype=rs.dtype,mode=mode,offset=start*row_bytes,shape=(rows,rs.total_size))
+        yield block
+        block.flush()
+        del block
+
+    if rest:
+        block = np.memmap(path,dtype=rs.dtype,mode=mode,offset=n_full*row_bytes,shape=(1,rest))
+        yield block
+        block.flush()
+        del block
+
+
+def encode_file(rs,path,batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Compute the parity of every codeword in the file in place
+
+    The message symbols of each codeword need to be in place already, the parity symbols
+    at the end of each codeword are overwritten
+
+    returns the number of codewords encoded
+    """
+
+    n_codewords = 0
+    for block in _blocks(rs,path,batch_size,'r+'):
+        rs.encode_batch(block)
+        n_codewords += len(block)
+    return n_codewords
+
+
+def decode_file(rs,path,batch_size=DEFAULT_BATCH_SIZE,repair=True):
+    """
+    Decode every codeword in the file and correct the errors in place. The parity of the
+    corrected codewords is rewritten as well
+
+    input:
+    \trs -- Reed_Solomon instance
+    \tpath -- file to repair
+    \tbatch_size -- number of codewords per mapped block
+    \trepair -- when False, the file is mapped copy-on-write and only the counts are reported
+
+    returns:
+    \tn_corrected -- array with the number of corrected symbols in each block
+    \tn_failed -- array with the number of codewords in each block that could not be corrected
+    """
+
+    n_corrected = []
+    n_failed = []
+    for block in _blocks(rs,path,batch_size,'r+' if repair else 'c'):
+        _, n_errors = rs.decode_batch(block)
+        # the decoder only corrects the message, so recompute the parity of the repaired codewords
+        fixed = n_errors > 0
+        if repair and fixed.any():
+            block[fixed] = rs.encode_batch(block[fixed])
+        n_corrected.append(n_errors[n_errors > 0].sum())
+        n_failed.append(np.count_nonzero(n_errors < 0))
+    return np.array(n_corrected,dtype=np.int64), np.array(n_failed,dtype=np.int64)
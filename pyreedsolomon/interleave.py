@@ -0,0 +1,109 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : interleave.py
+# Description        : Symbol interleaved frames of several codewords
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Symbol interleaving over Reed_Solomon, against burst errors
+
+A frame of depth I holds I codewords, with symbol k of codeword i at position k * I + i. A
+burst of b symbols in the frame then costs every codeword at most ceil(b / I) symbols, so
+bursts up to I * par_size // 2 symbols are corrected where a single codeword takes
+par_size // 2. The messages fill the first I * msg_len symbols of the frame and the parity
+the rest.
+
+The codewords are a strided view on the frame, which the library codes in place: rows
+start one symbol apart and their symbols are I symbols apart. No transposed copy of the
+frame is made.
+"""
+
+import numpy as np
+
+
+class Interleaved(object):
+    def __init__(self,rs,depth):
+        """
+        rs - Reed_Solomon instance to code the codewords with
+        depth - number of interleaved codewords in a frame
+        """
+        if depth < 1:
+            raise ValueError(f'the depth needs to be at least 1, got {depth}')
+        self.rs = rs
+        self.depth = depth
+        self.frame_size = depth * rs.total_size
+        self.message_size = depth * rs.message_size
+
+    def codewords(self,frame):
+        """
+        View of a frame as its codewords
+
+        input:
+        \tframe -- 1-D numpy array, or writable buffer, of depth * n symbols with
+        \t         par_size < n <= total_size, shorter frames holding shortened codewords
+
+        returns:
+        \tdat -- numpy array of shape (depth, n) on the memory of frame, with a codeword per row
+        """
+        rs = self.rs
+        if not isinstance(frame,np.ndarray):
+            frame = np.frombuffer(frame,dtype=rs.dtype)
+        if frame.ndim != 1 or len(frame) % self.depth or not rs.par_size < len(frame) // self.depth <= rs.total_size:
+            raise ValueError(f'expected a 1-D frame of {self.frame_size} symbols, or depth * n with '
+                             f'{rs.par_size} < n < {rs.total_size} for shortened codewords')
+        return frame.reshape(-1,self.depth).T
+
+    def _erasures(self,erasures,n_frame):
+        """
+        Erasure positions in the frame as a padded array of positions in each codeword
+        """
+        pos = np.asarray(erasures,dtype=np.intp).ravel()
+        if len(pos) and (pos.min() < 0 or pos.max() >= n_frame):
+            raise ValueError(f'erasure positions need to be between 0 and {n_frame - 1}')
+        rows = pos % self.depth
+        counts = np.bincount(rows,minlength=self.depth)
+        eras = np.full((self.depth,max(counts.max(),1)),-1,dtype=np.intc)
+
+        # rank of each position among those of its codeword
+        order = np.argsort(rows,kind='stable')
+        rank = np.arange(len(pos)) - np.repeat(np.cumsum(counts) - counts,counts)
+        eras[rows[order],rank] = pos[order] // self.depth
+        return eras
+
+    def encode(self,frame):
+        """
+        Encode all codewords of a frame in place with a single call to the library
+
+        input:
+        \tframe -- frame with the messages in its first depth * msg_len symbols, see codewords
+
+        returns:
+        \tframe -- the same frame with the interleaved parity in its last depth * par_size symbols
+        """
+        self.rs.encode_batch(self.codewords(frame))
+        return frame
+
+    def decode(self,frame,erasures=None):
+        """
+        Decode all codewords of a frame in place with a single call to the library
+
+        input:
+        \tframe -- frame as returned by encode, see codewords
+        \terasures -- optional sequence of erased positions in the frame
+
+        returns:
+        \tframe -- the same frame with the errors corrected
+        \tn_errors -- int array with the number of symbol errors in each codeword or -EBADMSG
+        \t            (-74) if decoding that codeword failed
+        """
+        dat = self.codewords(frame)
+        if erasures is not None:
+            erasures = self._erasures(erasures,dat.size)
+        return frame, self.rs.decode_batch(dat,erasures)[1]
+
+    def check(self,frame):
+        """
+        returns a boolean array which is True for the codewords of the frame without errors
+        """
+        return self.rs.check_batch(self.codewords(frame))
@@ -0,0 +1,152 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : metrics.py
+# Description        : Opt-in counters and latency histograms of a codec
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Runtime statistics of a Reed_Solomon instance, see Reed_Solomon.enable_stats and stats
+
+While enabled, encode_fast, decode_fast, encode_batch and decode_batch of the instance are
+replaced by wrappers that time each call and count what it did. Everything built on top of
+them (encode, decode, the packed and parallel calls, streams, shards, ...) is counted
+through them. Disabling removes the wrappers again, so a codec without statistics runs the
+plain methods of its class and pays nothing.
+
+Latencies are kept per call in histograms with power of two buckets: bucket i counts the
+calls that took less than LATENCY_BOUNDS_NS[i] ns and at least the previous bound. The last
+bucket holds everything slower.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+N_BUCKETS = 32
+LATENCY_BOUNDS_NS = tuple(1 << (i + 8) for i in range(N_BUCKETS - 1)) + (float('inf'),)
+
+Histogram = namedtuple('Histogram',['counts','total_ns'])
+Stats = namedtuple('Stats',['encoded','decoded','corrected','failed','bytes_encoded','bytes_decoded',
+                            'encode_latency','decode_latency'])
+
+
+def percentile(hist,q):
+    """
+    Upper bound in ns of the bucket holding the q-th percentile (0 to 100) of a Histogram
+    """
+    total = sum(hist.counts)
+    if total == 0:
+        return 0
+    rank = q / 100 * total
+    seen = 0
+    for bound, count in zip(LATENCY_BOUNDS_NS,hist.counts):
+        seen += count
+        if seen >= rank:
+            return bound
+    return LATENCY_BOUNDS_NS[-1]
+
+
+def _bucket(ns):
+    return min(max(ns.bit_length() - 8,0),N_BUCKETS - 1)
+
+
+class CodecStats(object):
+    """
+    Counters of a single codec. Calls from several threads are serialized with a lock
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.encoded = self.decoded = 0
+        self.corrected = self.failed = 0
+        self.bytes_encoded = self.bytes_decoded = 0
+        self.encode_counts = [0] * N_BUCKETS
+        self.decode_counts = [0] * N_BUCKETS
+        self.encode_ns = self.decode_ns = 0
+
+    def record_encode(self,n_codewords,n_bytes,ns):
+        with self._lock:
+            self.encoded += n_codewords
+            self.bytes_encoded += n_bytes
+            self.encode_counts[_bucket(ns)] += 1
+            self.encode_ns += ns
+
+    def record_decode(self,n_codewords,n_bytes,ns,n_errors):
+        """
+        n_errors is the result of the decoder, an int or an array for a batch
+        """
+        if isinstance(n_errors,np.ndarray):
+            corrected = int(n_errors[n_errors > 0].sum())
+            failed = int(np.count_nonzero(n_errors < 0))
+        else:
+            corrected = max(n_errors,0)
+            failed = int(n_errors < 0)
+        with self._lock:
+            self.decoded += n_codewords
+            self.bytes_decoded += n_bytes
+            self.corrected += corrected
+            self.failed += failed
+            self.decode_counts[_bucket(ns)] += 1
+            self.decode_ns += ns
+
+    def snapshot(self,reset=False):
+        """
+        returns the counters as a Stats tuple, and clears them when reset is True
+        """
+        with self._lock:
+            stats = Stats(self.encoded,self.decoded,self.corrected,self.failed,
+                          self.bytes_encoded,self.bytes_decoded,
+                          Histogram(tuple(self.encode_counts),self.encode_ns),
+                          Histogram(tuple(self.decode_counts),self.decode_ns))
+            if reset:
+                self._reset()
+        return stats
+
+
+def instrument(rs,stats):
+    """
+    Wrap the coding methods of the instance rs to record into stats
+    """
+    encode_fast, decode_fast = type(rs).encode_fast.__get__(rs), type(rs).decode_fast.__get__(rs)
+    encode_batch, decode_batch = type(rs).encode_batch.__get__(rs), type(rs).decode_batch.__get__(rs)
+    clock = time.perf_counter_ns
+
+    def timed_encode_fast(dat):
+        t0 = clock()
+        res = encode_fast(dat)
+        stats.record_encode(1,dat.nbytes,clock()-t0)
+        return res
+
+    def timed_decode_fast(dat,*args,**kwargs):
+        t0 = clock()
+        res = decode_fast(dat,*args,**kwargs)
+        stats.record_decode(1,dat.nbytes,clock()-t0,res[1])
+        return res
+
+    def timed_encode_batch(dat):
+        t0 = clock()
+        res = encode_batch(dat)
+        stats.record_encode(len(dat),dat.nbytes,clock()-t0)
+        return res
+
+    def timed_decode_batch(dat,*args,**kwargs):
+        t0 = clock()
+        res = decode_batch(dat,*args,**kwargs)
+        stats.record_decode(len(dat),dat.nbytes,clock()-t0,res[1])
+        return res
+
+    rs.encode_fast, rs.decode_fast = timed_encode_fast, timed_decode_fast
+    rs.encode_batch, rs.decode_batch = timed_encode_batch, timed_decode_batch
+
+
+def uninstrument(rs):
+    """
+    Remove the wrappers of instrument, restoring the methods of the class
+    """
+    for name in ('encode_fast','decode_fast','encode_batch','decode_batch'):
+        rs.__dict__.pop(name,None)
@@ -0,0 +1,332 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : numpy_backend.py
+# Description        : Pure numpy implementation of the Reed_Solomon codec
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Reed_Solomon codec in numpy, for when the native library is not available
+
+The Galois field arithmetic is done with log/antilog table lookups, vectorized over all
+codewords of a batch: encoding and the syndromes are a table based matrix product, and
+the Berlekamp-Massey, Chien search and Forney steps of the decoder process all codewords
+with errors at once. The algorithm follows the kernel library step by step, so the
+results, including the corrections reported for failed or shortened codewords, are
+bit-exact with the native backend.
+
+It is selected with Reed_Solomon(...,backend='numpy') or PYREEDSOLOMON_BACKEND=numpy,
+and automatically when the native extension is missing.
+"""
+
+import numpy as np
+
+from .pyreedsolomon import Reed_Solomon, EBADMSG
+from . import tablecache
+
+_CHUNK = 1 << 20 # number of elements of the temporaries of a table based matrix product
+
+
+def _field_tables(symsize,gfpoly):
+    """
+    alpha_to and index_of of the field as init_rs builds them, as an array of 2 rows
+    """
+    nn = (1 << symsize) - 1
+    # kernel style tables: index_of[0] = nn and alpha_to[nn] = 0 represent zero
+    tables = np.zeros((2,nn+1),dtype=np.int64)
+    alpha_to, index_of = tables
+    index_of[0] = nn
+    sr = 1
+    for i in range(nn):
+        index_of[sr] = i
+        alpha_to[i] = sr
+        sr <<= 1
+        if sr & (1 << symsize):
+            sr ^= gfpoly
+        sr &= nn
+    if sr != 1:
+        raise ValueError(f'gfpoly {gfpoly:#x} is not a primitive polynomial of degree {symsize}')
+    return tables
+
+
+class _Tables(object):
+    """
+    Log/antilog tables of the field, built as init_rs does, and the parity of a message
+    with a single 1 at each position. Shared by the numpy backend and Reed_Solomon.update_parity
+
+    The tables are kept in the cache of tablecache.py, keyed by the field and the code
+    """
+    def __init__(self,symsize,gfpoly,fcr,prim,nroots,message_size):
+        nn = (1 << symsize) - 1
+        self.nn = nn
+        self.field_key = f'gf{symsize}_{gfpoly:x}'
+        self.code_key = f'rs{symsize}_{gfpoly:x}_{fcr}_{prim}_{nroots}'
+
+        field = tablecache.load(self.field_key,'field',2,lambda n: _field_tables(symsize,gfpoly))
+        alpha_to, index_of = self.alpha_to, self.index_of = field
+
+        iprim = 1
+        while iprim % prim:
+            iprim += nn
+        self.iprim = iprim // prim
+
+        # for vectorized products: zero has log 2*nn, and exp is zero for every sum involving it
+        def build_log(n):
+            log = index_of.astype(np.int32)
+            log[0] = 2 * nn
+            return log
+        self.log = tablecache.load(self.field_key,'log',nn+1,build_log)
+
+        def build_exp(n):
+            exp = np.zeros(4*nn+1,dtype=np.uint16)
+            exp[:2*nn-1] = alpha_to[np.arange(2*nn-1) % nn]
+            return exp
+        self.exp = tablecache.load(self.field_key,'exp',4*nn+1,build_exp)
+
+        # parity of a message with a single 1 at each distance from its end, by running the
+        # encoder register. The row of message position p is distance message_size - 1 - p
+        def build_gen(n_rows):
+            genpoly = self._genpoly(fcr,prim,nroots)
+            taps = genpoly[nroots-1:0:-1]
+            gen = np.zeros((n_rows,nroots),dtype=np.int64)
+            par = np.zeros(nroots,dtype=np.int64)
+            feed = 1
+            for d in range(n_rows):
+                fb = index_of[feed ^ par[0]]
+                feed = 0
+                if fb != nn:
+                    par[1:] ^= alpha_to[(fb + taps) % nn]
+                par[:-1] = par[1:]
+                par[-1] = alpha_to[(fb + genpoly[0]) % nn] if fb != nn else 0
+                gen[d] = par
+            return self.log[gen]
+        self.gen_log = tablecache.load(self.code_key,'gen_log',message_size,build_gen)[message_size-1::-1]
+
+    def _genpoly(self,fcr,prim,nroots):
+        """
+        generator polynomial in index form
+        """
+        alpha_to, index_of, nn = self.alpha_to, self.index_of, self.nn
+        genpoly = [1] + [0] * nroots
+        for i in range(nroots):
+            root = (fcr + i) * prim
+            genpoly[i+1] = 1
+            for j in range(i,0,-1):
+                if genpoly[j]:
+                    genpoly[j] = genpoly[j-1] ^ int(alpha_to[(index_of[genpoly[j]] + root) % nn])
+                else:
+                    genpoly[j] = genpoly[j-1]
+            genpoly[0] = int(alpha_to[(index_of[genpoly[0]] + root) % nn])
+        return index_of[genpoly]
+
+
+class NumpyReedSolomon(Reed_Solomon):
+    """
+    Reed_Solomon with the codec implemented in numpy. See Reed_Solomon for the interface
+    """
+    backend = 'numpy'
+
+    def _init_codec(self,gfpoly,fcr,prim,nroots):
+        """
+        Build the tables of the field and the code, as init_rs does
+        """
+        t = self._tables = _Tables(self.symsize,gfpoly,fcr,prim,nroots,self.message_size)
+        nn = t.nn
+        self._nn, self._fcr, self._prim, self._nroots = nn, fcr, prim, nroots
+        self._alpha_to, self._index_of, self._iprim = t.alpha_to, t.index_of, t.iprim
+        self._log, self._exp, self._gen_log = t.log, t.exp, t.gen_log
+
+        # syndrome i of a codeword gets the symbol at distance d from its end times
+        # alpha^((fcr+i)*prim*d)
+        def build_syn(n_rows):
+            roots = (fcr + np.arange(nroots,dtype=np.int64)) * prim % nn
+            return (np.arange(n_rows,dtype=np.int64)[:,None] * roots % nn).astype(np.int32)
+        self._syn_log = tablecache.load(t.code_key,'syn_log',self.total_size,build_syn)[self.total_size-1::-1]
+
+        # Chien search: lambda_j times alpha^(j*i) for i = 1 .. nn
+        def build_chien(n_rows):
+            return (np.arange(nroots+1,dtype=np.int64)[:,None] * np.arange(1,nn+1) % nn).astype(np.int32)
+        self._chien_log = tablecache.load(t.code_key,'chien_log',nroots+1,build_chien)
+
+    def _xor_matmul(self,log_a,log_b):
+        """
+        Product of two matrices over the field, given the log of their elements
+        """
+        n, k = log_a.shape
+        m = log_b.shape[1]
+        out = np.empty((n,m),dtype=np.uint16)
+        step = max(1,_CHUNK // max(1,k*m))
+        for s in range(0,n,step):
+            np.bitwise_xor.reduce(self._exp[log_a[s:s+step,:,None] + log_b],axis=1,out=out[s:s+step])
+        return out
+
+    def _mul(self,a,b):
+        return self._exp[self._log[a] + self._log[b]]
+
+    def _field_matmul(self,src,coef,out):
+        out[:] = self._xor_matmul(self._log[src.T & self._nn],self._log[coef]).T
+        return out
+
+    def _parity(self,dat,msg_len):
+        return self._xor_matmul(self._log[dat[:,:msg_len] & self._nn],self._gen_log[self.message_size-msg_len:])
+
+    def _decode_rows(self,dat,msg_len,eras=None,no_eras=None):
+        """
+        Decode the rows of dat in place, as decode_rs for each row
+
+        returns:
+        \tn_errors -- number of errors or -EBADMSG for each row
+        \t(offsets, positions, values) -- the corrections in the form of decode_batch
+        """
+        nn, nroots, prim = self._nn, self._nroots, self._prim
+        pad = nn - nroots - msg_len
+        n_errors = np.zeros(len(dat),dtype=np.intc)
+        if no_eras is None:
+            no_eras = np.zeros(len(dat),dtype=np.intc)
+
+        syn = self._xor_matmul(self._log[dat & nn],self._syn_log[self.total_size-dat.shape[1]:])
+        n_errors[no_eras > nroots] = -EBADMSG
+        todo = np.flatnonzero(syn.any(axis=1) & (no_eras <= nroots))
+
+        s = syn[todo]
+        k = no_eras[todo].astype(np.int64)
+        n_rows = len(todo)
+
+        # erasure locator polynomial
+        lam = np.zeros((n_rows,nroots+1),dtype=np.uint16)
+        lam[:,0] = 1
+        if eras is not None and n_rows:
+            u = prim * (nn - 1 - (eras[todo].astype(np.int64) + pad)) % nn
+            for i in range(min(eras.shape[1],nroots)):
+                term = self._exp[self._log[lam[:,:i+1]] + u[:,i,None]]
+                lam[:,1:i+2] ^= np.where((i < k)[:,None],term,0).astype(np.uint16)
+
+        # Berlekamp-Massey, starting after the erasures of each row
+        b = lam.copy()
+        el = k.copy()
+        for r in range(1,nroots+1):
+            act = r > k
+            discr = np.bitwise_xor.reduce(self._mul(lam[:,:r],s[:,r-1::-1]),axis=1)
+            nz = act & (discr != 0)
+            t = lam.copy()
+            t[:,1:] ^= self._mul(discr[:,None],b[:,:-1])
+            swap = nz & (2 * el <= r + k - 1)
+            inv = self._exp[(nn - self._log[discr]) % nn]
+            b_new = self._exp[self._log[lam] + self._log[inv][:,None]]
+            b_shift = np.zeros_like(b)
+            b_shift[:,1:] = b[:,:-1]
+            b = np.where(swap[:,None],b_new,np.where(act[:,None],b_shift,b))
+            el = np.where(swap,r + k - el,el)
+            lam = np.where(nz[:,None],t,lam)
+
+        deg = nroots - np.argmax(lam[:,::-1] != 0,axis=1)
+
+        # Chien search over all nn positions, the roots give the error locations
+        width = int(deg.max(initial=0)) + 1
+        is_root = self._xor_matmul(self._log[lam[:,:width]],self._chien_log[:width]) == 0
+        count = np.count_nonzero(is_root,axis=1)
+        ok = count == deg
+        n_errors[todo] = np.where(ok,count,-EBADMSG)
+
+        # Forney algorithm for the rows that decoded
+        omega = np.zeros((n_rows,nroots),dtype=np.uint16)
+        for j in range(nroots):
+            omega[:,j:] ^= self._mul(s[:,:nroots-j],lam[:,j,None])
+        omega[np.arange(nroots) >= deg[:,None]] = 0
+
+        row, col = np.nonzero(is_root & ok[:,None])
+        root = col.astype(np.int64) + 1
+        loc = (root * self._iprim - 1) % nn
+        ipow = (np.arange(nroots) * root[:,None] % nn).astype(np.int32)
+        num1 = np.bitwise_xor.reduce(self._exp[self._log[omega[row]] + ipow],axis=1)
+        odd = np.arange(1,nroots+1,2)
+        den = np.bitwise_xor.reduce(self._exp[self._log[lam[row][:,odd]] + ipow[:,odd-1]],axis=1)
+        num2 = root * (self._fcr - 1) % nn
+        index_of = self._index_of
+        cor = self._alpha_to[(index_of[num1] + num2 + nn - index_of[den]) % nn]
+        cor = np.where((num1 != 0) & (loc >= pad),cor,0).astype(np.uint16)
+
+        # only the message is corrected, errors in the parity are only reported
+        pos = (loc - pad).astype(np.intc)
+        fix = (cor != 0) & (pos < msg_len)
+        dat[todo[row[fix]],pos[fix]] ^= cor[fix].astype(dat.dtype)
+
+        offsets = np.zeros(len(dat)+1,dtype=np.intc)
+        np.cumsum(np.maximum(n_errors,0),out=offsets[1:])
+        return n_errors, (offsets, pos, cor)
+
+    def encode_fast(self,dat):
+        """
+        Fast encoding algorithm, see Reed_Solomon.encode_fast
+        """
+        if not self.par_size < len(dat) <= self.total_size:
+            raise ValueError(f'codeword length {len(dat)} needs to be between {self.par_size+1} and {self.total_size}')
+        rows = dat[None]
+        msg_len = len(dat) - self.par_size
+        rows[:,msg_len:] = self._parity(rows,msg_len)
+        return dat
+
+    def decode_fast(self,dat,erasures=None,err_pos=None,err_val=None):
+        """
+        Decode a single codeword in place, see Reed_Solomon.decode_fast
+        """
+        if err_pos is not None:
+            if err_val is None or len(err_pos) < self.par_size or len(err_val) < self.par_size:
+                raise ValueError(f'err_pos and err_val need to hold at least {self.par_size} entries')
+            if err_pos.dtype != np.intc or err_val.dtype != np.uint16:
+                raise ValueError('err_pos and err_val need dtype numpy.intc and numpy.uint16')
+
+        eras = no_eras = None
+        if erasures is not None:
+            eras, no_eras = self._erasure_array([erasures],len(dat))
+
+        n_errors, (_, positions, values) = self._decode_rows(dat[None],len(dat)-self.par_size,eras,no_eras)
+        n_errors = int(n_errors[0])
+
+        if err_pos is not None:
+            err_val[:] = 0
+            err_pos[:len(positions)] = positions
+            err_val[:len(values)] = values
+        return dat, n_errors
+
+    def encode_batch(self,dat):
+        """
+        Encode many codewords at once, see Reed_Solomon.encode_batch
+        """
+        msg_len = self._check_batch(dat)
+        if len(dat):
+            dat[:,msg_len:] = self._parity(dat,msg_len)
+        return dat
+
+    def decode_batch(self,dat,erasures=None,corrections=False):
+        """
+        Decode many codewords in place at once, see Reed_Solomon.decode_batch
+        """
+        msg_len = self._check_batch(dat)
+
+        eras = no_eras = None
+        if erasures is not None:
+            eras, no_eras = self._erasure_array(erasures,dat.shape[1])
+            if len(eras) != len(dat):
+                raise ValueError(f'expected erasures for {len(dat)} codewords, got {len(eras)}')
+
+        n_errors, corr = self._decode_rows(dat,msg_len,eras,no_eras)
+        if corrections:
+            return dat, n_errors, corr
+        return dat, n_errors
+
+    def check(self,dat):
+        """
+        Check whether a codeword is free of errors, see Reed_Solomon.check
+        """
+        msg_len = len(dat) - self.par_size
+        return bool(np.all(self._parity(dat[None],msg_len) == dat[msg_len:]))
+
+    def check_batch(self,dat):
+        """
+        Check many codewords for errors, see Reed_Solomon.check_batch
+        """
+        msg_len = self._check_batch(dat)
+        if len(dat) == 0:
+            return np.zeros(0,dtype=np.bool_)
+        return np.all(self._parity(dat,msg_len) == dat[:,msg_len:],axis=1)
@@ -0,0 +1,123 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : packing.py
+# Description        : Conversion between symbols and bit-packed byte streams
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Pack symbols of symsize bits into a contiguous bitstream and back
+
+The bitstream is big-endian: the first symbol starts at the most significant bit of the
+first byte and every symbol is written most significant bit first. The bits after the last
+symbol in the last byte are zero.
+
+Symbols are processed in groups that fill a whole number of bytes, lcm(symsize, 8) bits,
+as 64 bit integers. Groups longer than 64 bits (symsize 9, 11, 13, 15) go through
+numpy.packbits/unpackbits. Both work on the last axis, so a 2-D array packs one frame per row.
+"""
+
+import math
+import numpy as np
+
+
+def _group(symsize):
+    """
+    bits per group, and the shifts of the symbols within a group
+    """
+    if not 1 <= symsize <= 16:
+        raise ValueError(f'symsize needs to be between 1 and 16, got {symsize}')
+    bits = symsize * 8 // math.gcd(symsize,8)
+    shifts = np.arange(bits-symsize,-1,-symsize,dtype=np.uint64)
+    return bits, shifts
+
+
+def packed_size(n_symbols,symsize):
+    """
+    number of bytes of n_symbols packed symbols
+    """
+    return (n_symbols * symsize + 7) // 8
+
+
+def pack_symbols(symbols,symsize):
+    """
+    Pack symbols into a bitstream
+
+    input:
+    \tsymbols -- numpy array or list of symbols. The bits above symsize are ignored. For a 2-D
+    \t           array each row is packed separately
+    \tsymsize -- bits per symbol
+
+    returns:
+    \tpacked -- numpy uint8 array of packed_size(n_symbols, symsize) bytes (per row)
+    """
+
+    symbols = np.asarray(symbols)
+    lead, n = symbols.shape[:-1], symbols.shape[-1]
+    n_bytes = packed_size(n,symsize)
+    bits, shifts = _group(symsize)
+    mask = (1 << symsize) - 1
+
+    if symsize == 8:
+        return symbols.astype(np.uint8)
+
+    if bits > 64:
+        bit_index = np.arange(symsize-1,-1,-1,dtype=np.uint16)
+        sym_bits = ((symbols[...,None].astype(np.uint16) >> bit_index) & 1).astype(np.uint8)
+        return np.packbits(sym_bits.reshape(lead+(n*symsize,)),axis=-1)
+
+    per = len(shifts)
+    n_groups = -(-n // per)
+    groups = np.zeros(lead+(n_groups*per,),dtype=np.uint64)
+    groups[...,:n] = symbols & mask
+    groups = np.bitwise_or.reduce(groups.reshape(lead+(n_groups,per)) << shifts,axis=-1)
+
+    # big-endian 64 bit words, of which the last bits // 8 bytes hold the group
+    words = groups.astype('>u8').view(np.uint8).reshape(lead+(n_groups,8))
+    return words[...,8-bits//8:].reshape(lead+(-1,))[...,:n_bytes].copy()
+
+
+def unpack_symbols(packed,symsize,n_symbols=None):
+    """
+    Unpack symbols from a bitstream
+
+    input:
+    \tpacked -- numpy uint8 array or buffer (bytes, bytearray, memoryview, ...). For a 2-D array
+    \t          each row is unpacked separately
+    \tsymsize -- bits per symbol
+    \tn_symbols -- number of symbols to read, by default as many as fit
+
+    returns:
+    \tsymbols -- numpy array of uint8 for symsize <= 8, uint16 otherwise
+    """
+
+    if not isinstance(packed,np.ndarray):
+        packed = np.frombuffer(packed,dtype=np.uint8)
+    lead, n_bytes = packed.shape[:-1], packed.shape[-1]
+    bits, shifts = _group(symsize)
+    if n_symbols is None:
+        n_symbols = n_bytes * 8 // symsize
+    if packed_size(n_symbols,symsize) > n_bytes:
+        raise ValueError(f'{n_symbols} symbols of {symsize} bits need {packed_size(n_symbols,symsize)} bytes, got {n_bytes}')
+    dtype = np.uint16 if symsize > 8 else np.uint8
+
+    if symsize == 8:
+        return packed[...,:n_symbols].astype(np.uint8)
+
+    if bits > 64:
+        sym_bits = np.unpackbits(packed,axis=-1,count=n_symbols*symsize).reshape(lead+(n_symbols,symsize))
+        weights = 1 << np.arange(symsize-1,-1,-1,dtype=np.uint16)
+        return (sym_bits @ weights).astype(dtype)
+
+    per = len(shifts)
+    n_groups = -(-n_symbols // per)
+    g_bytes = bits // 8
+    words = np.zeros(lead+(n_groups,8),dtype=np.uint8)
+    take = min(n_bytes,n_groups*g_bytes)
+    stream = np.zeros(lead+(n_groups*g_bytes,),dtype=np.uint8)
+    stream[...,:take] = packed[...,:take]
+    words[...,8-g_bytes:] = stream.reshape(lead+(n_groups,g_bytes))
+    groups = words.view('>u8')[...,0]
+
+    symbols = (groups[...,None] >> shifts) & np.uint64((1 << symsize) - 1)
+    return symbols.reshape(lead+(n_groups*per,))[...,:n_symbols].astype(dtype)
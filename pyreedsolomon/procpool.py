@@ -0,0 +1,219 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : procpool.py
+# Description        : Batches coded in a pool of processes over shared memory
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Process pool for Reed_Solomon, for the work that a thread pool can not spread over cores
+
+The library releases the GIL, so parallel_encode/parallel_decode already scale batches of
+the native backend over threads. Python-level work does not: the conversion of lists and
+bytes in encode/decode, and the numpy backend. ProcessPool runs those in worker processes.
+
+The codec is sent to every worker once, pickled by its parameters (see
+Reed_Solomon.__reduce__). Batches live in multiprocessing.shared_memory: each worker
+attaches to the segment and codes its rows in place, so the codewords are never pickled.
+Arrays from ProcessPool.array are shared already. Other arrays are copied into a temporary
+segment and back.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_worker_rs = None # the codec of a worker process
+
+
+def _init_worker(rs):
+    global _worker_rs
+    _worker_rs = rs
+
+
+def _attach(name,shape,dtype,offset,strides):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape,dtype=dtype,buffer=shm.buf,offset=offset,strides=strides)
+
+
+def _run_batch(op,name,shape,dtype,offset,strides,erasures):
+    """
+    Code rows of a shared array in place in a worker, returns n_errors for decoding
+    """
+    shm, dat = _attach(name,shape,dtype,offset,strides)
+    try:
+        if op == 'encode':
+            _worker_rs.encode_batch(dat)
+            return None
+        return _worker_rs.decode_batch(dat,erasures)[1]
+    finally:
+        del dat
+        shm.close()
+
+
+def _run_map(op,items):
+    """
+    encode or decode a list of inputs in a worker
+    """
+    if op == 'encode':
+        return [_worker_rs.encode(d) for d in items]
+    return [_worker_rs.decode(d) for d in items]
+
+
+class ProcessPool(object):
+    """
+    Pool of worker processes for a Reed_Solomon codec. Use it as a context manager, or call
+    close, to stop the workers and release the shared memory
+    """
+    def __init__(self,rs,n_workers=None,mp_context=None):
+        """
+        rs -- Reed_Solomon instance to code with
+        n_workers -- number of processes, defaults to the number of cpus
+        mp_context -- optional multiprocessing context to start the workers with
+        """
+        self.rs = rs
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(self.n_workers,mp_context=mp_context,
+                                             initializer=_init_worker,initargs=(rs,))
+        self._segments = []
+
+    def close(self):
+        self._executor.shutdown()
+        for shm in self._segments:
+            self._release(shm)
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+    @staticmethod
+    def _release(shm):
+        try:
+            shm.close()
+        except BufferError:
+            pass # arrays on the segment are still around, the mapping goes with them
+        shm.unlink()
+
+    def array(self,n_codewords,n_symbols=None):
+        """
+        Allocate a batch in shared memory
+
+        input:
+        \tn_codewords -- number of rows
+        \tn_symbols -- symbols per row, defaults to total_size
+
+        returns:
+        \tdat -- zeroed numpy array of shape (n_codewords, n_symbols) and the dtype of the
+        \t       codec. It can be handed to encode_batch/decode_batch, also sliced by rows, without
+        \t       being copied. It stays valid until the pool is closed
+        """
+        if n_symbols is None:
+            n_symbols = self.rs.total_size
+        nbytes = n_codewords * n_symbols * np.dtype(self.rs.dtype).itemsize
+        shm = shared_memory.SharedMemory(create=True,size=max(nbytes,1))
+        self._segments.append(shm)
+        dat = np.ndarray((n_codewords,n_symbols),dtype=self.rs.dtype,buffer=shm.buf)
+        dat[:] = 0
+        return dat
+
+    def _segment(self,dat):
+        """
+        The segment of the pool holding dat and the offset of dat in it, or None
+        """
+        start = dat.__array_interface__['data'][0]
+        for shm in self._segments:
+            base = np.frombuffer(shm.buf,dtype=np.uint8).__array_interface__['data'][0]
+            if base <= start < base + shm.size:
+                return shm, start - base
+        return None
+
+    def _run(self,op,dat,erasures=None):
+        """
+        Split the rows of dat over the workers, in shared memory
+        """
+        self.rs._check_batch(dat)
+        if len(dat) == 0:
+            return []
+
+        found = self._segment(dat)
+        if found is None:
+            shm = shared_memory.SharedMemory(create=True,size=dat.nbytes)
+            work = np.ndarray(dat.shape,dtype=dat.dtype,buffer=shm.buf)
+            work[:] = dat
+            offset = 0
+        else:
+            shm, offset = found
+            work = dat
+
+        try:
+            bounds = np.linspace(0,len(dat),min(self.n_workers,len(dat))+1).astype(int)
+            futures = []
+            for start, stop in zip(bounds[:-1],bounds[1:]):
+                eras = erasures[start:stop] if erasures is not None else None
+                futures.append(self._executor.submit(_run_batch,op,shm.name,(stop-start,dat.shape[1]),dat.dtype,
+                                                     offset+start*work.strides[0],work.strides,eras))
+            res = [f.result() for f in futures]
+            if work is not dat:
+                dat[:] = work
+        finally:
+            if found is None:
+                del work
+                self._release(shm)
+        return res
+
+    def encode_batch(self,dat):
+        """
+        Encode a batch of codewords in place in the worker processes, see Reed_Solomon.encode_batch
+        """
+        self._run('encode',dat)
+        return dat
+
+    def decode_batch(self,dat,erasures=None):
+        """
+        Decode a batch of codewords in place in the worker processes
+
+        input:
+        \tdat -- numpy array of shape (N, total_size), see Reed_Solomon.decode_batch
+        \terasures -- optional erasure positions for each row, see Reed_Solomon.decode_batch
+
+        returns:
+        \tdat -- the same array with the errors corrected
+        \tn_errors -- int array with the number of symbol errors for each row or -EBADMSG (-74)
+        """
+        if erasures is not None:
+            erasures, _ = self.rs._erasure_array(erasures,dat.shape[1])
+        res = self._run('decode',dat,erasures)
+        return dat, np.concatenate(res + [np.zeros(0,dtype=np.intc)])
+
+    def _map(self,op,items,chunksize):
+        items = list(items)
+        if chunksize is None:
+            chunksize = max(1,-(-len(items) // (4 * self.n_workers)))
+        chunks = [items[i:i+chunksize] for i in range(0,len(items),chunksize)]
+        return [r for res in self._executor.map(_run_map,[op]*len(chunks),chunks) for r in res]
+
+    def encode(self,messages,chunksize=None):
+        """
+        Encode many messages with Reed_Solomon.encode in the worker processes
+
+        input:
+        \tmessages -- iterable of messages of any type accepted by encode (list, bytes, ...)
+        \tchunksize -- messages per task, by default spread as four tasks per worker
+
+        returns a list of the codewords in the types of the messages. The messages and
+        codewords are pickled to and from the workers, use encode_batch for arrays
+        """
+        return self._map('encode',messages,chunksize)
+
+    def decode(self,codewords,chunksize=None):
+        """
+        Decode many codewords with Reed_Solomon.decode in the worker processes
+
+        returns a list of (message, n_errors) tuples, see encode
+        """
+        return self._map('decode',codewords,chunksize)
@@ -13,87 +13,137 @@
 """
 Uses the C-library https://github.com/CyberLeo/reed-solomon
 
-configure with prefix=/usr/lib or add default prefix to LD_LIBRARY_PATH
+The library is compiled into the extension module pyreedsolomon._librs, see src/rs_module.c
 """
 
-import ctypes
 import numpy as np
-import os.path
-import site
-
-file_path = os.path.realpath(__file__).strip(os.path.basename(__file__))
-lib_loc = os.listdir(file_path + '../') 
-# print(f'{lib_loc=}')
-for l in lib_loc:
-    if 'librs.cpython' in l and '.so' in l:
-        RS_LIB_FILE = l
-        break
-# RS_LIB_FILE = 'librs.cpython-38-x86_64-linux-gnu.so'
-
-lib = ctypes.cdll.LoadLibrary(file_path + '../' + RS_LIB_FILE)
-
-
-# pointers
-c_dat_p8 =  ctypes.POINTER(ctypes.c_ubyte)
-c_dat_p16 =  ctypes.POINTER(ctypes.c_ushort)
-c_par_p = ctypes.POINTER(ctypes.c_ushort)
-
-
-lib.init_rs.argtypes = [ctypes.c_int,
-                        ctypes.c_int,
-                        ctypes.c_int,
-                        ctypes.c_int,
-                        ctypes.c_int]
-lib.init_rs.restype = ctypes.c_void_p
-
-lib.encode_rs8.argtypes = [ctypes.c_void_p,
-                           c_dat_p8,
-                           ctypes.c_int,
-                           c_par_p,
-                           ctypes.c_ushort]
-
-
-lib.decode_rs8.argtypes = [ctypes.c_void_p,
-                           c_dat_p8,
-                           c_par_p,
-                           ctypes.c_int,
-                           c_par_p,
-                           ctypes.c_int,
-                           ctypes.POINTER(ctypes.c_int),
-                           ctypes.c_ushort,
-                           c_par_p,
-]
-
-lib.decode_rs8.restype = ctypes.c_int
-
-lib.encode_rs16.argtypes = [ctypes.c_void_p,
-                           c_dat_p16,
-                           ctypes.c_int,
-                           c_par_p,
-                           ctypes.c_ushort]
-
-lib.decode_rs16.argtypes = [ctypes.c_void_p,
-                           c_dat_p16,
-                           c_par_p,
-                           ctypes.c_int,
-                           c_par_p,
-                           ctypes.c_int,
-                           ctypes.POINTER(ctypes.c_int),
-                           ctypes.c_ushort,
-                           c_par_p,
-]
-
-lib.decode_rs16.restype = ctypes.c_int
-
-lib.free.argtypes = [ctypes.c_void_p]
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .packing import pack_symbols, unpack_symbols
+from . import metrics
+from . import tablecache
+
+try:
+    from . import _librs as lib
+except ImportError:
+    lib = None # Reed_Solomon falls back on the numpy backend, see numpy_backend.py
+
+EBADMSG = 74 # the decoders return -EBADMSG when a codeword can not be corrected
+
+
+CODEC_CACHE_SIZE = 64 # default number of codecs kept by Reed_Solomon.get
+
+_UPDATE_CHUNK = 1 << 20 # number of elements of the temporaries of update_parity_batch
+
+CacheInfo = namedtuple('CacheInfo',['hits','misses','evictions','maxsize','currsize'])
+
+
+class _CodecCache(object):
+    """
+    Bounded LRU cache of codecs, see Reed_Solomon.get
+
+    Evicted codecs are only dropped from the cache. Their native structures are released as
+    soon as the last reference to them is gone, so codecs still in use elsewhere stay valid
+    """
+    def __init__(self,maxsize=CODEC_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._codecs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self,key,factory):
+        with self._lock:
+            codec = self._codecs.get(key)
+            if codec is not None:
+                self._codecs.move_to_end(key)
+                self.hits += 1
+                return codec
+
+            self.misses += 1
+            codec = factory()
+            self._codecs[key] = codec
+            self._evict()
+            return codec
+
+    def _evict(self):
+        while len(self._codecs) > self.maxsize:
+            self._codecs.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self,maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._codecs.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits,self.misses,self.evictions,self.maxsize,len(self._codecs))
+
+
+_codec_cache = _CodecCache()
+
+
+def _default_backend():
+    return os.environ.get('PYREEDSOLOMON_BACKEND','native' if lib is not None else 'numpy')
+
+
+class _Scratch(threading.local):
+    """
+    Scratch buffers of a Reed_Solomon instance. Being a threading.local, every thread
+    gets its own set, allocated the first time that thread uses the codec.
+    """
+    def __init__(self,total_size,dtype):
+        self.data_buf = np.empty(total_size,dtype=dtype)
+
+
+def _unpickle(cls,symsize,message_size,total_size,gfpoly,fcr,prim,nroots):
+    """
+    Codec of an unpickled Reed_Solomon, see Reed_Solomon.__reduce__
+    """
+    from .numpy_backend import NumpyReedSolomon
+    backend = cls.backend
+    if cls is NumpyReedSolomon:
+        cls = Reed_Solomon # the class Reed_Solomon.get(..., backend='numpy') caches under
+    return cls.get(symsize,gfpoly,fcr,prim,nroots,message_size,total_size,backend=backend)
 
 
 class Reed_Solomon(object):
-    def __init__(self,symsize,message_size,total_size,gfpoly,fcr,prim,nroots):
+    backend = 'native'
+
+    def __new__(cls,*args,backend=None,**kwargs):
+        """
+        Pick the implementation. backend is 'native' for the C library or 'numpy' for the
+        vectorized numpy implementation. By default the environment variable
+        PYREEDSOLOMON_BACKEND decides, or else the C library when it is available
+        """
+        if cls is Reed_Solomon:
+            if backend is None:
+                backend = _default_backend()
+            if backend == 'numpy':
+                from .numpy_backend import NumpyReedSolomon
+                cls = NumpyReedSolomon
+            elif backend != 'native':
+                raise ValueError(f"unknown backend '{backend}', expected 'native' or 'numpy'")
+            elif lib is None:
+                raise ImportError('the native extension pyreedsolomon._librs is not available')
+        return super().__new__(cls)
+
+    def __init__(self,symsize,message_size,total_size,gfpoly,fcr,prim,nroots,*,backend=None):
         """
         symsize - bits pr symbol
         message_size - size of the data
         total_size - size of data + parity
+        backend - 'native' or 'numpy', see __new__. Keyword only
         
         * init_rs - Find a matching or allocate a new rs control structure
         *  @symsize:	the symbol size (number of bits)
@@ -111,25 +161,152 @@ class Reed_Solomon(object):
         self.message_size = message_size
         self.total_size = total_size
         self.par_size = total_size - message_size
-        self.obj = lib.init_rs(symsize,gfpoly,fcr,prim,nroots)
+        self.dtype = np.uint16 if symsize > 8 else np.uint8
+        self.gfpoly = gfpoly
+        self.fcr = fcr
+        self.prim = prim
+        self.nroots = nroots
 
-        self.par = np.zeros(self.par_size,dtype=np.uint16)
-        self.par_p = self.par.ctypes.data_as(c_par_p)
+        self._tables = None # field tables in numpy, see _code_tables
+        self._init_codec(gfpoly,fcr,prim,nroots)
 
+        # the native codec is not modified by encoding/decoding and can be shared between
+        # threads. The scratch buffers can not, so they are kept per thread
+        self._scratch = _Scratch(self.total_size,self.dtype)
+
+        self._stats = None # see enable_stats
+        if os.environ.get('PYREEDSOLOMON_STATS','0') not in ('','0'):
+            self.enable_stats()
+
+    def _init_codec(self,gfpoly,fcr,prim,nroots):
+        """
+        Set up the codec of the backend
+        """
+        # the control structure is released with free_rs when the codec is collected
+        args = (self.symsize,gfpoly,fcr,prim,nroots,self.total_size)
+        size = lib.simd_tables_size(self.symsize,nroots,self.total_size)
+        # an extension built without SIMD_TABLES_VERSION does not tell the layout of its
+        # tables, so they are not cached
+        version = getattr(lib,'SIMD_TABLES_VERSION',None)
+        if size == 0 or version is None or tablecache.cache_dir() is None:
+            self.obj = lib.Codec(*args)
+            return
+
+        # the tables of the vectorized kernels are mapped from the cache of tablecache.py. On a
+        # miss the codec that built them is kept, and its tables are only stored
+        built = []
+        def build(n_rows):
+            built.append(lib.Codec(*args))
+            return np.frombuffer(built[0].simd_tables(),dtype=np.uint8)
+        key = f'rs{self.symsize}_{gfpoly:x}_{fcr}_{prim}_{nroots}'
+        tables = tablecache.load(key,f'simd_v{version}_{self.total_size}',size,build)
+        self.obj = built[0] if built else lib.Codec(*args,tables=tables)
+
+    def __reduce__(self):
+        """
+        Codecs are pickled by their parameters. The native structures are not, so the
+        unpickled codec is taken from the cache of get: every process builds it once, on the
+        first codec it receives with those parameters, and shares it from then on. The
+        statistics and scratch buffers stay with the process they belong to
+        """
+        return (_unpickle,(type(self),self.symsize,self.message_size,self.total_size,
+                           self.gfpoly,self.fcr,self.prim,self.nroots))
+
+    def __copy__(self):
+        """
+        copy.copy and copy.deepcopy build a new codec with the same parameters, rather than
+        returning the shared codec of __reduce__. The copy starts without statistics
+        """
+        return type(self)(self.symsize,self.message_size,self.total_size,self.gfpoly,self.fcr,
+                          self.prim,self.nroots)
+
+    def __deepcopy__(self,memo):
+        return self.__copy__()
+
+    @classmethod
+    def get(cls,symsize,gfpoly,fcr,prim,nroots,message_size=None,total_size=None,backend=None):
+        """
+        Codec for the given code parameters from a bounded LRU cache, constructed on a miss
+
+        input:
+        	symsize, gfpoly, fcr, prim, nroots -- code parameters, see __init__
+        	message_size -- defaults to total_size - nroots
+        	total_size -- defaults to the full codeword length 2**symsize - 1
+        	backend -- 'native' or 'numpy', see __new__
+
+        returns:
+        	Reed_Solomon instance, shared with every other caller asking for the same code
+
+        Codecs can be shared between threads. The cache holds CODEC_CACHE_SIZE codecs, the
+        least recently used one is dropped when it is full. See cache_info and cache_resize
+        """
+        if total_size is None:
+            total_size = (1 << symsize) - 1
+        if message_size is None:
+            message_size = total_size - nroots
+        if backend is None:
+            backend = _default_backend()
+
+        key = (cls,symsize,message_size,total_size,gfpoly,fcr,prim,nroots,backend)
+        return _codec_cache.get(key,lambda: cls(symsize,message_size,total_size,gfpoly,fcr,prim,nroots,backend=backend))
+
+    @staticmethod
+    def cache_info():
+        """
+        returns the hits, misses and evictions of the codec cache of get, and its size
+        """
+        return _codec_cache.info()
+
+    @staticmethod
+    def cache_resize(maxsize):
+        """
+        Change the number of codecs kept by get, evicting the least recently used ones
+        """
+        _codec_cache.resize(maxsize)
+
+    @staticmethod
+    def cache_clear():
+        """
+        Drop all codecs from the cache of get and reset its counters
+        """
+        _codec_cache.clear()
 
-        if symsize > 8:
-            self._encode = lib.encode_rs16
-            self._decode = lib.decode_rs16
-            self.c_dat_p = c_dat_p16
-            self.dtype = np.uint16
+    def enable_stats(self,enabled=True):
+        """
+        Switch the runtime statistics of this codec on or off, see stats and metrics.py
+
+        While enabled, every call to the encoders and decoders is timed and counted. When
+        disabled, which is the default unless the environment variable PYREEDSOLOMON_STATS is
+        set, the methods run without any instrumentation. The counters are kept when the
+        statistics are switched off and on again
+        """
+        if enabled:
+            if self._stats is None:
+                self._stats = metrics.CodecStats()
+            metrics.instrument(self,self._stats)
         else:
-            self._encode = lib.encode_rs8
-            self._decode = lib.decode_rs8
-            self.c_dat_p = c_dat_p8
-            self.dtype = np.uint8
+            metrics.uninstrument(self)
 
-            
-        self.data_buf = np.empty(self.total_size,dtype=self.dtype)
+    def stats(self,reset=False):
+        """
+        Snapshot of the runtime statistics
+
+        input:
+        \treset -- clear the counters after taking the snapshot
+
+        returns:
+        \tstats -- metrics.Stats with the number of codewords encoded and decoded, the symbols
+        \t         corrected, the codewords that failed with -EBADMSG, the bytes of the
+        \t         codewords handled and a metrics.Histogram of the latency of the encode and
+        \t         decode calls. All zero when the statistics were never enabled
+        """
+        if self._stats is None:
+            return metrics.CodecStats().snapshot()
+        return self._stats.snapshot(reset)
+
+    @property
+    def data_buf(self):
+        return self._scratch.data_buf
 
     def encode_fast(self,dat):
         """
@@ -139,136 +316,569 @@ class Reed_Solomon(object):
         and CRC is stored here. 
         dat should be a numpy array with dtype=numpy.uint8
 
+        A shorter array holds a shortened codeword: the message is then the first
+        len(dat) - par_size symbols and only those are run through the encoder
+
         Returns the data with the checksum appended
         """
 
-        self.par[:] = 0 # needs to be set to zeros
-        dat_p = dat.ctypes.data_as(self.c_dat_p)
-        
-        # lib.encode_rs8(self.obj,dat_p,self.message_size,self.par_p,0)
-        self._encode(self.obj,dat_p,self.message_size,self.par_p,0)
+        self.obj.encode(dat)
 
-        dat[-self.par_size:] = self.par.astype(self.dtype)
         return dat
-        # return np.append(dat,self.par.astype(np.uint8))
 
-    def decode_fast(self,dat):
+    def decode_fast(self,dat,erasures=None,err_pos=None,err_val=None):
         """
-        Input the data array with parity. The length of the data array should be total_size
+        Input the data array with parity. The length of the data array should be total_size,
+        or shorter for a shortened codeword as produced by encode_fast
+
+        erasures is an optional list or array with the positions of the symbols in dat that are
+        known to be lost. Each erasure costs one parity symbol instead of two for an error, so
+        up to par_size erasures can be recovered
+
+        err_pos and err_val are optional arrays of at least par_size elements with dtype
+        numpy.intc and numpy.uint16. When provided, the first n_errors entries receive the
+        positions of the corrected symbols and the values they were xor-ed with. This includes
+        the errors in the parity, which are reported but not corrected in dat
 
         returns the decoded data and number of symbol errors or -EBADMSH (-74) if the CRC failed
         """
 
-        self.par[:] = dat[-self.par_size:].astype(np.uint16)
+        if erasures is None and err_pos is None:
+            return dat, self.obj.decode(dat)
+
+        eras = no_eras = None
+        if erasures is not None:
+            eras, no_eras = self._erasure_array([erasures],len(dat))
+
+        offsets = None
+        if err_pos is not None:
+            if err_val is None or len(err_pos) < self.par_size or len(err_val) < self.par_size:
+                raise ValueError(f'err_pos and err_val need to hold at least {self.par_size} entries')
+            if err_pos.dtype != np.intc or err_val.dtype != np.uint16:
+                raise ValueError('err_pos and err_val need dtype numpy.intc and numpy.uint16')
+            err_val[:] = 0
+            offsets = np.zeros(2,dtype=np.intc)
+        else:
+            err_val = None
+
+        # a batch of one row, which reports and applies the corrections like decode_batch
+        n_errors = np.zeros(1,dtype=np.intc)
+        self.obj.decode_batch(dat[None],eras,no_eras,n_errors,offsets,err_pos,err_val)
 
-        dat_p = dat.ctypes.data_as(self.c_dat_p)
+        return dat, int(n_errors[0])
 
-        # n_errors = lib.decode_rs8(self.obj,dat_p,self.par_p, self.message_size, None,0,None,0,None)
-        n_errors = self._decode(self.obj,dat_p,self.par_p, self.message_size, None,0,None,0,None)
-        # if n_errors == -74: # -EBADMSG
-        #     return dat, n_errors
-        
+    def _erasure_array(self,erasures,n_symbols=None):
+        """
+        Convert erasures to a padded array of positions with the valid entries of each row
+        up front, and the number of erasures in each row
+
+        erasures is either a 2-D integer array padded with negative values, or a sequence of
+        1-D arrays or lists, one for each codeword of n_symbols (default total_size). Only the
+        2-D array takes padding, the positions in a sequence need to be valid
+        """
+        if n_symbols is None:
+            n_symbols = self.total_size
+
+
+        if type(erasures) == np.ndarray and erasures.ndim == 2:
+            # sort the padding to the end of each row. The order of the erasures does not matter
+            eras = -np.sort(-erasures.astype(np.intc),axis=1)
+        else:
+            erasures = [np.asarray(e,dtype=np.intc).ravel() for e in erasures]
+            lengths = np.array([len(e) for e in erasures],dtype=np.intp)
+            positions = np.concatenate(erasures + [np.zeros(0,dtype=np.intc)])
+            if np.any(positions < 0):
+                raise ValueError('erasure positions can not be negative')
+            eras = np.full((len(erasures),max(1,lengths.max(initial=0))),-1,dtype=np.intc)
+            eras[np.arange(eras.shape[1]) < lengths[:,None]] = positions
+
+        if np.any(eras >= n_symbols):
+            raise ValueError(f'erasure positions need to be smaller than the codeword length {n_symbols}')
+        no_eras = np.count_nonzero(eras >= 0,axis=1).astype(np.intc)
+
+        return np.ascontiguousarray(eras), no_eras
+
+    def _check_batch(self,dat):
+        """
+        Verify that dat can be handed to the batched encoder/decoder as is
+
+        returns the message length of the rows
+        """
+        if not isinstance(dat,np.ndarray) or dat.ndim != 2 or not self.par_size < dat.shape[1] <= self.total_size:
+            raise ValueError(f'expected a numpy array of shape (N, {self.total_size}), or (N, n) with '
+                             f'{self.par_size} < n < {self.total_size} for shortened codewords')
+        if dat.dtype != self.dtype:
+            raise ValueError(f'expected dtype {np.dtype(self.dtype).name}, got {dat.dtype.name}')
+        if len(dat) and (dat.strides[1] <= 0 or dat.strides[1] % dat.itemsize or dat.strides[0] % dat.itemsize):
+            raise ValueError('the symbols of the rows need a positive stride, in whole symbols')
+
+        return dat.shape[1] - self.par_size
+
+    def encode_batch(self,dat):
+        """
+        Encode many codewords with a single call to the library
+
+        input:
+        \tdat -- numpy array of shape (N, total_size) and the dtype of the codec (uint8 for
+        \t       symsize <= 8, uint16 otherwise). The message is in the first message_size
+        \t       symbols of each row
+
+        returns:
+        \tdat -- the same array, with the parity written to the last par_size symbols of each row
+        """
+
+        self._check_batch(dat)
+        if len(dat) == 0:
+            return dat
+
+        self.obj.encode_batch(dat)
+
+        return dat
+
+    def decode_batch(self,dat,erasures=None,corrections=False):
+        """
+        Decode many codewords in place with a single call to the library
+
+        input:
+        \tdat -- numpy array of shape (N, total_size) and the dtype of the codec
+        \terasures -- optional erasure positions for each row. Either an integer array of shape
+        \t             (N, max_erasures) padded with -1, or a sequence of N lists/arrays
+        \tcorrections -- also return the positions and values of the corrected symbols
+
+        returns:
+        \tdat -- the same array with the errors corrected
+        \tn_errors -- int array with the number of symbol errors for each row or -EBADMSG (-74) if
+        \t            decoding of that row failed
+        \t(offsets, positions, values) -- only when corrections is True. The corrections of row n
+        \t            are positions[offsets[n]:offsets[n+1]] and values[offsets[n]:offsets[n+1]].
+        \t            Errors in the parity are reported but not corrected in dat
+        """
+
+        self._check_batch(dat)
+        n_errors = np.zeros(len(dat),dtype=np.intc)
+        if corrections:
+            offsets = np.zeros(len(dat)+1,dtype=np.intc)
+            positions = np.empty(len(dat)*self.par_size,dtype=np.intc)
+            values = np.empty(len(dat)*self.par_size,dtype=np.uint16)
+        else:
+            offsets, positions, values = None, None, None
+        if len(dat) == 0:
+            if corrections:
+                return dat, n_errors, (offsets, positions, values)
+            return dat, n_errors
+
+        eras = no_eras = None
+        if erasures is not None:
+            eras, no_eras = self._erasure_array(erasures,dat.shape[1])
+            if len(eras) != len(dat):
+                raise ValueError(f'expected erasures for {len(dat)} codewords, got {len(eras)}')
+
+        self.obj.decode_batch(dat,eras,no_eras,n_errors,offsets,positions,values)
+
+        if corrections:
+            n_corr = offsets[-1]
+            return dat, n_errors, (offsets, positions[:n_corr].copy(), values[:n_corr].copy())
         return dat, n_errors
 
+    def check(self,dat):
+        """
+        Check whether a codeword is free of errors, without decoding it
+
+        The length of the data array should be total_size, or shorter for a shortened codeword,
+        as for decode_fast
 
-    def encode(self,dat):
+        returns True when all syndromes are zero
+        """
+
+        return self.obj.check(dat)
+
+    def check_batch(self,dat):
+        """
+        Check many codewords for errors with a single call to the library
+
+        input:
+        \tdat -- numpy array of shape (N, total_size), see decode_batch. It is not modified
+
+        returns:
+        \tclean -- boolean array which is True for the rows without errors
+
+        Only the syndromes are evaluated, so this is as cheap as encoding. Note that the
+        decoders already stop after the syndromes for a clean codeword, so there is no need to
+        filter a batch with check_batch before handing it to decode_batch
+        """
+
+        self._check_batch(dat)
+        clean = np.zeros(len(dat),dtype=np.bool_)
+        if len(dat) == 0:
+            return clean
+
+        self.obj.check_batch(dat,clean)
+
+        return clean
+
+    def _code_tables(self):
+        """
+        Log/antilog tables of the field and the parity contribution of every message position,
+        built on first use. See _Tables in numpy_backend.py
+        """
+        if self._tables is None:
+            from .numpy_backend import _Tables
+            self._tables = _Tables(self.symsize,self.gfpoly,self.fcr,self.prim,self.nroots,self.message_size)
+        return self._tables
+
+    def _parity_delta(self,msg_len,positions,diff):
+        """
+        Change of the parity when the message symbols at positions of the rows of a batch are
+        xor-ed with diff. positions is (c,) or (N, c) and diff (N, c)
+        """
+        t = self._code_tables()
+        rows = t.gen_log[self.message_size-msg_len+positions]
+        n, c = diff.shape
+        delta = np.empty((n,self.par_size),dtype=np.uint16)
+        step = max(1,_UPDATE_CHUNK // max(1,c*self.par_size))
+        for s in range(0,n,step):
+            r = rows if rows.ndim == 2 else rows[s:s+step]
+            np.bitwise_xor.reduce(t.exp[t.log[diff[s:s+step]][:,:,None] + r],axis=1,out=delta[s:s+step])
+        return delta
+
+    def _check_update(self,positions,new_values,msg_len,n_rows=None):
+        """
+        Validate the positions and values of update_parity, or of update_parity_batch for
+        n_rows codewords
+        """
+        positions = np.asarray(positions,dtype=np.intp)
+        new_values = np.asarray(new_values)
+        if n_rows is None:
+            ok = positions.ndim == 1 and new_values.shape == positions.shape
+        else:
+            ok = (positions.ndim == 1 or positions.shape[:1] == (n_rows,)) and positions.ndim <= 2 \
+                and new_values.shape == (n_rows,positions.shape[-1])
+        if not ok:
+            raise ValueError(f'positions and new_values do not match, got shapes {positions.shape} and {new_values.shape}')
+        if positions.size and (positions.min() < 0 or positions.max() >= msg_len):
+            raise ValueError(f'positions need to be in the message, between 0 and {msg_len-1}')
+        if positions.shape[-1] > 1 and np.any(np.diff(np.sort(positions,axis=-1),axis=-1) == 0):
+            raise ValueError('positions need to be unique')
+        return positions, new_values
+
+    def update_parity(self,dat,positions,new_values):
+        """
+        Rewrite message symbols of an encoded codeword and update its parity in place
+
+        input:
+        \tdat -- numpy array with a codeword encoded by encode_fast
+        \tpositions -- unique positions of the message symbols to change
+        \tnew_values -- the new values of those symbols
+
+        returns:
+        \tdat -- the same array with the new symbols and the parity for them
+
+        Only the changed symbols are read: the parity changes by the difference of each symbol
+        times the parity of a single 1 at its position. This costs len(positions) * par_size
+        products instead of encoding the whole codeword
+        """
+
+        if not isinstance(dat,np.ndarray) or dat.ndim != 1 or not self.par_size < len(dat) <= self.total_size:
+            raise ValueError(f'expected a 1-D numpy array of {self.total_size} symbols, or n with '
+                             f'{self.par_size} < n < {self.total_size} for a shortened codeword')
+        if dat.dtype != self.dtype:
+            raise ValueError(f'expected dtype {np.dtype(self.dtype).name}, got {dat.dtype.name}')
+        msg_len = len(dat) - self.par_size
+        positions, new_values = self._check_update(positions,new_values,msg_len)
+        t = self._code_tables()
+        diff = (dat[positions] ^ new_values) & t.nn
+        dat[positions] = new_values
+        terms = t.exp[t.log[diff][:,None] + t.gen_log[self.message_size-msg_len+positions]]
+        dat[msg_len:] ^= np.bitwise_xor.reduce(terms,axis=0).astype(self.dtype)
+
+        return dat
+
+    def update_parity_batch(self,dat,positions,new_values):
+        """
+        Rewrite message symbols of many encoded codewords and update their parity in place
+
+        input:
+        \tdat -- numpy array of shape (N, total_size), see encode_batch
+        \tpositions -- positions to change, either (c,) for the same positions in every row or
+        \t             (N, c) for each row
+        \tnew_values -- (N, c) array with the new values
+
+        returns:
+        \tdat -- the same array with the new symbols and the parity for them
+        """
+
+        msg_len = self._check_batch(dat)
+        positions, new_values = self._check_update(positions,new_values,msg_len,len(dat))
+        rows = np.arange(len(dat))[:,None]
+        diff = (dat[rows,positions] ^ new_values.astype(self.dtype)) & ((1 << self.symsize) - 1)
+        dat[rows,positions] = new_values
+        dat[:,msg_len:] ^= self._parity_delta(msg_len,positions,diff).astype(self.dtype)
+
+        return dat
+
+    def _field_matmul(self,src,coef,out):
+        """
+        Matrix product over the field of the code, out[j] = sum_i src[i] * coef[i,j]
+
+        src and out are 2-D arrays of symbols with rows of the same length and contiguous
+        within each row, coef a uint16 array of shape (len(src), len(out)). See shards.py
+        """
+        self.obj.matmul(src,coef,out)
+        return out
+
+    def _parallel(self,func,n_threads,executor,dat,*args):
+        """
+        Split dat, and the arrays in args, in chunks of rows and run func on each of them in a
+        thread pool
+        """
+        if n_threads is None:
+            n_threads = os.cpu_count() or 1
+        n_chunks = max(1,min(n_threads,len(dat)))
+        chunks = [np.array_split(a,n_chunks) for a in (dat,) + args]
+
+        if executor is None:
+            with ThreadPoolExecutor(n_threads) as executor:
+                return list(executor.map(func,*chunks))
+        return list(executor.map(func,*chunks))
+
+    def parallel_encode(self,dat,n_threads=None,executor=None):
+        """
+        Encode a batch of codewords in place, split over a pool of threads
+
+        input:
+        \tdat -- numpy array of shape (N, total_size), see encode_batch
+        \tn_threads -- number of chunks to split the batch in. Defaults to the number of cpus
+        \texecutor -- optional concurrent.futures.ThreadPoolExecutor to run the chunks on. Reusing
+        \t            an executor saves starting new threads on every call
+
+        returns:
+        \tdat -- the same array with the parity appended to each row
+
+        The library releases the GIL while encoding, so the chunks run concurrently
+        """
+
+        self._check_batch(dat)
+        self._parallel(self.encode_batch,n_threads,executor,dat)
+
+        return dat
+
+    def parallel_decode(self,dat,n_threads=None,executor=None,erasures=None):
+        """
+        Decode a batch of codewords in place, split over a pool of threads
+
+        input:
+        \tdat -- numpy array of shape (N, total_size), see decode_batch
+        \terasures -- optional erasure positions for each row, see decode_batch
+        \tn_threads -- number of chunks to split the batch in. Defaults to the number of cpus
+        \texecutor -- optional concurrent.futures.ThreadPoolExecutor to run the chunks on
+
+        returns:
+        \tdat -- the same array with the errors corrected
+        \tn_errors -- int array with the number of symbol errors for each row or -EBADMSG (-74)
+        """
+
+        self._check_batch(dat)
+        if erasures is None:
+            res = self._parallel(self.decode_batch,n_threads,executor,dat)
+        else:
+            eras, _ = self._erasure_array(erasures,dat.shape[1])
+            res = self._parallel(self.decode_batch,n_threads,executor,dat,eras)
+
+        return dat, np.concatenate([n_errors for _, n_errors in res])
+
+
+    def _symbols(self,dat):
+        """
+        Map the input data on a sequence of symbols that can be assigned to a numpy array
+        without an intermediate copy. Anything that is not a numpy array or a list is read
+        through the buffer protocol (bytes, bytearray, memoryview, mmap, array.array, ...)
+        """
+        if isinstance(dat,(np.ndarray,list)):
+            return dat
+        return np.frombuffer(dat,dtype=self.dtype)
+
+    def _out_array(self,out,n_symbols):
+        """
+        numpy view of the out argument of encode/decode
+        """
+        out_arr = out if isinstance(out,np.ndarray) else np.frombuffer(out,dtype=self.dtype)
+        if len(out_arr) != n_symbols:
+            raise ValueError(f'out holds {len(out_arr)} symbols, expected {n_symbols}')
+        return out_arr
+
+    def _output(self,dat,res,out):
+        """
+        Return res in the data type of the input dat, or store it in out
+
+        res is a view in the scratch buffer, so the returned data is always a copy
+        """
+        if out is not None:
+            self._out_array(out,len(res))[:] = res
+            return out
+
+        if isinstance(dat,np.ndarray):
+            return res.copy()
+        elif type(dat) == list:
+            return res.tolist()
+        elif type(dat) == bytes:
+            return res.tobytes()
+        elif type(dat) == bytearray:
+            return bytearray(res)
+        # other buffer protocol objects
+        return res.copy()
+
+    def encode(self,dat,out=None):
         """
         Encode the provided data
         
         input:
         \tdat -- array with the data in numpy array, bytearray or list
+        \tout -- optional numpy array or writable buffer of len(dat) + par_size symbols to store
+        \t       the result in, instead of allocating a new object
         
         returns:
-        \tdat+crc -- data with crc appended in the data type provided
+        \tdat+crc -- data with crc appended in the data type provided, or out if provided
 
-        Supports numpy array, list, bytes and bytearray
+        Supports numpy array, list, bytes and bytearray. Other objects supporting the buffer
+        protocol, like memoryview and mmap, are read directly and return a numpy array
+
+        An empty message raises ValueError. Messages are encoded as shortened codewords of their
+        own length, which need at least one message symbol
 
         If more encoding performance is required, please use encode_fast
         """
 
-        d_type = type(dat)
-        n_symbols = len(dat)
-        # do the appropriate mapping based on input data type
-
-        if d_type == np.ndarray:
-            if n_symbols > self.message_size:
-                raise ValueError(f'input data size {n_symbols} larger than max allowed {self.message_size}')
-            self.data_buf[self.message_size-n_symbols:self.message_size] = dat.astype(self.dtype)
-        elif d_type == list:
-            if n_symbols > self.message_size:
-                raise ValueError(f'input data size {n_symbols} larger than max allowed {self.message_size}')
+        src = self._symbols(dat)
+        n_symbols = len(src)
+        if n_symbols > self.message_size:
+            raise ValueError(f'input data size {n_symbols} larger than max allowed {self.message_size}')
+        if n_symbols == 0:
+            raise ValueError('input data is empty, a message needs at least one symbol')
 
-            self.data_buf[self.message_size-n_symbols:self.message_size] = np.array(dat,dtype=self.dtype)
-        elif d_type in [bytes, bytearray]:
-            if self.symsize > 8:
-                n_symbols = n_symbols//2
-            if n_symbols > self.message_size:
-                raise ValueError(f'input data size {n_symbols//2} larger than max allowed {self.message_size}')
+        # messages shorter than message_size are encoded as a shortened codeword of their own
+        # length, rather than zero padded to the full message_size
+        if out is not None:
+            out_arr = self._out_array(out,n_symbols+self.par_size)
+            if out_arr.dtype == self.dtype and out_arr.flags.c_contiguous:
+                # encode directly in the memory of the caller
+                out_arr[:n_symbols] = src
+                self.encode_fast(out_arr)
+                return out
 
-            self.data_buf[self.message_size-n_symbols:self.message_size] = np.frombuffer(dat,dtype=self.dtype)
+        data_buf = self._scratch.data_buf[:n_symbols+self.par_size]
+        data_buf[:n_symbols] = src
 
-        self.data_buf[:self.message_size-n_symbols] = 0 # prepend with zeros when the input data is not message_size
-        
+        self.encode_fast(data_buf)
 
-        self.encode_fast(self.data_buf)
+        return self._output(dat,data_buf,out)
 
-        if d_type == np.ndarray:
-            return self.data_buf[-n_symbols-self.par_size:]
-        elif d_type == bytes:
-            return self.data_buf[-n_symbols-self.par_size:].tobytes()
-        elif d_type == bytearray:
-            return bytearray(self.data_buf[-n_symbols-self.par_size:].tobytes())
-        elif d_type == list:
-            return self.data_buf[-n_symbols-self.par_size:].tolist()
 
-
-    def decode(self,dat):
+    def decode(self,dat,erasures=None,out=None):
         """
         decode the provided data
         
         input:
         \tdat -- array with the data and CRC in numpy array, bytearray or list
+        \terasures -- optional positions of symbols in dat that are known to be lost
+        \tout -- optional numpy array or writable buffer of len(dat) - par_size symbols to store
+        \t       the decoded data in, instead of allocating a new object
         
         returns:
-        \tdat -- decoded data or original data in case decoding failed
+        \tdat -- decoded data or original data in case decoding failed, or out if provided
         \tnum_errors -- the number of errors or -EBADMSH (-74) if failed
 
-        Supports numpy array, list, bytes and bytearray
+        Supports numpy array, list, bytes and bytearray. Other objects supporting the buffer
+        protocol, like memoryview and mmap, are read directly and return a numpy array
 
         If more encoding performance is required, please use decode_fast
         """
 
-        d_type = type(dat)
-        n_symbols = len(dat)
-        # do the appropriate mapping based on input data type
+        src = self._symbols(dat)
+        n_symbols = len(src)
+        if n_symbols > self.total_size:
+            raise ValueError(f'input data size {n_symbols} larger than max allowed {self.total_size}')
+        if n_symbols <= self.par_size:
+            raise ValueError(f'input data size {n_symbols} needs to be larger than the parity size {self.par_size}')
+
+        # decoded as a shortened codeword of its own length
+        data_buf = self._scratch.data_buf[:n_symbols]
+        data_buf[:] = src
+
+        data_buf, n_errors = self.decode_fast(data_buf,erasures)
+
+        return self._output(dat,data_buf[:-self.par_size],out), n_errors
+
+    def _packed_input(self,dat,n_symbols,max_symbols):
+        """
+        Unpack the bitstream of encode_packed/decode_packed into a 1-D or 2-D symbol array
+        """
+        packed = dat if isinstance(dat,np.ndarray) else np.frombuffer(dat,dtype=np.uint8)
+        if packed.dtype != np.uint8 or packed.ndim not in (1,2):
+            raise ValueError('expected a buffer or a 1-D or 2-D numpy array of bytes')
+        if n_symbols is None:
+            n_symbols = packed.shape[-1] * 8 // self.symsize
+        if n_symbols > max_symbols:
+            raise ValueError(f'input data size {n_symbols} larger than max allowed {max_symbols}')
+        return unpack_symbols(packed,self.symsize,n_symbols)
+
+    def _packed_output(self,dat,res):
+        if type(dat) == bytes:
+            return res.tobytes()
+        elif type(dat) == bytearray:
+            return bytearray(res)
+        return res
+
+    def encode_packed(self,dat,n_symbols=None):
+        """
+        Encode a message given as a bitstream of packed symbols, see packing.py
+
+        input:
+        \tdat -- bytes, bytearray or other buffer with the packed message, or a 2-D numpy uint8
+        \t       array with one packed message per row, which are encoded as a batch
+        \tn_symbols -- number of message symbols. By default as many as fit in dat, which
+        \t             needs to be given when the padding of the last byte holds a whole symbol
 
-        if d_type == np.ndarray:
-            if n_symbols > self.total_size:
-                raise ValueError(f'input data size {n_symbols} larger than max allowed {self.message_size}')
-            self.data_buf[-n_symbols:] = dat.astype(self.dtype)            
-        elif d_type == list:
-            if n_symbols > self.total_size:
-                raise ValueError(f'input data size {n_symbols} larger than max allowed {self.message_size}')
-            self.data_buf[-n_symbols:] = np.array(dat,dtype=self.dtype)
-        elif d_type in [bytes, bytearray]:  
-            if self.symsize > 8:
-                n_symbols = n_symbols//2
+        returns:
+        \tdat+crc -- the packed codeword, as bytes or bytearray for those inputs and as a numpy
+        \t           uint8 array otherwise
+        """
 
-            if n_symbols > self.total_size:
-                raise ValueError(f'input data size {n_symbols} larger than max allowed {self.message_size}')
+        msg = self._packed_input(dat,n_symbols,self.message_size)
+        n_symbols = msg.shape[-1]
+        if n_symbols == 0:
+            raise ValueError('input data is empty, a message needs at least one symbol')
+        if msg.ndim == 2:
+            cw = np.empty((len(msg),n_symbols+self.par_size),dtype=self.dtype)
+            cw[:,:n_symbols] = msg
+            self.encode_batch(cw)
+        else:
+            cw = self._scratch.data_buf[:n_symbols+self.par_size]
+            cw[:n_symbols] = msg
+            self.encode_fast(cw)
 
-            self.data_buf[-n_symbols:] = np.frombuffer(dat,dtype=self.dtype)
+        return self._packed_output(dat,pack_symbols(cw,self.symsize))
 
-        self.data_buf[:self.total_size-n_symbols] = 0 # prepend with zeros when the input data is not message_size
+    def decode_packed(self,dat,n_symbols=None,erasures=None):
+        """
+        Decode a codeword given as a bitstream of packed symbols, see packing.py
+
+        input:
+        \tdat -- buffer with the packed codeword, or a 2-D numpy uint8 array with one packed
+        \t       codeword per row, which are decoded as a batch
+        \tn_symbols -- number of codeword symbols, by default as many as fit in dat
+        \terasures -- optional positions of lost symbols, see decode and decode_batch
 
+        returns:
+        \tdat -- the packed decoded message, in the type of encode_packed
+        \tnum_errors -- the number of errors or -EBADMSG (-74), an array for a batch
+        """
 
-        self.data_buf, n_errors = self.decode_fast(self.data_buf)
+        cw = self._packed_input(dat,n_symbols,self.total_size)
+        if cw.shape[-1] <= self.par_size:
+            raise ValueError(f'input data size {cw.shape[-1]} needs to be larger than the parity size {self.par_size}')
+        if cw.ndim == 2:
+            cw, n_errors = self.decode_batch(cw,erasures)
+        else:
+            cw, n_errors = self.decode_fast(cw,erasures)
 
-        if d_type == np.ndarray:
-            return self.data_buf[self.message_size - n_symbols + self.par_size :self.message_size], n_errors
-        elif d_type == bytes:
-            return self.data_buf[self.message_size - n_symbols + self.par_size:self.message_size].tobytes(), n_errors
-        elif d_type == bytearray:
-            return bytearray(self.data_buf[self.message_size - n_symbols + self.par_size:self.message_size].tobytes()) , n_errors
-        elif d_type == list:
-            return self.data_buf[self.message_size - n_symbols + self.par_size:self.message_size].tolist(), n_errors
+        return self._packed_output(dat,pack_symbols(cw[...,:-self.par_size],self.symsize)), n_errors
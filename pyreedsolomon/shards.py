@@ -0,0 +1,146 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : shards.py
+# Description        : Erasure coding of k data shards into m parity shards
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Erasure coding for storage: k equal-length data shards are protected by m = par_size
+parity shards
+
+Every symbol position across the k + m shards is one shortened codeword of k + m symbols,
+the data shards being the message and the parity shards the parity. As every codeword
+has the same known erasures, the code is solved once per call for a k x m matrix: the
+parity of each data shard for encoding, the lost shards in terms of k surviving ones for
+reconstruction. The shards are then combined with a single matrix product over the field
+(Reed_Solomon._field_matmul), which runs along the shards without transposing them.
+
+Shards are numpy arrays of the dtype of the codec, lists, or buffers like bytes, which hold
+one symbol per byte for symsize <= 8 and per 2 bytes in native byte order otherwise. A 2-D
+numpy array with one shard per row is used as is.
+"""
+
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 1 << 20 # symbol positions per matrix product
+
+
+def _shard_symbols(rs,shards):
+    """
+    Symbols of each shard and the common shard length
+    """
+    if isinstance(shards,np.ndarray) and shards.ndim == 2 and shards.dtype == rs.dtype:
+        return shards, shards.shape[1]
+
+    symbols = [rs._symbols(s) for s in shards]
+    lengths = {len(s) for s in symbols}
+    if len(lengths) != 1:
+        raise ValueError(f'all shards need to have the same length, got lengths {sorted(lengths)}')
+    return symbols, lengths.pop()
+
+
+def _block(rs,symbols,start,stop):
+    """
+    Positions start to stop of the shards as a 2-D array
+    """
+    if isinstance(symbols,np.ndarray) and symbols.strides[1] == symbols.itemsize:
+        return symbols[:,start:stop]
+    block = np.empty((len(symbols),stop-start),dtype=rs.dtype)
+    for i, s in enumerate(symbols):
+        block[i] = s[start:stop]
+    return block
+
+
+def _product(rs,symbols,length,coef,batch_size):
+    out = np.empty((coef.shape[1],length),dtype=rs.dtype)
+    for start in range(0,length,batch_size):
+        stop = min(start+batch_size,length)
+        rs._field_matmul(_block(rs,symbols,start,stop),coef,out[:,start:stop])
+    return out
+
+
+def encode_shards(rs,data_shards,batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Compute the parity shards of a set of data shards
+
+    input:
+    \trs -- Reed_Solomon instance. The number of data shards k can be at most message_size
+    \tdata_shards -- sequence of k shards of equal length, or a 2-D array with a shard per row
+    \tbatch_size -- number of symbol positions per matrix product
+
+    returns:
+    \tparity -- list of par_size numpy arrays with the parity shards
+    """
+
+    k = len(data_shards)
+    if not 0 < k <= rs.message_size:
+        raise ValueError(f'expected between 1 and {rs.message_size} data shards, got {k}')
+    symbols, length = _shard_symbols(rs,data_shards)
+
+    # the parity of a single 1 in each data shard
+    unit = np.zeros((k,k+rs.par_size),dtype=rs.dtype)
+    unit[:,:k] = np.eye(k,dtype=rs.dtype)
+    coef = np.ascontiguousarray(rs.encode_batch(unit)[:,k:],dtype=np.uint16)
+
+    return list(_product(rs,symbols,length,coef,batch_size))
+
+
+def reconstruct_shards(rs,shards,missing=None,batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Rebuild lost data and parity shards
+
+    input:
+    \trs -- Reed_Solomon instance, as used for encode_shards
+    \tshards -- sequence of the k data shards followed by the par_size parity shards, with None
+    \t          in place of the shards that are lost
+    \tmissing -- optional indices of further shards to rebuild, for example shards that are
+    \t           known to be corrupt
+    \tbatch_size -- number of symbol positions per matrix product
+
+    returns:
+    \tshards -- list of the k + par_size shards, where the lost shards are replaced by numpy
+    \t          arrays. The other shards are returned as they were given
+
+    Up to par_size shards can be rebuilt. They are computed from the first k shards that are
+    available, so errors in the available shards are not detected. Use decode_batch on the
+    codewords for that
+    """
+
+    n = len(shards)
+    k = n - rs.par_size
+    if not 0 < k <= rs.message_size:
+        raise ValueError(f'expected between {rs.par_size+1} and {rs.total_size} shards, got {n}')
+
+    lost = {i for i, s in enumerate(shards) if s is None}
+    if missing is not None:
+        missing = [int(i) for i in missing]
+        if any(not 0 <= i < n for i in missing):
+            raise ValueError(f'missing shard indices need to be between 0 and {n-1}')
+        lost.update(missing)
+    lost = sorted(lost)
+    if not lost:
+        return list(shards)
+    if len(lost) > rs.par_size:
+        raise ValueError(f'can rebuild at most {rs.par_size} shards, {len(lost)} are missing')
+
+    survivors = [i for i in range(n) if i not in lost][:k]
+    erased = np.array([i for i in range(n) if i not in survivors],dtype=np.intc)
+
+    # the codewords with a single 1 in one of the survivors, decoded from par_size erasures.
+    # The decoder only restores the message, the parity is computed from it
+    unit = np.zeros((k,n),dtype=rs.dtype)
+    unit[np.arange(k),survivors] = 1
+    _, n_errors = rs.decode_batch(unit,np.broadcast_to(erased,(k,len(erased))))
+    if np.any(n_errors < 0):
+        raise ValueError('the erasures could not be solved for the shards that are available')
+    rs.encode_batch(unit)
+    coef = np.ascontiguousarray(unit[:,lost],dtype=np.uint16)
+
+    symbols, length = _shard_symbols(rs,[shards[i] for i in survivors])
+    rebuilt = _product(rs,symbols,length,coef,batch_size)
+
+    shards = list(shards)
+    for i, r in zip(lost,rebuilt):
+        shards[i] = r
+    return shards
@@ -0,0 +1,217 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : simulation.py
+# Description        : Monte Carlo simulation of frame and bit error rates
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Monte Carlo channel simulator, for the frame and bit error rates of a code over a channel
+
+Codewords are generated, passed through a channel model and decoded in batches, each batch
+in a thread of a pool: numpy releases the GIL while generating the errors and the library
+while coding, so the batches run concurrently. Every batch draws from its own random
+generator, spawned from a single SeedSequence, so a run is reproducible from its seed
+regardless of the number of threads.
+
+A channel is a function channel(rs, dat, p, rng, **kwargs) that corrupts the (N, total_size)
+array dat in place at error probability p, drawing from the numpy Generator rng. It returns
+the erasure positions for decode_batch, or None. The models below draw the number of events
+from a binomial distribution and then only their positions, so a batch costs time in the
+number of errors rather than in the number of symbols:
+
+    symbol_errors -- every symbol is replaced by a different random value with probability p
+    bit_errors -- every bit is flipped with probability p
+    burst_errors -- a burst of length random symbols starts at every symbol with probability p
+    erasures -- every symbol is erased with probability p, and its position handed to the decoder
+
+The code is linear, so whether a pattern of errors is corrected does not depend on the
+codeword. With random_messages=False the all-zero codeword is sent, which saves generating
+and encoding the messages.
+"""
+
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+Result = namedtuple('Result',['p','n_codewords','frame_errors','bit_errors','failed','fer','ber'])
+
+
+def _positions(rng,size,p):
+    """
+    Sorted distinct positions among size, each of them drawn with probability p
+    """
+    k = rng.binomial(size,p)
+    pos = rng.choice(size,k,replace=False,shuffle=False) if k else np.zeros(0,dtype=np.int64)
+    pos.sort()
+    return pos
+
+
+def _corrupt(rs,flat,pos,rng):
+    """
+    Add a random nonzero error to the symbols at pos of flat
+    """
+    flat[pos] ^= rng.integers(1,1 << rs.symsize,len(pos),dtype=flat.dtype)
+
+
+def symbol_errors(rs,dat,p,rng):
+    """
+    Symbol error channel: every symbol is wrong with probability p, with an error value
+    that is uniform over the nonzero symbols
+    """
+    flat = dat.reshape(-1)
+    _corrupt(rs,flat,_positions(rng,flat.size,p),rng)
+
+
+def bit_errors(rs,dat,p,rng):
+    """
+    Binary symmetric channel: every bit of a symbol is flipped with probability p
+    """
+    flat = dat.reshape(-1)
+    pos = _positions(rng,flat.size * rs.symsize,p)
+    # several bits of a symbol can flip
+    np.bitwise_xor.at(flat,pos // rs.symsize,(1 << (pos % rs.symsize)).astype(flat.dtype))
+
+
+def burst_errors(rs,dat,p,rng,length=None):
+    """
+    Burst channel: a burst starts at every symbol with probability p and replaces the
+    following length symbols (default par_size) of the codeword with random wrong values.
+    Bursts are cut at the end of a codeword and may overlap
+    """
+    if length is None:
+        length = rs.par_size
+    flat = dat.reshape(-1)
+    n = dat.shape[1]
+    starts = _positions(rng,flat.size,p)
+    pos = starts[:,None] + np.arange(length)
+    pos = np.unique(pos[pos // n == (starts // n)[:,None]])
+    _corrupt(rs,flat,pos,rng)
+
+
+def erasures(rs,dat,p,rng):
+    """
+    Erasure channel: every symbol is lost with probability p. Erased symbols get a random
+    wrong value, so a failed decoding leaves a wrong message also for the all-zero codeword,
+    and their positions are returned, padded with -1
+    """
+    flat = dat.reshape(-1)
+    n = dat.shape[1]
+    pos = _positions(rng,flat.size,p)
+    _corrupt(rs,flat,pos,rng)
+
+    rows = pos // n
+    counts = np.bincount(rows,minlength=len(dat))
+    eras = np.full((len(dat),max(counts.max(initial=0),1)),-1,dtype=np.intc)
+    # pos is sorted, so the erasures of a row are consecutive
+    rank = np.arange(len(pos)) - np.repeat(np.cumsum(counts) - counts,counts)
+    eras[rows,rank] = pos % n
+    return eras
+
+
+CHANNELS = {
+    'symbol': symbol_errors,
+    'bit': bit_errors,
+    'burst': burst_errors,
+    'erasure': erasures,
+}
+
+
+def _popcount(dat):
+    if hasattr(np,'bitwise_count'):
+        return int(np.bitwise_count(dat).sum())
+    return int(np.unpackbits(np.ascontiguousarray(dat).view(np.uint8)).sum())
+
+
+def _run_batch(rs,channel,p,n_codewords,seed,random_messages,kwargs):
+    """
+    Send a batch of codewords through the channel and decode them
+
+    returns the number of wrong messages, wrong message bits and failed decodings
+    """
+    rng = np.random.default_rng(seed)
+    k = rs.message_size
+    dat = np.zeros((n_codewords,rs.total_size),dtype=rs.dtype)
+    if random_messages:
+        dat[:,:k] = rng.integers(0,1 << rs.symsize,(n_codewords,k),dtype=rs.dtype)
+        rs.encode_batch(dat)
+        msg = dat[:,:k].copy()
+
+    eras = channel(rs,dat,p,rng,**kwargs)
+    _, n_errors = rs.decode_batch(dat,eras)
+
+    # failed decodings and miscorrections both leave a wrong message
+    diff = dat[:,:k] ^ msg if random_messages else dat[:,:k]
+    wrong = diff[np.any(diff,axis=1)]
+    return len(wrong), _popcount(wrong), int(np.count_nonzero(n_errors < 0))
+
+
+def simulate(rs,channel,probabilities,n_codewords,batch_size=4096,n_threads=None,seed=None,
+             max_frame_errors=None,random_messages=True,**kwargs):
+    """
+    Frame and bit error rates after decoding, for a range of channel error probabilities
+
+    input:
+    \trs -- Reed_Solomon instance to code with
+    \tchannel -- name of a channel model in CHANNELS, or a function, see the module docstring
+    \tprobabilities -- channel error probabilities to simulate
+    \tn_codewords -- number of codewords to send at each probability
+    \tbatch_size -- number of codewords generated and decoded at once
+    \tn_threads -- number of batches in flight, defaults to the number of cpus
+    \tseed -- seed of the random generators, an int or None for a fresh run
+    \tmax_frame_errors -- stop a probability early once this many frames were wrong, which
+    \t                    is all the accuracy a high error rate needs
+    \trandom_messages -- send random messages, or the all-zero codeword when False
+    \tkwargs -- passed on to the channel, such as the length of burst_errors
+
+    returns:
+    \tresults -- a Result for each probability: the number of codewords sent, of wrong
+    \t           messages and message bits after decoding, of failed decodings (-EBADMSG),
+    \t           and the frame and bit error rates. Miscorrections count as frame errors but
+    \t           not as failures, and failures with errors in the parity only not as frame errors
+    """
+    if isinstance(channel,str):
+        if channel not in CHANNELS:
+            raise ValueError(f"unknown channel '{channel}', expected one of {', '.join(CHANNELS)}")
+        channel = CHANNELS[channel]
+    if n_codewords < 1:
+        raise ValueError(f'the number of codewords needs to be at least 1, got {n_codewords}')
+    if n_threads is None:
+        n_threads = os.cpu_count() or 1
+
+    n_batches = -(-n_codewords // batch_size)
+    sizes = [batch_size] * (n_batches - 1) + [n_codewords - batch_size * (n_batches - 1)]
+    seeds = np.random.SeedSequence(seed).spawn(len(probabilities))
+
+    results = []
+    with ThreadPoolExecutor(n_threads) as executor:
+        for p, seed_p in zip(probabilities,seeds):
+            batches = zip(sizes,seed_p.spawn(n_batches))
+            pending = deque()
+            sent = frame_errors = bits = failed = 0
+            while True:
+                # keep every thread busy, without queueing the whole run
+                for size, s in batches:
+                    pending.append((size,executor.submit(_run_batch,rs,channel,p,size,s,
+                                                         random_messages,kwargs)))
+                    if len(pending) >= 2 * n_threads:
+                        break
+                if not pending:
+                    break
+                size, future = pending.popleft()
+                n_wrong, n_bits, n_failed = future.result()
+                sent += size
+                frame_errors += n_wrong
+                bits += n_bits
+                failed += n_failed
+                if max_frame_errors is not None and frame_errors >= max_frame_errors:
+                    for _, future in pending:
+                        future.cancel()
+                    break
+
+            n_bits_sent = sent * rs.message_size * rs.symsize
+            results.append(Result(p,sent,frame_errors,bits,failed,frame_errors / max(sent,1),
+                                  bits / max(n_bits_sent,1)))
+    return results
@@ -0,0 +1,170 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : stream.py
+# Description        : Streaming encoder and decoder for file-like objects
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Encode and decode streams of arbitrary length with a fixed memory budget
+
+The input is read in chunks of batch_size codewords, which are encoded or decoded with
+a single call to the library. The encoded stream is a plain sequence of codewords of
+total_size symbols. The last codeword is shortened to the length of the remaining data,
+so the decoder recognises it by the end of the stream.
+
+Symbols are stored in their native byte order, 1 byte per symbol for symsize 8 and 2 bytes
+per symbol for symsize 16. Sockets can be used through socket.makefile('rb') / ('wb').
+"""
+
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 1024 # codewords per call to the library
+
+
+def _symbol_bytes(rs):
+    """
+    number of bytes in the stream for each symbol
+    """
+    if rs.symsize == 8:
+        return 1
+    elif rs.symsize == 16:
+        return 2
+    raise ValueError(f'streaming raw bytes requires a symsize of 8 or 16, got {rs.symsize}')
+
+
+def _read(reader,buf):
+    """
+    Fill the numpy array buf from reader. Returns the number of bytes read, which is only
+    less than buf.nbytes at the end of the stream
+    """
+    view = memoryview(buf).cast('B')
+    n_read = 0
+    while n_read < len(view):
+        if hasattr(reader,'readinto'):
+            n = reader.readinto(view[n_read:])
+        else:
+            data = reader.read(len(view) - n_read)
+            n = len(data)
+            view[n_read:n_read+n] = data
+        if not n:
+            break
+        n_read += n
+    return n_read
+
+
+def _n_symbols(n_bytes,sym_bytes):
+    if n_bytes % sym_bytes:
+        raise ValueError(f'the stream length is not a multiple of the symbol size ({sym_bytes} bytes)')
+    return n_bytes // sym_bytes
+
+
+def iter_encode(rs,reader,batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Generator that encodes the data read from reader
+
+    input:
+    \trs -- Reed_Solomon instance
+    \treader -- file-like object with a read or readinto method
+    \tbatch_size -- number of codewords to encode per call to the library
+
+    yields:
+    \tmemoryview with the encoded bytes. The view points in a buffer that is reused, so it is
+    \tonly valid until the next item is requested
+    """
+
+    sym_bytes = _symbol_bytes(rs)
+    msg = np.empty((batch_size,rs.message_size),dtype=rs.dtype)
+    cw = np.empty((batch_size,rs.total_size),dtype=rs.dtype)
+
+    while True:
+        n_bytes = _read(reader,msg)
+        n_full, rest = divmod(_n_symbols(n_bytes,sym_bytes),rs.message_size)
+
+        if n_full:
+            cw[:n_full,:rs.message_size] = msg[:n_full]
+            rs.encode_batch(cw[:n_full])
+            yield memoryview(cw[:n_full]).cast('B')
+
+        if rest:
+            # the end of the stream, encoded as a shortened codeword
+            last = cw[0,:rest+rs.par_size]
+            last[:rest] = msg[n_full,:rest]
+            rs.encode_fast(last)
+            yield memoryview(last).cast('B')
+
+        if n_bytes < msg.nbytes:
+            return
+
+
+def iter_decode(rs,reader,batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Generator that decodes a stream produced by iter_encode/encode_stream
+
+    input:
+    \trs -- Reed_Solomon instance
+    \treader -- file-like object with a read or readinto method
+    \tbatch_size -- number of codewords to decode per call to the library
+
+    yields:
+    \tdata -- memoryview with the decoded bytes, only valid until the next item is requested
+    \tn_errors -- int array with the number of corrected symbols or -EBADMSG (-74) for each
+    \t            codeword. Codewords that failed are passed on as received
+    """
+
+    sym_bytes = _symbol_bytes(rs)
+    cw = np.empty((batch_size,rs.total_size),dtype=rs.dtype)
+    msg = np.empty((batch_size,rs.message_size),dtype=rs.dtype)
+
+    while True:
+        n_bytes = _read(reader,cw)
+        n_full, rest = divmod(_n_symbols(n_bytes,sym_bytes),rs.total_size)
+
+        if n_full:
+            _, n_errors = rs.decode_batch(cw[:n_full])
+            msg[:n_full] = cw[:n_full,:rs.message_size]
+            yield memoryview(msg[:n_full]).cast('B'), n_errors
+
+        if rest:
+            if rest <= rs.par_size:
+                raise ValueError(f'the stream ends with a truncated codeword of {rest} symbols')
+            last, n_errors = rs.decode_fast(cw[n_full,:rest])
+            yield memoryview(last[:-rs.par_size]).cast('B'), np.array([n_errors],dtype=np.intc)
+
+        if n_bytes < cw.nbytes:
+            return
+
+
+def encode_stream(rs,reader,writer,batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Encode everything read from reader and write the codewords to writer
+
+    Memory use is bounded by batch_size codewords, regardless of the length of the stream
+
+    returns the number of codewords written
+    """
+
+    n_codewords = 0
+    for chunk in iter_encode(rs,reader,batch_size):
+        writer.write(chunk)
+        n_codewords += -(-len(chunk) // (rs.total_size * _symbol_bytes(rs)))
+    return n_codewords
+
+
+def decode_stream(rs,reader,writer,batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Decode the codewords read from reader and write the data to writer
+
+    returns:
+    \tn_codewords -- number of codewords decoded
+    \tn_corrected -- total number of corrected symbols
+    \tn_failed -- number of codewords that could not be corrected
+    """
+
+    n_codewords = n_corrected = n_failed = 0
+    for chunk, n_errors in iter_decode(rs,reader,batch_size):
+        writer.write(chunk)
+        n_codewords += len(n_errors)
+        n_corrected += int(n_errors[n_errors > 0].sum())
+        n_failed += int(np.count_nonzero(n_errors < 0))
+    return n_codewords, n_corrected, n_failed
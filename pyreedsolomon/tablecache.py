@@ -0,0 +1,155 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : tablecache.py
+# Description        : On-disk cache of the numpy tables of fields and codes
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Persistent cache of the tables built in numpy (see _Tables in numpy_backend.py)
+
+Building the log/antilog tables of GF(2^16) and the parity of every message position takes
+Python loops over tens of thousands of entries, and the tables of a long code run into
+hundreds of MB. Every table is therefore stored once per host as a .npy file and
+memory-mapped read-only, so a new process constructs its codec without rebuilding them and
+all processes share the same physical pages.
+
+Files live in PYREEDSOLOMON_TABLE_CACHE, by default $XDG_CACHE_HOME/pyreedsolomon or
+~/.cache/pyreedsolomon, in a directory per field or code. Setting the variable to 0 or to an
+empty string disables the cache. Tables indexed by position are stored with enough rows for
+the longest codeword asked for so far, and grown when a longer one comes along. Files are
+written under a unique temporary name and renamed, so concurrent threads and processes never
+see a partial table. The content of a file is checked against its CRC-32 once, when it is
+written, and a small .meta file next to it records that CRC-32 and the size of the file. A
+load only compares the size and parses the header, so mapping a table does not read all of
+it, and a file that is truncated, has a damaged header or no .meta is rebuilt. Setting
+PYREEDSOLOMON_TABLE_CACHE_VERIFY to 1 also checks the CRC-32 on every load, which reads the
+whole table. When the directory can not be written the tables are simply kept in memory.
+"""
+
+import os
+import shutil
+import tempfile
+import zlib
+import numpy as np
+
+TABLE_VERSION = 3 # bump when the content of the tables or the format of the files changes
+
+
+def cache_dir():
+    """
+    Directory of the cache, or None when it is disabled
+    """
+    path = os.environ.get('PYREEDSOLOMON_TABLE_CACHE')
+    if path is None:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'),'.cache')
+        path = os.path.join(base,'pyreedsolomon')
+    elif path in ('','0'):
+        return None
+    return os.path.join(path,f'v{TABLE_VERSION}')
+
+
+def clear():
+    """
+    Remove all cached tables. Processes that have them mapped keep their copy
+    """
+    path = cache_dir()
+    if path is not None:
+        shutil.rmtree(path,ignore_errors=True)
+
+
+def _checksum(table):
+    return zlib.crc32(np.ascontiguousarray(table).view(np.uint8))
+
+
+def _verify():
+    return os.environ.get('PYREEDSOLOMON_TABLE_CACHE_VERIFY','0') not in ('','0')
+
+
+def _open(path,n_rows):
+    try:
+        with open(f'{path}.meta') as f:
+            crc, size = f.read().split()
+        if os.stat(path).st_size != int(size):
+            return None
+        table = np.load(path,mmap_mode='r',allow_pickle=False)
+    except (OSError,ValueError):
+        return None
+    if len(table) < n_rows or (_verify() and _checksum(table) != int(crc,16)):
+        return None
+    return table
+
+
+def _write(path,save,check=None):
+    """
+    Write a file through save(f) under a unique temporary name, and rename it to path
+
+    input:
+    \tpath -- name of the file
+    \tsave -- function writing the content to the open file f
+    \tcheck -- optional function of the name of the written temporary file, called before it
+    \t         is renamed. It raises OSError to drop the file
+
+    returns:
+    \tthe result of check
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path),suffix='.tmp')
+    try:
+        os.fchmod(fd,0o644)
+        with os.fdopen(fd,'wb') as f:
+            save(f)
+        res = check(tmp) if check is not None else None
+        os.replace(tmp,path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return res
+
+
+def _store(path,table):
+    crc = _checksum(table)
+    def check(tmp):
+        # the only time the whole file is read back, see _open
+        if _checksum(np.load(tmp,mmap_mode='r',allow_pickle=False)) != crc:
+            raise OSError(f'{tmp} does not read back as written')
+        return os.stat(tmp).st_size
+
+    try:
+        os.makedirs(os.path.dirname(path),exist_ok=True)
+        size = _write(path,lambda f: np.save(f,table,allow_pickle=False),check)
+        _write(f'{path}.meta',lambda f: f.write(b'%08x %d' % (crc,size)))
+    except OSError:
+        return False
+    return True
+
+
+def load(key,name,n_rows,build):
+    """
+    Table of the cache, built on a miss
+
+    input:
+    \tkey -- name of the directory of the field or code, made from its parameters
+    \tname -- name of the table
+    \tn_rows -- number of rows needed
+    \tbuild -- function of n_rows returning the table when it is not cached, or has too few rows
+
+    returns:
+    \ttable -- read-only numpy array of at least n_rows rows. Memory-mapped from the cache when
+    \t         it is enabled and writable
+    """
+    if cache_dir() is None:
+        return build(n_rows)
+    path = os.path.join(cache_dir(),key,f'{name}.npy')
+
+    table = _open(path,n_rows)
+    if table is None:
+        table = build(n_rows)
+        # map the stored copy, which other processes share
+        mapped = _open(path,n_rows) if _store(path,table) else None
+        if mapped is not None:
+            table = mapped
+    table.flags.writeable = False
+    return table
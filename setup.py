@@ -24,14 +24,16 @@ check_git_submodules()
 open('reed-solomon/src/config.h', 'a').close()
 
 
-reed_solomon = setuptools.Extension('librs',
+# the library and its python entry points (src/rs_module.c) in one extension module
+reed_solomon = setuptools.Extension('pyreedsolomon._librs',
                                     define_macros = [
                                         ('CONFIG_REED_SOLOMON_ENC8','1'),
                                         ('CONFIG_REED_SOLOMON_DEC8','1'),
                                         ('CONFIG_REED_SOLOMON_ENC16','1'),
                                         ('CONFIG_REED_SOLOMON_DEC16','1')
                                     ],
-                                    sources = ['reed-solomon/src/rs_codec.cc','reed-solomon/src/reed_solomon.c'])
+                                    sources = ['reed-solomon/src/rs_codec.cc','reed-solomon/src/reed_solomon.c',
+                                               'src/rs_batch.c','src/rs_module.c','src/rs_simd.c','src/rs_fft.c'])
 
 
 with open("README.md", "r") as fh:
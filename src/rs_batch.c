@@ -0,0 +1,209 @@
+/*
+ * Original Author    : Edwin G. W. Peters @ epeters
+ * ------------------------------------------------------------------------------
+ * File Name          : rs_batch.c
+ * Description        : Batched entry points on top of the reed-solomon library
+ * ------------------------------------------------------------------------------
+ * Copyright          : License GPL3
+ * ------------------------------------------------------------------------------
+ *
+ * Loops over the rows of a 2-D codeword array inside the library, such that a
+ * whole frame of codewords costs a single call from python.
+ *
+ * data     - pointer to the first symbol of the first codeword
+ * n_rows   - number of codewords
+ * stride   - distance between the start of two codewords in symbols
+ * step     - distance between two symbols of a codeword, 1 for contiguous
+ *            codewords. With a depth I interleaved frame, codeword n starts
+ *            at symbol n and has a step of I
+ * len      - number of message symbols in each codeword
+ * nroots   - number of parity symbols, stored after the message
+ *
+ * The library takes contiguous messages, so with a step other than 1 the
+ * message of each codeword is gathered into a buffer of a single codeword and
+ * only the corrected symbols are written back.
+ */
+
+#include <errno.h>
+#include <stddef.h>
+#include <stdint.h>
+#include <stdlib.h>
+
+#include "rs_fft.h"
+
+struct rs_control;
+
+int encode_rs8(struct rs_control *rs, uint8_t *data, int len, uint16_t *par,
+	       uint16_t invmsk);
+int decode_rs8(struct rs_control *rs, uint8_t *data, uint16_t *par, int len,
+	       uint16_t *s, int no_eras, int *eras_pos, uint16_t invmsk,
+	       uint16_t *corr);
+int encode_rs16(struct rs_control *rs, uint16_t *data, int len, uint16_t *par,
+		uint16_t invmsk);
+int decode_rs16(struct rs_control *rs, uint16_t *data, uint16_t *par, int len,
+		uint16_t *s, int no_eras, int *eras_pos, uint16_t invmsk,
+		uint16_t *corr);
+
+/* msg is the message of row, or a copy of it in buf when buf is not NULL */
+#define GATHER(msg, buf, row, step, len)				\
+do {									\
+	int _i;								\
+									\
+	msg = row;							\
+	if (buf) {							\
+		for (_i = 0; _i < (len); _i++)				\
+			(buf)[_i] = (row)[(long)_i * (step)];		\
+		msg = buf;						\
+	}								\
+} while (0)
+
+#define NEW_BUF(dtype, step, len)					\
+	((step) != 1 ? malloc(sizeof(dtype) * ((len) > 0 ? (len) : 1)) : NULL)
+
+#define ENCODE_BATCH(name, encode, dtype)				\
+int name(struct rs_control *rs, dtype *data, int n_rows, int stride,	\
+	 int step, int len, int nroots)					\
+{									\
+	uint16_t par[nroots];						\
+	dtype *row, *msg, *buf = NEW_BUF(dtype, step, len);		\
+	int n, i, ret = 0;						\
+									\
+	if (step != 1 && !buf)						\
+		return -ENOMEM;						\
+	for (n = 0; n < n_rows; n++) {					\
+		row = data + (long)n * stride;				\
+		GATHER(msg, buf, row, step, len);			\
+		for (i = 0; i < nroots; i++)				\
+			par[i] = 0;					\
+		ret = encode(rs, msg, len, par, 0);			\
+		if (ret < 0)						\
+			break;						\
+		for (i = 0; i < nroots; i++)				\
+			row[(long)(len + i) * step] = (dtype)par[i];	\
+	}								\
+	free(buf);							\
+	return ret;							\
+}
+
+/*
+ * eras       - erasure positions of row n start at eras + n * eras_stride, or NULL
+ * no_eras    - number of erasures of each row
+ * n_errors   - receives the number of corrected symbols of each row or -EBADMSG
+ * offsets    - when not NULL, the corrections are reported in compressed sparse
+ *              row form: the positions and values of row n are stored in
+ *              err_pos and err_val from offsets[n] up to offsets[n + 1]. Both
+ *              need room for n_rows * nroots entries
+ * skip       - when not NULL, rows with skip[n] set are known to have zero
+ *              syndromes and are reported as clean without decoding them
+ *
+ * decode_rs16_fft_batch decodes with rs_fft_decode, see rs_fft.c
+ *
+ * Returns the number of rows that failed to decode, or -ENOMEM.
+ */
+#define DECODE_BATCH(name, decode, ctl, dtype)				\
+int name(ctl *rs, dtype *data, int n_rows, int stride, int step,	\
+	 int len, int nroots, int *eras, int eras_stride, int *no_eras,	\
+	 int *n_errors, int *offsets, int *err_pos, uint16_t *err_val,	\
+	 const uint8_t *skip)						\
+{									\
+	uint16_t par[nroots];						\
+	uint16_t corr[nroots];						\
+	int eras_pos[nroots];						\
+	dtype *row, *msg, *buf = NEW_BUF(dtype, step, len);		\
+	int n, i, k, p, n_failed = 0;					\
+									\
+	if (step != 1 && !buf)						\
+		return -ENOMEM;						\
+	if (offsets)							\
+		offsets[0] = 0;						\
+	for (n = 0; n < n_rows; n++) {					\
+		row = data + (long)n * stride;				\
+		k = eras ? no_eras[n] : 0;				\
+		if (k > nroots) {					\
+			n_errors[n] = -EBADMSG;				\
+			goto next;					\
+		}							\
+		if (skip && skip[n]) {					\
+			n_errors[n] = 0;				\
+			goto next;					\
+		}							\
+		/* the decoder overwrites eras_pos with the error locations */ \
+		for (i = 0; i < k; i++)					\
+			eras_pos[i] = eras[(long)n * eras_stride + i];	\
+		for (i = 0; i < nroots; i++) {				\
+			par[i] = row[(long)(len + i) * step];		\
+			corr[i] = 0;					\
+		}							\
+		GATHER(msg, buf, row, step, len);			\
+		if (!offsets) {						\
+			/* the error locations tell what to write back */ \
+			n_errors[n] = decode(rs, msg, par, len, NULL, k,	\
+					     k || buf ? eras_pos : NULL, 0, \
+					     NULL);			\
+			for (i = 0; buf && i < n_errors[n]; i++) {	\
+				p = eras_pos[i];			\
+				if (p >= 0 && p < len)			\
+					row[(long)p * step] = buf[p];	\
+			}						\
+			goto next;					\
+		}							\
+		/* with corr, the decoder reports instead of corrects */ \
+		n_errors[n] = decode(rs, msg, par, len, NULL, k,	\
+				     eras_pos, 0, corr);		\
+		for (i = 0; i < n_errors[n]; i++) {			\
+			p = eras_pos[i];				\
+			if (p >= 0 && p < len)				\
+				row[(long)p * step] ^= corr[i];		\
+			err_pos[offsets[n] + i] = p;			\
+			err_val[offsets[n] + i] = corr[i];		\
+		}							\
+	next:								\
+		if (n_errors[n] < 0)					\
+			n_failed++;					\
+		if (offsets)						\
+			offsets[n + 1] = offsets[n] +			\
+				(n_errors[n] > 0 ? n_errors[n] : 0);	\
+	}								\
+	free(buf);							\
+	return n_failed;						\
+}
+
+/*
+ * A codeword is valid when the parity recomputed from its message matches the
+ * stored parity, which is the same as all syndromes being zero. clean[n] is set
+ * to 1 for the valid codewords. Returns the number of valid codewords, or
+ * -ENOMEM.
+ */
+#define CHECK_BATCH(name, encode, dtype)				\
+int name(struct rs_control *rs, dtype *data, int n_rows, int stride,	\
+	 int step, int len, int nroots, uint8_t *clean)		\
+{									\
+	uint16_t par[nroots];						\
+	dtype *row, *msg, *buf = NEW_BUF(dtype, step, len);		\
+	int n, i, n_clean = 0;						\
+									\
+	if (step != 1 && !buf)						\
+		return -ENOMEM;						\
+	for (n = 0; n < n_rows; n++) {					\
+		row = data + (long)n * stride;				\
+		GATHER(msg, buf, row, step, len);			\
+		for (i = 0; i < nroots; i++)				\
+			par[i] = 0;					\
+		encode(rs, msg, len, par, 0);				\
+		for (i = 0; i < nroots; i++)				\
+			if (par[i] != row[(long)(len + i) * step])	\
+				break;					\
+		clean[n] = (i == nroots);				\
+		n_clean += clean[n];					\
+	}								\
+	free(buf);							\
+	return n_clean;							\
+}
+
+ENCODE_BATCH(encode_rs8_batch, encode_rs8, uint8_t)
+ENCODE_BATCH(encode_rs16_batch, encode_rs16, uint16_t)
+DECODE_BATCH(decode_rs8_batch, decode_rs8, struct rs_control, uint8_t)
+DECODE_BATCH(decode_rs16_batch, decode_rs16, struct rs_control, uint16_t)
+DECODE_BATCH(decode_rs16_fft_batch, rs_fft_decode, struct rs_fft, uint16_t)
+CHECK_BATCH(check_rs8_batch, encode_rs8, uint8_t)
+CHECK_BATCH(check_rs16_batch, encode_rs16, uint16_t)
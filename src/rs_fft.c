@@ -0,0 +1,437 @@
+/*
+ * Original Author    : Edwin G. W. Peters @ epeters
+ * ------------------------------------------------------------------------------
+ * File Name          : rs_fft.c
+ * Description        : Decoder for long codes with additive FFTs
+ * ------------------------------------------------------------------------------
+ * Copyright          : License GPL3
+ * ------------------------------------------------------------------------------
+ *
+ * decode_rs16 evaluates the syndromes with Horner's rule, nroots products per
+ * symbol, and finds the roots of the error locator by trying all nn field
+ * elements, deg(lambda) products each. For a code of tens of thousands of
+ * symbols and hundreds of parity symbols both take tens of millions of field
+ * products per codeword, while Berlekamp-Massey and Forney only take
+ * O(nroots^2).
+ *
+ * Here both evaluations are a single additive FFT (Gao and Mateer, "Additive
+ * fast Fourier transforms over finite fields", 2010), which evaluates a
+ * polynomial at all 2^symsize elements of the field in O(n log^2 n) additions
+ * and O(n log n) products. The syndromes are then read off at the roots of the
+ * generator polynomial, and the error locations at the zeros of lambda. An
+ * FFT of the short error locator stops as soon as the pieces are constants.
+ *
+ * Berlekamp-Massey and Forney are those of the library, step by step, so the
+ * corrections, the error counts and the -EBADMSG cases are the same as those of
+ * decode_rs16.
+ *
+ * The FFT works on the basis 1, alpha, ..., alpha^(symsize-1) of the field,
+ * which puts the value at the element with integer representation k at index
+ * k. Each level of the recursion divides the basis by its last element b and
+ * maps it through x^2 + x. The logs of b and of the subset sums of the divided
+ * basis are computed once per codec.
+ */
+
+#include <errno.h>
+#include <stdlib.h>
+#include <string.h>
+
+#include "rs_fft.h"
+
+#define RS_FFT_MAX_M 16
+
+struct rs_fft {
+	int mm;
+	int nn;
+	int nroots;
+	int fcr;
+	int prim;
+	int iprim;
+	uint16_t *alpha_to;	/* as in the library, alpha_to[nn] = 0 */
+	uint16_t *index_of;	/* index_of[0] = nn */
+	uint16_t *exp;		/* alpha^(i mod nn) for i < 2 * nn */
+	uint16_t beta[RS_FFT_MAX_M + 1];	/* log of the last basis element */
+	uint16_t *g[RS_FFT_MAX_M + 1];	/* log of the subset sums, nn for 0 */
+};
+
+static inline int modnn(const struct rs_fft *f, int x)
+{
+	while (x >= f->nn) {
+		x -= f->nn;
+		x = (x >> f->mm) + (x & f->nn);
+	}
+	return x;
+}
+
+/* a times alpha^lb, for lb < nn */
+static inline uint16_t mul_log(const struct rs_fft *f, uint16_t a, int lb)
+{
+	return a ? f->exp[f->index_of[a] + lb] : 0;
+}
+
+void rs_fft_free(struct rs_fft *f)
+{
+	int i;
+
+	if (!f)
+		return;
+	free(f->alpha_to);
+	free(f->index_of);
+	free(f->exp);
+	for (i = 0; i <= RS_FFT_MAX_M; i++)
+		free(f->g[i]);
+	free(f);
+}
+
+static int fft_tables(struct rs_fft *f)
+{
+	uint16_t basis[RS_FFT_MAX_M], gamma[RS_FFT_MAX_M];
+	int L, i, j, half;
+	uint16_t *g;
+
+	for (j = 0; j < f->mm; j++)
+		basis[j] = 1 << j;
+
+	for (L = f->mm; L >= 1; L--) {
+		half = 1 << (L - 1);
+		f->beta[L] = f->index_of[basis[L - 1]];
+		for (j = 0; j < L - 1; j++)
+			gamma[j] = f->exp[f->index_of[basis[j]] + f->nn -
+					  f->beta[L]];
+
+		g = f->g[L] = malloc(sizeof(uint16_t) * half);
+		if (!g)
+			return -1;
+		/* subset sums, each from the one without its lowest bit */
+		g[0] = 0;
+		for (i = 1; i < half; i++)
+			g[i] = g[i & (i - 1)] ^ gamma[__builtin_ctz(i)];
+		for (i = 0; i < half; i++)
+			g[i] = f->index_of[g[i]];
+
+		/* the basis of the next level, gamma^2 + gamma */
+		for (j = 0; j < L - 1; j++)
+			basis[j] = mul_log(f, gamma[j], f->index_of[gamma[j]]) ^
+				   gamma[j];
+	}
+	return 0;
+}
+
+struct rs_fft *rs_fft_new(int symsize, int gfpoly, int fcr, int prim,
+			  int nroots)
+{
+	struct rs_fft *f;
+	int i, sr = 1, iprim;
+
+	if (symsize <= 8 || symsize > RS_FFT_MAX_M)
+		return NULL;
+	f = calloc(1, sizeof(*f));
+	if (!f)
+		return NULL;
+	f->mm = symsize;
+	f->nn = (1 << symsize) - 1;
+	f->nroots = nroots;
+	f->fcr = fcr;
+	f->prim = prim;
+
+	f->alpha_to = malloc(sizeof(uint16_t) * (f->nn + 1));
+	f->index_of = malloc(sizeof(uint16_t) * (f->nn + 1));
+	f->exp = malloc(sizeof(uint16_t) * 2 * f->nn);
+	if (!f->alpha_to || !f->index_of || !f->exp)
+		goto fail;
+	f->index_of[0] = f->nn;
+	f->alpha_to[f->nn] = 0;
+	for (i = 0; i < f->nn; i++) {
+		f->index_of[sr] = i;
+		f->alpha_to[i] = sr;
+		f->exp[i] = f->exp[i + f->nn] = sr;
+		sr <<= 1;
+		if (sr & (1 << symsize))
+			sr ^= gfpoly;
+		sr &= f->nn;
+	}
+	if (sr != 1)
+		goto fail;
+
+	/* prim-th root of 1, index form */
+	for (iprim = 1; (iprim % prim) != 0; iprim += f->nn)
+		;
+	f->iprim = iprim / prim;
+
+	if (fft_tables(f) < 0)
+		goto fail;
+	return f;
+
+fail:
+	rs_fft_free(f);
+	return NULL;
+}
+
+/*
+ * Coefficients to the Taylor expansion at x^2 + x: on return the pairs
+ * p[2i], p[2i + 1] are the coefficients of (x^2 + x)^i and x (x^2 + x)^i. n is
+ * a power of 2. With n = 4s, x^(2s) = (x^2 + x)^s + x^s splits p in two halves
+ * of 2s coefficients, which are expanded on their own
+ */
+static void taylor(uint16_t *p, int n)
+{
+	int s = n / 4, i;
+
+	if (n <= 2)
+		return;
+	for (i = 0; i < s; i++)
+		p[2 * s + i] ^= p[3 * s + i];
+	for (i = 0; i < s; i++)
+		p[s + i] ^= p[2 * s + i];
+	taylor(p, n / 2);
+	taylor(p + n / 2, n / 2);
+}
+
+/*
+ * Evaluate the polynomial with the n coefficients in p at the 2^L subset sums
+ * of the basis of level L, p[k] receives the value at the sum selected by the
+ * bits of k. p holds 2^L entries which are zero from n on, tmp at least
+ * 2^(L - 1)
+ */
+static void fft(const struct rs_fft *f, uint16_t *p, int L, int n,
+		uint16_t *tmp)
+{
+	int half, size, i, k;
+	const uint16_t *g;
+	uint16_t v;
+
+	if (n <= 1) {
+		for (i = 1; i < 1 << L; i++)
+			p[i] = p[0];
+		return;
+	}
+	half = 1 << (L - 1);
+
+	/* p(b x) */
+	for (i = 1, k = f->beta[L]; i < n; i++, k = modnn(f, k + f->beta[L]))
+		p[i] = mul_log(f, p[i], k);
+
+	for (size = 2; size < n; size <<= 1)
+		;
+	taylor(p, size);
+
+	/* the coefficients of (x^2 + x)^i to the low half, of x (x^2 + x)^i to
+	 * the high half */
+	for (i = 0; i < size / 2; i++)
+		tmp[i] = p[2 * i + 1];
+	for (i = 0; i < size / 2; i++)
+		p[i] = p[2 * i];
+	if (size < 1 << L)
+		memset(p + size / 2, 0, sizeof(uint16_t) * (size / 2));
+	memcpy(p + half, tmp, sizeof(uint16_t) * (size / 2));
+
+	fft(f, p, L - 1, (n + 1) / 2, tmp);
+	fft(f, p + half, L - 1, n / 2, tmp);
+
+	/* p(x) = u(x^2 + x) + x v(x^2 + x) at x = G[i] and G[i] + 1 */
+	g = f->g[L];
+	for (i = 0; i < half; i++) {
+		v = p[half + i];
+		if (v && g[i] != f->nn)
+			p[i] ^= f->exp[f->index_of[v] + g[i]];
+		p[half + i] = p[i] ^ v;
+	}
+}
+
+int rs_fft_decode(struct rs_fft *f, uint16_t *data, uint16_t *par, int len,
+		  uint16_t *s, int no_eras, int *eras_pos, uint16_t invmsk,
+		  uint16_t *corr)
+{
+	int deg_lambda, el, deg_omega;
+	int i, j, r, k, pad, n, size;
+	int nn = f->nn, nroots = f->nroots, fcr = f->fcr, prim = f->prim;
+	int iprim = f->iprim;
+	uint16_t *alpha_to = f->alpha_to, *index_of = f->index_of;
+	uint16_t u, tmp, num1, num2, den, discr_r, syn_error;
+	uint16_t lambda[nroots + 1], syn[nroots];
+	uint16_t b[nroots + 1], t[nroots + 1], omega[nroots + 1];
+	uint16_t root[nroots], loc[nroots];
+	uint16_t msk = (uint16_t)nn;
+	uint16_t *buf, *scratch;
+	int count = 0;
+
+	pad = nn - nroots - len;
+	if (pad < 0 || pad >= nn)
+		return -ERANGE;
+
+	size = 1 << f->mm;
+	buf = calloc(size + size / 2, sizeof(uint16_t));
+	if (!buf)
+		return -ENOMEM;
+	scratch = buf + size;
+
+	if (s != NULL) {
+		/* syndromes of the caller, in index form */
+		for (i = 0; i < nroots; i++)
+			if (s[i] != nn)
+				goto decode;
+		goto finish;
+	}
+
+	/* the codeword as a polynomial, the first symbol the highest power */
+	n = len + nroots;
+	for (j = 0; j < len; j++)
+		buf[n - 1 - j] = (((uint16_t)data[j]) ^ invmsk) & msk;
+	for (j = 0; j < nroots; j++)
+		buf[nroots - 1 - j] = ((uint16_t)par[j]) & msk;
+	fft(f, buf, f->mm, n, scratch);
+
+	/* syndrome i is the codeword at alpha^((fcr + i) * prim) */
+	syn_error = 0;
+	for (i = 0; i < nroots; i++) {
+		syn[i] = buf[alpha_to[modnn(f, (fcr + i) * prim)]];
+		syn_error |= syn[i];
+		syn[i] = index_of[syn[i]];
+	}
+	s = syn;
+	if (!syn_error)
+		goto finish;
+
+decode:
+	memset(&lambda[1], 0, nroots * sizeof(lambda[0]));
+	lambda[0] = 1;
+
+	if (no_eras > 0) {
+		/* Init lambda to be the erasure locator polynomial */
+		lambda[1] = alpha_to[modnn(f, prim * (nn - 1 -
+						      (eras_pos[0] + pad)))];
+		for (i = 1; i < no_eras; i++) {
+			u = modnn(f, prim * (nn - 1 - (eras_pos[i] + pad)));
+			for (j = i + 1; j > 0; j--) {
+				tmp = index_of[lambda[j - 1]];
+				if (tmp != nn)
+					lambda[j] ^= alpha_to[modnn(f, u + tmp)];
+			}
+		}
+	}
+
+	for (i = 0; i < nroots + 1; i++)
+		b[i] = index_of[lambda[i]];
+
+	/* Berlekamp-Massey, starting after the erasures */
+	r = no_eras;
+	el = no_eras;
+	while (++r <= nroots) {
+		discr_r = 0;
+		for (i = 0; i < r; i++) {
+			if ((lambda[i] != 0) && (s[r - i - 1] != nn))
+				discr_r ^= alpha_to[modnn(f, index_of[lambda[i]] +
+							  s[r - i - 1])];
+		}
+		discr_r = index_of[discr_r];
+		if (discr_r == nn) {
+			/* B(x) <-- x*B(x) */
+			memmove(&b[1], b, nroots * sizeof(b[0]));
+			b[0] = nn;
+		} else {
+			/* T(x) <-- lambda(x) - discr_r*x*b(x) */
+			t[0] = lambda[0];
+			for (i = 0; i < nroots; i++) {
+				if (b[i] != nn)
+					t[i + 1] = lambda[i + 1] ^
+						alpha_to[modnn(f, discr_r + b[i])];
+				else
+					t[i + 1] = lambda[i + 1];
+			}
+			if (2 * el <= r + no_eras - 1) {
+				el = r + no_eras - el;
+				/* B(x) <-- inv(discr_r) * lambda(x) */
+				for (i = 0; i <= nroots; i++)
+					b[i] = (lambda[i] == 0) ? nn :
+						modnn(f, index_of[lambda[i]] -
+						      discr_r + nn);
+			} else {
+				memmove(&b[1], b, nroots * sizeof(b[0]));
+				b[0] = nn;
+			}
+			memcpy(lambda, t, (nroots + 1) * sizeof(t[0]));
+		}
+	}
+
+	/* lambda to index form, and its degree */
+	deg_lambda = 0;
+	for (i = 0; i < nroots + 1; i++) {
+		if (lambda[i] != 0)
+			deg_lambda = i;
+	}
+
+	/* Chien search: lambda at every element of the field */
+	count = 0;
+	if (deg_lambda > 0) {
+		memset(buf, 0, sizeof(uint16_t) * size);
+		memcpy(buf, lambda, sizeof(uint16_t) * (deg_lambda + 1));
+		fft(f, buf, f->mm, deg_lambda + 1, scratch);
+		for (i = 1, k = iprim - 1; i <= nn; i++, k = modnn(f, k + iprim)) {
+			if (buf[f->exp[i]] != 0)
+				continue;
+			root[count] = i;
+			loc[count] = k;
+			if (++count == deg_lambda)
+				break;
+		}
+	}
+	for (i = 0; i < nroots + 1; i++)
+		lambda[i] = index_of[lambda[i]];
+
+	if (deg_lambda != count) {
+		/* deg(lambda) unequal to number of roots: uncorrectable */
+		count = -EBADMSG;
+		goto finish;
+	}
+
+	/* omega(x) = s(x)*lambda(x) (modulo x**nroots), in index form */
+	deg_omega = deg_lambda - 1;
+	for (i = 0; i <= deg_omega; i++) {
+		tmp = 0;
+		for (j = i; j >= 0; j--) {
+			if ((s[i - j] != nn) && (lambda[j] != nn))
+				tmp ^= alpha_to[modnn(f, s[i - j] + lambda[j])];
+		}
+		omega[i] = index_of[tmp];
+	}
+
+	/*
+	 * Forney: num1 = omega(inv(X(l))), num2 = inv(X(l))**(fcr-1) and
+	 * den = lambda_pr(inv(X(l)))
+	 */
+	for (j = count - 1; j >= 0; j--) {
+		num1 = 0;
+		for (i = deg_omega; i >= 0; i--) {
+			if (omega[i] != nn)
+				num1 ^= alpha_to[modnn(f, omega[i] + i * root[j])];
+		}
+		num2 = alpha_to[modnn(f, root[j] * (fcr - 1) + nn)];
+		den = 0;
+
+		/* lambda[i+1] for i even is the formal derivative */
+		for (i = (deg_lambda < nroots - 1 ? deg_lambda : nroots - 1) & ~1;
+		     i >= 0; i -= 2) {
+			if (lambda[i + 1] != nn)
+				den ^= alpha_to[modnn(f, lambda[i + 1] +
+						      i * root[j])];
+		}
+		/* only the message is corrected, the parity is reported */
+		if (num1 != 0 && loc[j] >= pad) {
+			uint16_t cor = alpha_to[modnn(f, index_of[num1] +
+						      index_of[num2] + nn -
+						      index_of[den])];
+			if (corr)
+				corr[j] = cor;
+			else if (data && (loc[j] < (nn - nroots)))
+				data[loc[j] - pad] ^= cor;
+		}
+	}
+
+finish:
+	if (eras_pos != NULL) {
+		for (i = 0; i < count; i++)
+			eras_pos[i] = loc[i] - pad;
+	}
+	free(buf);
+	return count;
+}
@@ -0,0 +1,34 @@
+/*
+ * Original Author    : Edwin G. W. Peters @ epeters
+ * ------------------------------------------------------------------------------
+ * File Name          : rs_fft.h
+ * Description        : Decoder for long codes with additive FFTs, see rs_fft.c
+ * ------------------------------------------------------------------------------
+ * Copyright          : License GPL3
+ * ------------------------------------------------------------------------------
+ */
+
+#ifndef RS_FFT_H
+#define RS_FFT_H
+
+#include <stdint.h>
+
+struct rs_fft;
+
+/*
+ * Tables of the decoder for a code with more than 8 bits per symbol. Returns
+ * NULL when the parameters are not supported or out of memory
+ */
+struct rs_fft *rs_fft_new(int symsize, int gfpoly, int fcr, int prim,
+			  int nroots);
+void rs_fft_free(struct rs_fft *f);
+
+/*
+ * Drop-in for decode_rs16, with the same arguments, results and corrections.
+ * Returns -ENOMEM when the work buffers can not be allocated
+ */
+int rs_fft_decode(struct rs_fft *f, uint16_t *data, uint16_t *par, int len,
+		  uint16_t *s, int no_eras, int *eras_pos, uint16_t invmsk,
+		  uint16_t *corr);
+
+#endif
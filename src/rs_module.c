@@ -0,0 +1,931 @@
+/*
+ * Original Author    : Edwin G. W. Peters @ epeters
+ * ------------------------------------------------------------------------------
+ * File Name          : rs_module.c
+ * Description        : CPython entry points of the reed-solomon library
+ * ------------------------------------------------------------------------------
+ * Copyright          : License GPL3
+ * ------------------------------------------------------------------------------
+ *
+ * The module pyreedsolomon._librs exposes the type Codec, which owns a control
+ * structure from init_rs and releases it with free_rs when it is collected.
+ *
+ * The methods take the codewords as buffer-protocol objects (numpy arrays,
+ * bytearray, memoryview, ...). The buffers are validated once per call, after
+ * which the rows are coded by the functions of rs_batch.c, with the GIL
+ * released unless the job is tiny.
+ *
+ * 1-D buffers hold a single codeword, 2-D buffers one codeword per row. The
+ * last nroots symbols of a codeword are the parity, a codeword shorter than
+ * 2^symsize - 1 symbols is a shortened codeword. The symbols of a codeword may
+ * be strided, such as the columns of an interleaved frame, see rs_batch.c
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <errno.h>
+#include <limits.h>
+#include <stdint.h>
+#include <string.h>
+
+#include "rs_fft.h"
+#include "rs_simd.h"
+
+struct rs_control;
+
+struct rs_control *init_rs(int symsize, int gfpoly, int fcr, int prim,
+			   int nroots);
+void free_rs(struct rs_control *rs);
+
+int encode_rs8_batch(struct rs_control *rs, uint8_t *data, int n_rows,
+		     int stride, int step, int len, int nroots);
+int encode_rs16_batch(struct rs_control *rs, uint16_t *data, int n_rows,
+		      int stride, int step, int len, int nroots);
+int decode_rs8_batch(struct rs_control *rs, uint8_t *data, int n_rows,
+		     int stride, int step, int len, int nroots, int *eras,
+		     int eras_stride, int *no_eras, int *n_errors, int *offsets,
+		     int *err_pos, uint16_t *err_val, const uint8_t *skip);
+int decode_rs16_batch(struct rs_control *rs, uint16_t *data, int n_rows,
+		      int stride, int step, int len, int nroots, int *eras,
+		      int eras_stride, int *no_eras, int *n_errors,
+		      int *offsets, int *err_pos, uint16_t *err_val,
+		      const uint8_t *skip);
+int decode_rs16_fft_batch(struct rs_fft *rs, uint16_t *data, int n_rows,
+			  int stride, int step, int len, int nroots, int *eras,
+			  int eras_stride, int *no_eras, int *n_errors,
+			  int *offsets, int *err_pos, uint16_t *err_val,
+			  const uint8_t *skip);
+int check_rs8_batch(struct rs_control *rs, uint8_t *data, int n_rows,
+		    int stride, int step, int len, int nroots, uint8_t *clean);
+int check_rs16_batch(struct rs_control *rs, uint16_t *data, int n_rows,
+		     int stride, int step, int len, int nroots,
+		     uint8_t *clean);
+
+/*
+ * Work below this number of symbols is done while holding the GIL, since
+ * releasing and taking it back costs more than coding a small codeword
+ */
+#define NOGIL_MIN_SYMBOLS 1024
+
+/*
+ * Codewords of more than 8 bits per symbol are decoded with rs_fft.c when
+ * their length times nroots is at least this many times the size of the field,
+ * -1 to never use it. An FFT always spans the whole field, while the library
+ * takes about length * nroots products
+ */
+#define FFT_MIN_WORK_DEFAULT 16
+
+static long fft_min_work = FFT_MIN_WORK_DEFAULT;
+
+typedef struct {
+	PyObject_HEAD
+	struct rs_control *rs;
+	struct rs_simd *simd;	/* vectorized tables, or NULL */
+	Py_buffer tables;	/* stored tables of simd, obj NULL when owned */
+	struct rs_gf *gf;	/* field tables of matmul */
+	struct rs_fft *fft;	/* decoder for long codes, built on first use */
+	int symsize;
+	int gfpoly;
+	int fcr;
+	int prim;
+	int nn;
+	int nroots;
+} Codec;
+
+/* rows of codewords in a buffer */
+typedef struct {
+	Py_buffer view;
+	int n_rows;
+	int stride;	/* in symbols */
+	int step;	/* between the symbols of a row, in symbols */
+	int len;	/* message symbols per row */
+} Rows;
+
+/*
+ * Compare the struct format of a buffer with the expected type code, ignoring
+ * a native byte order prefix
+ */
+static int format_is(const Py_buffer *view, const char *codes)
+{
+	const char *f = view->format ? view->format : "B";
+
+	if (*f == '@' || *f == '=')
+		f++;
+#if PY_LITTLE_ENDIAN
+	else if (*f == '<')
+		f++;
+#else
+	else if (*f == '>' || *f == '!')
+		f++;
+#endif
+	return f[0] != '\0' && f[1] == '\0' && strchr(codes, f[0]) != NULL;
+}
+
+static int check_nargs(const char *name, Py_ssize_t nargs, Py_ssize_t n)
+{
+	if (nargs == n)
+		return 0;
+	PyErr_Format(PyExc_TypeError, "%s() takes %zd arguments (%zd given)",
+		     name, n, nargs);
+	return -1;
+}
+
+/* read-only buffers are accepted when writable is 0 */
+static int get_rows(Codec *self, PyObject *obj, Rows *rows, int ndim_req,
+		    int writable)
+{
+	Py_buffer *view = &rows->view;
+	Py_ssize_t itemsize = self->symsize > 8 ? 2 : 1;
+	Py_ssize_t n_symbols, stride, step;
+
+	if (PyObject_GetBuffer(obj, view, (writable ? PyBUF_WRITABLE : 0) |
+			       PyBUF_FORMAT | PyBUF_STRIDES) < 0)
+		return -1;
+
+	if (view->itemsize != itemsize ||
+	    !format_is(view, itemsize == 1 ? "Bb" : "Hh")) {
+		PyErr_Format(PyExc_ValueError,
+			     "expected a buffer of uint%d symbols",
+			     (int)itemsize * 8);
+		goto fail;
+	}
+	if (view->ndim != ndim_req) {
+		PyErr_Format(PyExc_ValueError,
+			     "expected a %d-D buffer, got %d-D", ndim_req,
+			     view->ndim);
+		goto fail;
+	}
+
+	n_symbols = view->shape[ndim_req - 1];
+	step = view->strides[ndim_req - 1];
+	if (step <= 0 || step % itemsize || step / itemsize > INT_MAX) {
+		PyErr_SetString(PyExc_ValueError,
+				"the symbols of a codeword need a positive stride");
+		goto fail;
+	}
+	if (n_symbols <= self->nroots || n_symbols > self->nn) {
+		PyErr_Format(PyExc_ValueError,
+			     "codeword length %zd needs to be between %d and %d",
+			     n_symbols, self->nroots + 1, self->nn);
+		goto fail;
+	}
+
+	rows->n_rows = 1;
+	stride = n_symbols * (step / itemsize);
+	if (ndim_req == 2) {
+		if (view->shape[0] > INT_MAX ||
+		    view->strides[0] % itemsize ||
+		    view->strides[0] / itemsize > INT_MAX ||
+		    view->strides[0] / itemsize < INT_MIN) {
+			PyErr_SetString(PyExc_ValueError,
+					"unsupported row stride or number of rows");
+			goto fail;
+		}
+		rows->n_rows = (int)view->shape[0];
+		stride = view->strides[0] / itemsize;
+	}
+	rows->stride = (int)stride;
+	rows->step = (int)(step / itemsize);
+	rows->len = (int)(n_symbols - self->nroots);
+	return 0;
+
+fail:
+	PyBuffer_Release(view);
+	return -1;
+}
+
+/*
+ * Optional 1-D or 2-D C-contiguous array of at least min_items items of the
+ * given type. Py_None gives a NULL pointer.
+ */
+static int get_array(PyObject *obj, Py_buffer *view, const char *codes,
+		     Py_ssize_t itemsize, Py_ssize_t min_items,
+		     const char *name)
+{
+	view->obj = NULL;
+	view->buf = NULL;
+	if (obj == Py_None)
+		return 0;
+
+	if (PyObject_GetBuffer(obj, view, PyBUF_WRITABLE | PyBUF_FORMAT |
+			       PyBUF_C_CONTIGUOUS) < 0)
+		return -1;
+	if (view->itemsize != itemsize || !format_is(view, codes)) {
+		PyErr_Format(PyExc_ValueError, "%s has the wrong dtype", name);
+		goto fail;
+	}
+	if (view->len / itemsize < min_items) {
+		PyErr_Format(PyExc_ValueError,
+			     "%s needs to hold at least %zd entries", name,
+			     min_items);
+		goto fail;
+	}
+	return 0;
+
+fail:
+	PyBuffer_Release(view);
+	view->obj = NULL;
+	view->buf = NULL;
+	return -1;
+}
+
+static void release(Py_buffer *view)
+{
+	if (view->obj)
+		PyBuffer_Release(view);
+}
+
+static int big_job(Codec *self, Rows *rows)
+{
+	return (long)rows->n_rows * (rows->len + self->nroots) >=
+	       NOGIL_MIN_SYMBOLS;
+}
+
+static int encode_rows(Codec *self, Rows *rows)
+{
+	PyThreadState *ts = NULL;
+	int ret;
+
+	char *data = rows->view.buf;
+	int done = 0, n_rows, w = self->symsize > 8 ? 2 : 1;
+
+	if (big_job(self, rows))
+		ts = PyEval_SaveThread();
+	/* whole tiles vectorized, the remaining rows by the library */
+	if (self->simd)
+		done = rs_simd_encode(self->simd, data, rows->n_rows,
+				      rows->stride, rows->step, rows->len);
+	data += (long)done * rows->stride * w;
+	n_rows = rows->n_rows - done;
+	if (self->symsize > 8)
+		ret = encode_rs16_batch(self->rs, (uint16_t *)data, n_rows,
+					rows->stride, rows->step, rows->len,
+					self->nroots);
+	else
+		ret = encode_rs8_batch(self->rs, (uint8_t *)data, n_rows,
+				       rows->stride, rows->step, rows->len,
+				       self->nroots);
+	if (ts)
+		PyEval_RestoreThread(ts);
+	return ret;
+}
+
+static int check_rows(Codec *self, Rows *rows, uint8_t *clean)
+{
+	PyThreadState *ts = NULL;
+	char *data = rows->view.buf;
+	int done = 0, n_clean = 0, n, i, ret, w = self->symsize > 8 ? 2 : 1;
+
+	if (big_job(self, rows))
+		ts = PyEval_SaveThread();
+	if (self->simd)
+		done = rs_simd_clean(self->simd, data, rows->n_rows,
+				     rows->stride, rows->step, rows->len,
+				     clean);
+	/*
+	 * the library compares the stored parity as is, so parity symbols with
+	 * bits beyond symsize are not clean even though the syndromes are zero
+	 */
+	for (n = 0; n < done; n++) {
+		for (i = 0; clean[n] && i < self->nroots; i++) {
+			long p = (long)n * rows->stride +
+				(long)(rows->len + i) * rows->step;
+			unsigned v = w == 1 ? ((uint8_t *)data)[p] :
+				((uint16_t *)data)[p];
+
+			if (v & ~(unsigned)self->nn)
+				clean[n] = 0;
+		}
+		n_clean += clean[n];
+	}
+	data += (long)done * rows->stride * w;
+	if (self->symsize > 8)
+		ret = check_rs16_batch(self->rs, (uint16_t *)data,
+				       rows->n_rows - done, rows->stride,
+				       rows->step, rows->len, self->nroots,
+				       clean + done);
+	else
+		ret = check_rs8_batch(self->rs, (uint8_t *)data,
+				      rows->n_rows - done, rows->stride,
+				      rows->step, rows->len, self->nroots,
+				      clean + done);
+	if (ts)
+		PyEval_RestoreThread(ts);
+	return ret < 0 ? ret : n_clean + ret;
+}
+
+/* the FFT decoder when the codewords of rows are long enough for it */
+static struct rs_fft *fft_decoder(Codec *self, Rows *rows)
+{
+	if (self->symsize <= 8 || fft_min_work < 0 ||
+	    (long)(rows->len + self->nroots) * self->nroots <
+	    fft_min_work << self->symsize)
+		return NULL;
+	if (!self->fft)
+		self->fft = rs_fft_new(self->symsize, self->gfpoly, self->fcr,
+				       self->prim, self->nroots);
+	return self->fft;
+}
+
+static int decode_rows(Codec *self, Rows *rows, int *eras, int eras_stride,
+		       int *no_eras, int *n_errors, int *offsets,
+		       int *err_pos, uint16_t *err_val)
+{
+	PyThreadState *ts = NULL;
+	struct rs_fft *fft = fft_decoder(self, rows);
+	uint8_t *skip = NULL;
+	int ret;
+
+	if (big_job(self, rows))
+		ts = PyEval_SaveThread();
+	/*
+	 * the vectorized syndromes find the clean rows, which the library
+	 * would only compute the syndromes of as well
+	 */
+	if (self->simd && rows->n_rows >= 16) {
+		skip = calloc(rows->n_rows, 1);
+		if (skip && !rs_simd_clean(self->simd, rows->view.buf,
+					   rows->n_rows, rows->stride,
+					   rows->step, rows->len, skip)) {
+			free(skip);
+			skip = NULL;
+		}
+	}
+	if (fft)
+		ret = decode_rs16_fft_batch(fft, rows->view.buf, rows->n_rows,
+					    rows->stride, rows->step,
+					    rows->len, self->nroots, eras,
+					    eras_stride, no_eras, n_errors,
+					    offsets, err_pos, err_val, skip);
+	else if (self->symsize > 8)
+		ret = decode_rs16_batch(self->rs, rows->view.buf, rows->n_rows,
+					rows->stride, rows->step, rows->len,
+					self->nroots, eras, eras_stride,
+					no_eras, n_errors, offsets, err_pos,
+					err_val, skip);
+	else
+		ret = decode_rs8_batch(self->rs, rows->view.buf, rows->n_rows,
+				       rows->stride, rows->step, rows->len,
+				       self->nroots, eras, eras_stride,
+				       no_eras, n_errors, offsets, err_pos,
+				       err_val, skip);
+	free(skip);
+	if (ts)
+		PyEval_RestoreThread(ts);
+	return ret;
+}
+
+static void Codec_free_simd(Codec *self)
+{
+	rs_simd_free(self->simd);
+	self->simd = NULL;
+	if (self->tables.obj)
+		PyBuffer_Release(&self->tables);
+}
+
+static int Codec_init(Codec *self, PyObject *args, PyObject *kwds)
+{
+	static char *kwlist[] = {"symsize", "gfpoly", "fcr", "prim", "nroots",
+				 "max_len", "tables", NULL};
+	int symsize, gfpoly, fcr, prim, nroots, max_len = 0;
+	PyObject *tables = Py_None;
+
+	if (!PyArg_ParseTupleAndKeywords(args, kwds, "iiiii|iO", kwlist,
+					 &symsize, &gfpoly, &fcr, &prim,
+					 &nroots, &max_len, &tables))
+		return -1;
+	if (symsize < 1 || symsize > 16 || nroots < 1 ||
+	    nroots >= (1 << symsize) - 1 || fcr < 0 || prim < 1) {
+		PyErr_SetString(PyExc_ValueError, "invalid code parameters");
+		return -1;
+	}
+
+	if (self->rs)
+		free_rs(self->rs);
+	self->rs = NULL;
+	Codec_free_simd(self);
+	rs_gf_free(self->gf);
+	self->gf = NULL;
+	rs_fft_free(self->fft);
+	self->fft = NULL;
+	self->rs = init_rs(symsize, gfpoly, fcr, prim, nroots);
+	if (!self->rs) {
+		PyErr_Format(PyExc_ValueError,
+			     "init_rs failed for symsize %d, gfpoly %#x, fcr %d, prim %d, nroots %d",
+			     symsize, gfpoly, fcr, prim, nroots);
+		return -1;
+	}
+	self->symsize = symsize;
+	self->nn = (1 << symsize) - 1;
+	self->nroots = nroots;
+	self->gfpoly = gfpoly;
+	self->fcr = fcr;
+	self->prim = prim;
+	self->gf = rs_gf_new(symsize, gfpoly);
+	if (!self->gf) {
+		PyErr_NoMemory();
+		return -1;
+	}
+	if (max_len <= nroots)
+		return 0;
+
+	/* tables for codewords up to max_len symbols, longer ones stay scalar */
+	if (tables != Py_None) {
+		if (PyObject_GetBuffer(tables, &self->tables,
+				       PyBUF_C_CONTIGUOUS) < 0)
+			return -1;
+		self->simd = rs_simd_wrap(symsize, nroots, max_len,
+					  self->tables.buf,
+					  self->tables.len);
+		if (!self->simd)
+			PyBuffer_Release(&self->tables);
+	}
+	if (!self->simd)
+		self->simd = rs_simd_new(symsize, gfpoly, fcr, prim, nroots,
+					 max_len);
+	return 0;
+}
+
+static void Codec_dealloc(Codec *self)
+{
+	if (self->rs)
+		free_rs(self->rs);
+	Codec_free_simd(self);
+	rs_gf_free(self->gf);
+	rs_fft_free(self->fft);
+	Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+PyDoc_STRVAR(encode_doc,
+"encode(codeword)\n\n"
+"Compute the parity of a single codeword in place");
+
+static PyObject *Codec_encode(Codec *self, PyObject *const *args,
+			      Py_ssize_t nargs)
+{
+	Rows rows;
+	int ret;
+
+	if (check_nargs("encode", nargs, 1) < 0)
+		return NULL;
+	if (get_rows(self, args[0], &rows, 1, 1) < 0)
+		return NULL;
+	ret = encode_rows(self, &rows);
+	PyBuffer_Release(&rows.view);
+	if (ret == -ENOMEM)
+		return PyErr_NoMemory();
+	if (ret < 0)
+		return PyErr_Format(PyExc_ValueError, "encoding failed (%d)", ret);
+	Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(decode_doc,
+"decode(codeword)\n\n"
+"Decode a single codeword in place, returns the number of corrected symbols\n"
+"or -EBADMSG");
+
+static PyObject *Codec_decode(Codec *self, PyObject *const *args,
+			      Py_ssize_t nargs)
+{
+	Rows rows;
+	int n_errors, ret;
+
+	if (check_nargs("decode", nargs, 1) < 0)
+		return NULL;
+	if (get_rows(self, args[0], &rows, 1, 1) < 0)
+		return NULL;
+	ret = decode_rows(self, &rows, NULL, 0, NULL, &n_errors, NULL, NULL,
+			  NULL);
+	PyBuffer_Release(&rows.view);
+	if (ret < 0)
+		return PyErr_NoMemory();
+	return PyLong_FromLong(n_errors);
+}
+
+PyDoc_STRVAR(check_doc,
+"check(codeword)\n\n"
+"True when the parity of a single codeword matches its message");
+
+static PyObject *Codec_check(Codec *self, PyObject *const *args,
+			     Py_ssize_t nargs)
+{
+	Rows rows;
+	uint8_t clean = 0;
+	int ret;
+
+	if (check_nargs("check", nargs, 1) < 0)
+		return NULL;
+	if (get_rows(self, args[0], &rows, 1, 0) < 0)
+		return NULL;
+	ret = check_rows(self, &rows, &clean);
+	PyBuffer_Release(&rows.view);
+	if (ret < 0)
+		return PyErr_NoMemory();
+	return PyBool_FromLong(clean);
+}
+
+PyDoc_STRVAR(encode_batch_doc,
+"encode_batch(codewords)\n\n"
+"Compute the parity of every row of a 2-D buffer in place");
+
+static PyObject *Codec_encode_batch(Codec *self, PyObject *const *args,
+				    Py_ssize_t nargs)
+{
+	Rows rows;
+	int ret;
+
+	if (check_nargs("encode_batch", nargs, 1) < 0)
+		return NULL;
+	if (get_rows(self, args[0], &rows, 2, 1) < 0)
+		return NULL;
+	ret = encode_rows(self, &rows);
+	PyBuffer_Release(&rows.view);
+	if (ret == -ENOMEM)
+		return PyErr_NoMemory();
+	if (ret < 0)
+		return PyErr_Format(PyExc_ValueError, "encoding failed (%d)", ret);
+	Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(check_batch_doc,
+"check_batch(codewords, clean)\n\n"
+"Set clean[n] for the rows of codewords without errors, returns the number\n"
+"of clean rows");
+
+static PyObject *Codec_check_batch(Codec *self, PyObject *const *args,
+				   Py_ssize_t nargs)
+{
+	Rows rows;
+	Py_buffer clean;
+	int n_clean;
+
+	if (check_nargs("check_batch", nargs, 2) < 0)
+		return NULL;
+	if (get_rows(self, args[0], &rows, 2, 0) < 0)
+		return NULL;
+	if (get_array(args[1], &clean, "?Bb", 1, rows.n_rows, "clean") < 0 ||
+	    !clean.buf) {
+		if (!PyErr_Occurred())
+			PyErr_SetString(PyExc_ValueError, "clean is required");
+		PyBuffer_Release(&rows.view);
+		return NULL;
+	}
+	n_clean = check_rows(self, &rows, clean.buf);
+	PyBuffer_Release(&clean);
+	PyBuffer_Release(&rows.view);
+	if (n_clean < 0)
+		return PyErr_NoMemory();
+	return PyLong_FromLong(n_clean);
+}
+
+PyDoc_STRVAR(decode_batch_doc,
+"decode_batch(codewords, eras, no_eras, n_errors, offsets, err_pos, err_val)\n\n"
+"Decode every row of a 2-D buffer in place, see decode_rs8_batch in\n"
+"rs_batch.c. eras is a 2-D intc array with the erasures of each row up front\n"
+"and no_eras the number of erasures per row, or both None. n_errors receives\n"
+"the result of each row. offsets, err_pos and err_val are None, or receive the\n"
+"corrections in compressed sparse row form. Returns the number of rows that\n"
+"failed");
+
+static PyObject *Codec_decode_batch(Codec *self, PyObject *const *args,
+				    Py_ssize_t nargs)
+{
+	Rows rows;
+	Py_buffer eras, no_eras, n_errors, offsets, err_pos, err_val;
+	Py_ssize_t n_corr;
+	int eras_stride = 0, n_failed, n;
+	PyObject *ret = NULL;
+
+	if (check_nargs("decode_batch", nargs, 7) < 0)
+		return NULL;
+	if (get_rows(self, args[0], &rows, 2, 1) < 0)
+		return NULL;
+	eras.obj = no_eras.obj = n_errors.obj = NULL;
+	offsets.obj = err_pos.obj = err_val.obj = NULL;
+
+	n_corr = (Py_ssize_t)rows.n_rows * self->nroots;
+	if (get_array(args[1], &eras, "i", sizeof(int), 0, "eras") < 0 ||
+	    get_array(args[2], &no_eras, "i", sizeof(int), rows.n_rows,
+		      "no_eras") < 0 ||
+	    get_array(args[3], &n_errors, "i", sizeof(int), rows.n_rows,
+		      "n_errors") < 0 ||
+	    get_array(args[4], &offsets, "i", sizeof(int), rows.n_rows + 1,
+		      "offsets") < 0 ||
+	    get_array(args[5], &err_pos, "i", sizeof(int), n_corr,
+		      "err_pos") < 0 ||
+	    get_array(args[6], &err_val, "H", 2, n_corr, "err_val") < 0)
+		goto out;
+
+	if (!n_errors.buf) {
+		PyErr_SetString(PyExc_ValueError, "n_errors is required");
+		goto out;
+	}
+	if (!eras.buf != !no_eras.buf) {
+		PyErr_SetString(PyExc_ValueError,
+				"eras and no_eras go together");
+		goto out;
+	}
+	if (offsets.buf && (!err_pos.buf || !err_val.buf)) {
+		PyErr_SetString(PyExc_ValueError,
+				"offsets needs err_pos and err_val");
+		goto out;
+	}
+	if (eras.buf) {
+		if (eras.ndim != 2 || eras.shape[0] != rows.n_rows) {
+			PyErr_Format(PyExc_ValueError,
+				     "eras needs shape (%d, max_erasures)",
+				     rows.n_rows);
+			goto out;
+		}
+		eras_stride = (int)eras.shape[1];
+		/* the erasures beyond nroots are never read */
+		for (n = 0; n < rows.n_rows; n++) {
+			int k = ((int *)no_eras.buf)[n];
+
+			if (k > eras_stride && k <= self->nroots) {
+				PyErr_SetString(PyExc_ValueError,
+						"no_eras exceeds the width of eras");
+				goto out;
+			}
+		}
+	}
+
+	n_failed = decode_rows(self, &rows, eras.buf, eras_stride, no_eras.buf,
+			       n_errors.buf, offsets.buf, err_pos.buf,
+			       err_val.buf);
+	ret = n_failed < 0 ? PyErr_NoMemory() : PyLong_FromLong(n_failed);
+
+out:
+	release(&eras);
+	release(&no_eras);
+	release(&n_errors);
+	release(&offsets);
+	release(&err_pos);
+	release(&err_val);
+	PyBuffer_Release(&rows.view);
+	return ret;
+}
+
+/* 2-D buffer of symbols with contiguous rows */
+static int get_matrix(Codec *self, PyObject *obj, Py_buffer *view,
+		      int writable, const char *name)
+{
+	Py_ssize_t itemsize = self->symsize > 8 ? 2 : 1;
+
+	if (PyObject_GetBuffer(obj, view, (writable ? PyBUF_WRITABLE : 0) |
+			       PyBUF_FORMAT | PyBUF_STRIDES) < 0)
+		return -1;
+	if (view->itemsize != itemsize ||
+	    !format_is(view, itemsize == 1 ? "Bb" : "Hh")) {
+		PyErr_Format(PyExc_ValueError,
+			     "%s needs to hold uint%d symbols", name,
+			     (int)itemsize * 8);
+		goto fail;
+	}
+	if (view->ndim != 2 || view->strides[1] != itemsize ||
+	    view->strides[0] % itemsize || view->shape[0] > INT_MAX) {
+		PyErr_Format(PyExc_ValueError,
+			     "%s needs to be a 2-D buffer with contiguous rows",
+			     name);
+		goto fail;
+	}
+	return 0;
+
+fail:
+	PyBuffer_Release(view);
+	return -1;
+}
+
+PyDoc_STRVAR(matmul_doc,
+"matmul(src, coef, dst)\n\n"
+"Matrix product over the field of the code: dst[j][p] is the sum of\n"
+"src[i][p] * coef[i][j] over the rows i of src. src and dst are 2-D buffers\n"
+"of symbols with the same row length, coef a C-contiguous uint16 array of\n"
+"shape (rows of src, rows of dst)");
+
+static PyObject *Codec_matmul(Codec *self, PyObject *const *args,
+			      Py_ssize_t nargs)
+{
+	Py_buffer src, coef, dst;
+	PyThreadState *ts = NULL;
+	PyObject *ret = NULL;
+	Py_ssize_t w = self->symsize > 8 ? 2 : 1;
+	int k, m, err;
+
+	if (check_nargs("matmul", nargs, 3) < 0)
+		return NULL;
+	if (get_matrix(self, args[0], &src, 0, "src") < 0)
+		return NULL;
+	coef.obj = dst.obj = NULL;
+	if (get_matrix(self, args[2], &dst, 1, "dst") < 0) {
+		dst.obj = NULL;
+		goto out;
+	}
+	if (get_array(args[1], &coef, "H", 2, 0, "coef") < 0)
+		goto out;
+	k = (int)src.shape[0];
+	m = (int)dst.shape[0];
+	if (!coef.buf || coef.ndim != 2 || coef.shape[0] != k ||
+	    coef.shape[1] != m) {
+		PyErr_Format(PyExc_ValueError, "coef needs shape (%d, %d)", k, m);
+		goto out;
+	}
+	if (src.shape[1] != dst.shape[1]) {
+		PyErr_SetString(PyExc_ValueError,
+				"src and dst need rows of the same length");
+		goto out;
+	}
+
+	if ((long)k * src.shape[1] >= NOGIL_MIN_SYMBOLS)
+		ts = PyEval_SaveThread();
+	err = rs_gf_matmul(self->gf, coef.buf, k, m, src.buf,
+			   src.strides[0] / w, dst.buf, dst.strides[0] / w,
+			   src.shape[1]);
+	if (ts)
+		PyEval_RestoreThread(ts);
+	if (err < 0)
+		PyErr_NoMemory();
+	else {
+		Py_INCREF(Py_None);
+		ret = Py_None;
+	}
+
+out:
+	release(&coef);
+	release(&dst);
+	PyBuffer_Release(&src);
+	return ret;
+}
+
+PyDoc_STRVAR(simd_tables_doc,
+"simd_tables()\n\n"
+"Copy of the tables of the vectorized kernels as bytes, or None when the codec\n"
+"has none. Another codec with the same parameters takes them with its tables\n"
+"argument instead of building them, see rs_simd_wrap");
+
+static PyObject *Codec_simd_tables(Codec *self, PyObject *unused)
+{
+	const uint8_t *tables;
+	size_t size;
+
+	if (!self->simd)
+		Py_RETURN_NONE;
+	tables = rs_simd_tables(self->simd, &size);
+	return PyBytes_FromStringAndSize((const char *)tables, size);
+}
+
+static PyMethodDef Codec_methods[] = {
+	{"encode", (PyCFunction)(void (*)(void))Codec_encode, METH_FASTCALL,
+	 encode_doc},
+	{"decode", (PyCFunction)(void (*)(void))Codec_decode, METH_FASTCALL,
+	 decode_doc},
+	{"check", (PyCFunction)(void (*)(void))Codec_check, METH_FASTCALL,
+	 check_doc},
+	{"encode_batch", (PyCFunction)(void (*)(void))Codec_encode_batch,
+	 METH_FASTCALL, encode_batch_doc},
+	{"decode_batch", (PyCFunction)(void (*)(void))Codec_decode_batch,
+	 METH_FASTCALL, decode_batch_doc},
+	{"check_batch", (PyCFunction)(void (*)(void))Codec_check_batch,
+	 METH_FASTCALL, check_batch_doc},
+	{"simd_tables", (PyCFunction)Codec_simd_tables, METH_NOARGS,
+	 simd_tables_doc},
+	{"matmul", (PyCFunction)(void (*)(void))Codec_matmul, METH_FASTCALL,
+	 matmul_doc},
+	{NULL, NULL, 0, NULL}
+};
+
+static PyTypeObject CodecType = {
+	PyVarObject_HEAD_INIT(NULL, 0)
+	.tp_name = "pyreedsolomon._librs.Codec",
+	.tp_doc = "Codec(symsize, gfpoly, fcr, prim, nroots, max_len=0)\n\n"
+		  "Reed-Solomon control structure from init_rs. Batches of\n"
+		  "codewords of up to max_len symbols use the vectorized\n"
+		  "kernels of rs_simd.c",
+	.tp_basicsize = sizeof(Codec),
+	.tp_flags = Py_TPFLAGS_DEFAULT,
+	.tp_new = PyType_GenericNew,
+	.tp_init = (initproc)Codec_init,
+	.tp_dealloc = (destructor)Codec_dealloc,
+	.tp_methods = Codec_methods,
+};
+
+PyDoc_STRVAR(simd_level_doc,
+"simd_level()\n\n"
+"Name of the instruction set used by the vectorized kernels: 'avx2',\n"
+"'ssse3' or 'scalar'");
+
+static PyObject *librs_simd_level(PyObject *module, PyObject *unused)
+{
+	return PyUnicode_FromString(rs_simd_level_name(rs_simd_get_level()));
+}
+
+PyDoc_STRVAR(set_simd_level_doc,
+"set_simd_level(name)\n\n"
+"Use the given instruction set, or a lower one than detected to compare\n"
+"the kernels. Raises ValueError when the cpu does not support it");
+
+static PyObject *librs_set_simd_level(PyObject *module, PyObject *name)
+{
+	enum rs_simd_level level;
+	const char *s = PyUnicode_AsUTF8(name);
+
+	if (!s)
+		return NULL;
+	for (level = RS_SIMD_SCALAR; level <= RS_SIMD_AVX2; level++) {
+		if (strcmp(s, rs_simd_level_name(level)) == 0)
+			break;
+	}
+	if (level > RS_SIMD_AVX2 || rs_simd_set_level(level) < 0)
+		return PyErr_Format(PyExc_ValueError,
+				    "instruction set '%s' is not available", s);
+	Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(fft_threshold_doc,
+"fft_threshold()\n\n"
+"Codewords of more than 8 bits per symbol are decoded with additive FFTs,\n"
+"see rs_fft.c, when their length times nroots is at least this many times\n"
+"2**symsize. -1 when disabled");
+
+static PyObject *librs_fft_threshold(PyObject *module, PyObject *unused)
+{
+	return PyLong_FromLong(fft_min_work);
+}
+
+PyDoc_STRVAR(set_fft_threshold_doc,
+"set_fft_threshold(n)\n\n"
+"Change the threshold of fft_threshold, 0 to always decode with FFTs and\n"
+"-1 to never");
+
+static PyObject *librs_set_fft_threshold(PyObject *module, PyObject *arg)
+{
+	long n = PyLong_AsLong(arg);
+
+	if (n == -1 && PyErr_Occurred())
+		return NULL;
+	if (n < -1 || n > (LONG_MAX >> 16))
+		return PyErr_Format(PyExc_ValueError,
+				    "the threshold needs to be between -1 and %ld",
+				    LONG_MAX >> 16);
+	fft_min_work = n;
+	Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(simd_tables_size_doc,
+"simd_tables_size(symsize, nroots, max_len)\n\n"
+"Size in bytes of Codec.simd_tables for these parameters, 0 when the kernels\n"
+"are not used");
+
+static PyObject *librs_simd_tables_size(PyObject *module, PyObject *args)
+{
+	int symsize, nroots, max_len;
+
+	if (!PyArg_ParseTuple(args, "iii", &symsize, &nroots, &max_len))
+		return NULL;
+	if (symsize < 1 || symsize > 16 || max_len <= nroots)
+		return PyLong_FromLong(0);
+	return PyLong_FromSize_t(rs_simd_size(symsize, nroots, max_len));
+}
+
+static PyMethodDef librs_methods[] = {
+	{"simd_level", librs_simd_level, METH_NOARGS, simd_level_doc},
+	{"set_simd_level", librs_set_simd_level, METH_O, set_simd_level_doc},
+	{"simd_tables_size", librs_simd_tables_size, METH_VARARGS,
+	 simd_tables_size_doc},
+	{"fft_threshold", librs_fft_threshold, METH_NOARGS, fft_threshold_doc},
+	{"set_fft_threshold", librs_set_fft_threshold, METH_O,
+	 set_fft_threshold_doc},
+	{NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef librs_module = {
+	PyModuleDef_HEAD_INIT,
+	.m_name = "pyreedsolomon._librs",
+	.m_doc = "Entry points of the reed-solomon library",
+	.m_size = -1,
+	.m_methods = librs_methods,
+};
+
+PyMODINIT_FUNC PyInit__librs(void)
+{
+	PyObject *m;
+
+	if (PyType_Ready(&CodecType) < 0)
+		return NULL;
+	m = PyModule_Create(&librs_module);
+	if (!m)
+		return NULL;
+	Py_INCREF(&CodecType);
+	if (PyModule_AddObject(m, "Codec", (PyObject *)&CodecType) < 0) {
+		Py_DECREF(&CodecType);
+		Py_DECREF(m);
+		return NULL;
+	}
+	if (PyModule_AddIntConstant(m, "EBADMSG", EBADMSG) < 0 ||
+	    PyModule_AddIntConstant(m, "SIMD_TABLES_VERSION",
+				    RS_SIMD_TABLES_VERSION) < 0) {
+		Py_DECREF(m);
+		return NULL;
+	}
+	return m;
+}
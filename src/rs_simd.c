@@ -0,0 +1,694 @@
+/*
+ * Original Author    : Edwin G. W. Peters @ epeters
+ * ------------------------------------------------------------------------------
+ * File Name          : rs_simd.c
+ * Description        : Vectorized parity and syndrome kernels
+ * ------------------------------------------------------------------------------
+ * Copyright          : License GPL3
+ * ------------------------------------------------------------------------------
+ *
+ * The parity and the syndromes of a codeword are both linear in its symbols:
+ *
+ *   par[j] = sum_i msg[i] * G[i][j],  syn[j] = sum_i cw[i] * H[i][j]
+ *
+ * where G[i] is the parity of a message with a single 1 at position i, and
+ * H[i][j] = alpha^((fcr + j) * prim * (n - 1 - i)). The codewords are processed
+ * in tiles of 16 or 32 rows that are transposed, such that symbol i of all
+ * rows of the tile fills one vector register. The products with the constant
+ * G[i][j] or H[i][j] are then split-table lookups with pshufb: the low and the
+ * high nibble of each symbol select from two 16 entry tables. GF(2^16) symbols
+ * are split in a low and a high byte plane, with 4 nibbles and tables for
+ * both output bytes.
+ *
+ * G is computed with the same shift register as encode_rs, so the results are
+ * bit-exact with the scalar library, including the masking of the symbols to
+ * symsize bits. The instruction set is picked at runtime with cpuid.
+ *
+ * rs_gf_matmul runs the same kernels with an arbitrary coefficient matrix, on
+ * rows that are already symbol-major: the shards of an erasure code, where
+ * symbol p of every shard belongs to codeword p.
+ */
+
+#include <stdlib.h>
+#include <string.h>
+
+#include "rs_simd.h"
+
+#if (defined(__x86_64__) || defined(__i386__)) && defined(__GNUC__)
+#define RS_HAVE_X86 1
+#include <immintrin.h>
+#endif
+
+#define J_BLOCK		4		/* columns accumulated in registers */
+#define MAX_TABLES	(32 << 20)	/* bytes of tables per codec */
+
+struct rs_simd {
+	int symsize;
+	int nroots;
+	int m_pad;	/* nroots rounded up to J_BLOCK */
+	int tb;		/* table bytes per coefficient: 32 or 128 */
+	int max_msg;	/* rows of gtab */
+	int max_len;	/* rows of htab */
+	uint8_t *gtab;	/* row r: message position r of max_msg symbols */
+	uint8_t *htab;	/* row r: position r of a max_len symbol codeword */
+	int owned;	/* gtab, followed by htab, is freed with the codec */
+};
+
+static enum rs_simd_level simd_level = RS_SIMD_SCALAR;
+static int simd_level_set;
+
+enum rs_simd_level rs_simd_detect(void)
+{
+#ifdef RS_HAVE_X86
+	__builtin_cpu_init();
+	if (__builtin_cpu_supports("avx2"))
+		return RS_SIMD_AVX2;
+	if (__builtin_cpu_supports("ssse3"))
+		return RS_SIMD_SSSE3;
+#endif
+	return RS_SIMD_SCALAR;
+}
+
+enum rs_simd_level rs_simd_get_level(void)
+{
+	if (!simd_level_set) {
+		simd_level = rs_simd_detect();
+		simd_level_set = 1;
+	}
+	return simd_level;
+}
+
+/* levels above what the cpu supports are refused */
+int rs_simd_set_level(enum rs_simd_level level)
+{
+	if (level < RS_SIMD_SCALAR || level > rs_simd_detect())
+		return -1;
+	simd_level = level;
+	simd_level_set = 1;
+	return 0;
+}
+
+const char *rs_simd_level_name(enum rs_simd_level level)
+{
+	switch (level) {
+	case RS_SIMD_AVX2:
+		return "avx2";
+	case RS_SIMD_SSSE3:
+		return "ssse3";
+	default:
+		return "scalar";
+	}
+}
+
+/* ------------------------------------------------------------------------ */
+/* tables */
+
+struct rs_gf {
+	int symsize;
+	int nn;
+	uint16_t *alpha_to;
+	uint16_t *index_of;
+};
+
+static int gf_init(struct rs_gf *gf, int symsize, int gfpoly)
+{
+	int i, sr = 1;
+
+	gf->symsize = symsize;
+	gf->nn = (1 << symsize) - 1;
+	gf->alpha_to = malloc(sizeof(uint16_t) * (gf->nn + 1));
+	gf->index_of = malloc(sizeof(uint16_t) * (gf->nn + 1));
+	if (!gf->alpha_to || !gf->index_of)
+		return -1;
+	gf->index_of[0] = gf->nn;
+	gf->alpha_to[gf->nn] = 0;
+	for (i = 0; i < gf->nn; i++) {
+		gf->index_of[sr] = i;
+		gf->alpha_to[i] = sr;
+		sr <<= 1;
+		if (sr & (1 << symsize))
+			sr ^= gfpoly;
+		sr &= gf->nn;
+	}
+	return sr == 1 ? 0 : -1;
+}
+
+static void gf_free(struct rs_gf *gf)
+{
+	free(gf->alpha_to);
+	free(gf->index_of);
+}
+
+static uint16_t gf_mul(const struct rs_gf *gf, unsigned a, unsigned b)
+{
+	if (!a || !b || a > (unsigned)gf->nn || b > (unsigned)gf->nn)
+		return 0;
+	return gf->alpha_to[(gf->index_of[a] + gf->index_of[b]) % gf->nn];
+}
+
+/*
+ * Split tables of the constant c. 8 bit symbols: 16 products with the low
+ * nibble, 16 with the high nibble. 16 bit symbols: for nibbles 0..3, 16 low
+ * bytes and 16 high bytes of the products. Nibble values beyond the field only
+ * meet masked symbols and are left zero
+ */
+static void split_table(const struct rs_gf *gf, int symsize, unsigned c,
+			uint8_t *tbl)
+{
+	unsigned x, k, v;
+
+	if (symsize <= 8) {
+		for (x = 0; x < 16; x++) {
+			tbl[x] = (uint8_t)gf_mul(gf, c, x);
+			tbl[16 + x] = (uint8_t)gf_mul(gf, c, x << 4);
+		}
+		return;
+	}
+	for (k = 0; k < 4; k++) {
+		for (x = 0; x < 16; x++) {
+			v = gf_mul(gf, c, x << (4 * k));
+			tbl[32 * k + x] = v & 0xff;
+			tbl[32 * k + 16 + x] = v >> 8;
+		}
+	}
+}
+
+/* the dimensions of the tables, returns their size or 0 when not supported */
+static size_t simd_layout(struct rs_simd *t, int symsize, int nroots,
+			  int max_len)
+{
+	int nn = (1 << symsize) - 1;
+	size_t size;
+
+	if (max_len > nn)
+		max_len = nn;
+	t->symsize = symsize;
+	t->nroots = nroots;
+	t->m_pad = (nroots + J_BLOCK - 1) / J_BLOCK * J_BLOCK;
+	t->tb = symsize <= 8 ? 32 : 128;
+	t->max_msg = max_len - nroots;
+	t->max_len = max_len;
+	if (t->max_msg < 1)
+		return 0;
+	size = (size_t)(t->max_msg + max_len) * t->m_pad * t->tb;
+	return size > MAX_TABLES ? 0 : size;
+}
+
+size_t rs_simd_size(int symsize, int nroots, int max_len)
+{
+	struct rs_simd t;
+
+	return simd_layout(&t, symsize, nroots, max_len);
+}
+
+const uint8_t *rs_simd_tables(const struct rs_simd *t, size_t *size)
+{
+	*size = (size_t)(t->max_msg + t->max_len) * t->m_pad * t->tb;
+	return t->gtab;
+}
+
+struct rs_simd *rs_simd_wrap(int symsize, int nroots, int max_len,
+			     const uint8_t *tables, size_t size)
+{
+	struct rs_simd *t = calloc(1, sizeof(*t));
+	size_t need;
+
+	if (!t)
+		return NULL;
+	need = simd_layout(t, symsize, nroots, max_len);
+	if (!need || size < need) {
+		free(t);
+		return NULL;
+	}
+	/* only read by the kernels */
+	t->gtab = (uint8_t *)tables;
+	t->htab = t->gtab + (size_t)t->max_msg * t->m_pad * t->tb;
+	return t;
+}
+
+struct rs_simd *rs_simd_new(int symsize, int gfpoly, int fcr, int prim,
+			    int nroots, int max_len)
+{
+	struct rs_simd *t;
+	struct rs_gf gf = {0};
+	uint16_t *genpoly = NULL, *par = NULL;
+	int i, j, r, root, fb, nn, max_msg;
+	size_t size;
+
+	t = calloc(1, sizeof(*t));
+	if (!t)
+		return NULL;
+	size = simd_layout(t, symsize, nroots, max_len);
+	if (!size) {
+		free(t);
+		return NULL;
+	}
+	nn = (1 << symsize) - 1;
+	max_msg = t->max_msg;
+	max_len = t->max_len;
+
+	t->gtab = calloc(size, 1);
+	t->htab = t->gtab + (size_t)max_msg * t->m_pad * t->tb;
+	t->owned = 1;
+	genpoly = calloc(nroots + 1, sizeof(uint16_t));
+	par = calloc(nroots, sizeof(uint16_t));
+	if (!t->gtab || gf_init(&gf, symsize, gfpoly) < 0 || !genpoly ||
+	    !par)
+		goto fail;
+
+	/* generator polynomial in index form, as init_rs */
+	genpoly[0] = 1;
+	for (i = 0, root = fcr * prim; i < nroots; i++, root += prim) {
+		genpoly[i + 1] = 1;
+		for (j = i; j > 0; j--) {
+			if (genpoly[j] != 0)
+				genpoly[j] = genpoly[j - 1] ^
+					gf.alpha_to[(gf.index_of[genpoly[j]] + root) % nn];
+			else
+				genpoly[j] = genpoly[j - 1];
+		}
+		genpoly[0] = gf.alpha_to[(gf.index_of[genpoly[0]] + root) % nn];
+	}
+	for (i = 0; i <= nroots; i++)
+		genpoly[i] = gf.index_of[genpoly[i]];
+
+	/*
+	 * feed a single 1 followed by zeros through the encoder register of
+	 * encode_rs. After d zeros it holds the parity of the message position
+	 * d symbols before the end
+	 */
+	fb = 1;
+	for (r = max_msg - 1; r >= 0; r--) {
+		fb = gf.index_of[fb ^ par[0]];
+		if (fb != nn) {
+			for (j = 1; j < nroots; j++)
+				par[j] ^= gf.alpha_to[(fb + genpoly[nroots - j]) % nn];
+		}
+		memmove(&par[0], &par[1], sizeof(uint16_t) * (nroots - 1));
+		par[nroots - 1] = fb != nn ?
+			gf.alpha_to[(fb + genpoly[0]) % nn] : 0;
+		fb = 0;
+		for (j = 0; j < nroots; j++)
+			split_table(&gf, symsize, par[j],
+				    t->gtab + ((size_t)r * t->m_pad + j) * t->tb);
+	}
+
+	for (r = 0; r < max_len; r++) {
+		long d = max_len - 1 - r;
+
+		for (j = 0; j < nroots; j++) {
+			long e = (long)((fcr + j) * prim % nn) * d % nn;
+
+			split_table(&gf, symsize, gf.alpha_to[e],
+				    t->htab + ((size_t)r * t->m_pad + j) * t->tb);
+		}
+	}
+
+	gf_free(&gf);
+	free(genpoly);
+	free(par);
+	return t;
+
+fail:
+	gf_free(&gf);
+	free(genpoly);
+	free(par);
+	rs_simd_free(t);
+	return NULL;
+}
+
+void rs_simd_free(struct rs_simd *t)
+{
+	if (!t)
+		return;
+	if (t->owned)
+		free(t->gtab);
+	free(t);
+}
+
+/* ------------------------------------------------------------------------ */
+/* kernels: out[j][0..T) = sum_i col[i][0..T) * tbl[i][j] */
+
+#ifdef RS_HAVE_X86
+
+#define GF8_TILE(name, isa, vec, T, load, store, bcast, shuf, and, xor, \
+		 srli, set1, zero)					\
+__attribute__((target(isa)))					\
+static void name(const uint8_t *tbl, int k, int m_pad,			\
+		 const uint8_t *col, uint8_t *out, uint8_t msk)		\
+{									\
+	const vec lo4 = set1(0x0f), vmsk = set1(msk);			\
+	vec acc[J_BLOCK], x, xl, xh;					\
+	const uint8_t *tp;						\
+	int i, j, jb;							\
+									\
+	for (jb = 0; jb < m_pad; jb += J_BLOCK) {			\
+		for (j = 0; j < J_BLOCK; j++)				\
+			acc[j] = zero();				\
+		for (i = 0; i < k; i++) {				\
+			x = and(load((const vec *)(col + i * T)), vmsk); \
+			xl = and(x, lo4);				\
+			xh = and(srli(x, 4), lo4);			\
+			tp = tbl + ((size_t)i * m_pad + jb) * 32;	\
+			for (j = 0; j < J_BLOCK; j++, tp += 32) {	\
+				acc[j] = xor(acc[j], shuf(bcast(tp), xl)); \
+				acc[j] = xor(acc[j], shuf(bcast(tp + 16), xh)); \
+			}						\
+		}							\
+		for (j = 0; j < J_BLOCK; j++)				\
+			store((vec *)(out + (jb + j) * T), acc[j]);	\
+	}								\
+}
+
+#define GF16_TILE(name, isa, vec, T, load, store, bcast, shuf, and, xor, \
+		  srli, set1, zero)					\
+__attribute__((target(isa)))					\
+static void name(const uint8_t *tbl, int k, int m_pad,			\
+		 const uint8_t *col, uint8_t *out, uint8_t msk)		\
+{									\
+	const vec lo4 = set1(0x0f), vmsk = set1(msk);			\
+	vec lo[J_BLOCK], hi[J_BLOCK], n[4], xl, xh;			\
+	const uint8_t *tp;						\
+	int i, j, jb, q;						\
+									\
+	for (jb = 0; jb < m_pad; jb += J_BLOCK) {			\
+		for (j = 0; j < J_BLOCK; j++)				\
+			lo[j] = hi[j] = zero();				\
+		for (i = 0; i < k; i++) {				\
+			xl = load((const vec *)(col + 2 * i * T));	\
+			xh = and(load((const vec *)(col + (2 * i + 1) * T)), vmsk); \
+			n[0] = and(xl, lo4);				\
+			n[1] = and(srli(xl, 4), lo4);			\
+			n[2] = and(xh, lo4);				\
+			n[3] = and(srli(xh, 4), lo4);			\
+			tp = tbl + ((size_t)i * m_pad + jb) * 128;	\
+			for (j = 0; j < J_BLOCK; j++, tp += 128) {	\
+				for (q = 0; q < 4; q++) {		\
+					lo[j] = xor(lo[j], shuf(bcast(tp + 32 * q), n[q])); \
+					hi[j] = xor(hi[j], shuf(bcast(tp + 32 * q + 16), n[q])); \
+				}					\
+			}						\
+		}							\
+		for (j = 0; j < J_BLOCK; j++) {				\
+			store((vec *)(out + 2 * (jb + j) * T), lo[j]);	\
+			store((vec *)(out + (2 * (jb + j) + 1) * T), hi[j]); \
+		}							\
+	}								\
+}
+
+#define BCAST128(p) _mm_loadu_si128((const __m128i *)(p))
+#define BCAST256(p) _mm256_broadcastsi128_si256(_mm_loadu_si128((const __m128i *)(p)))
+#define SRLI16_128(x, n) _mm_srli_epi16(x, n)
+#define SRLI16_256(x, n) _mm256_srli_epi16(x, n)
+
+GF8_TILE(gf8_tile_ssse3, "ssse3", __m128i, 16, _mm_loadu_si128,
+	 _mm_storeu_si128, BCAST128, _mm_shuffle_epi8, _mm_and_si128,
+	 _mm_xor_si128, SRLI16_128, _mm_set1_epi8, _mm_setzero_si128)
+GF8_TILE(gf8_tile_avx2, "avx2", __m256i, 32, _mm256_loadu_si256,
+	 _mm256_storeu_si256, BCAST256, _mm256_shuffle_epi8, _mm256_and_si256,
+	 _mm256_xor_si256, SRLI16_256, _mm256_set1_epi8, _mm256_setzero_si256)
+GF16_TILE(gf16_tile_ssse3, "ssse3", __m128i, 16, _mm_loadu_si128,
+	  _mm_storeu_si128, BCAST128, _mm_shuffle_epi8, _mm_and_si128,
+	  _mm_xor_si128, SRLI16_128, _mm_set1_epi8, _mm_setzero_si128)
+GF16_TILE(gf16_tile_avx2, "avx2", __m256i, 32, _mm256_loadu_si256,
+	  _mm256_storeu_si256, BCAST256, _mm256_shuffle_epi8, _mm256_and_si256,
+	  _mm256_xor_si256, SRLI16_256, _mm256_set1_epi8, _mm256_setzero_si256)
+
+#endif /* RS_HAVE_X86 */
+
+typedef void (*tile_fn)(const uint8_t *tbl, int k, int m_pad,
+			const uint8_t *col, uint8_t *out, uint8_t msk);
+
+/* the kernel for the current level and the number of rows it takes */
+static tile_fn pick_tile(int symsize, int *tile)
+{
+#ifdef RS_HAVE_X86
+	switch (rs_simd_get_level()) {
+	case RS_SIMD_AVX2:
+		*tile = 32;
+		return symsize <= 8 ? gf8_tile_avx2 : gf16_tile_avx2;
+	case RS_SIMD_SSSE3:
+		*tile = 16;
+		return symsize <= 8 ? gf8_tile_ssse3 : gf16_tile_ssse3;
+	default:
+		break;
+	}
+#endif
+	(void)symsize;
+	*tile = 0;
+	return NULL;
+}
+
+/*
+ * Transpose symbols [0, k) of rows row0 .. row0 + T into col, symbol i of all
+ * rows at col + i * T, or for 16 bit symbols the low bytes at col + 2 * i * T
+ * and the high bytes at col + (2 * i + 1) * T. Symbol i of a row is at i * step
+ */
+static void transpose_in(const struct rs_simd *t, const void *data,
+			 long stride, long step, int T, int k, uint8_t *col)
+{
+	int r, i;
+
+	if (t->symsize <= 8) {
+		for (r = 0; r < T; r++) {
+			const uint8_t *row = (const uint8_t *)data + r * stride;
+
+			for (i = 0; i < k; i++)
+				col[i * T + r] = row[i * step];
+		}
+		return;
+	}
+	for (r = 0; r < T; r++) {
+		const uint16_t *row = (const uint16_t *)data + r * stride;
+
+		for (i = 0; i < k; i++) {
+			col[2 * i * T + r] = row[i * step] & 0xff;
+			col[(2 * i + 1) * T + r] = row[i * step] >> 8;
+		}
+	}
+}
+
+static uint8_t symbol_mask(int symsize)
+{
+	int nn = (1 << symsize) - 1;
+
+	return symsize <= 8 ? (uint8_t)nn : (uint8_t)(nn >> 8);
+}
+
+int rs_simd_encode(struct rs_simd *t, void *data, int n_rows, int stride,
+		   int step, int len)
+{
+	uint8_t *col, *out;
+	tile_fn fn;
+	int T, n, r, j, w = t->symsize <= 8 ? 1 : 2;
+	const uint8_t *tbl;
+
+	fn = pick_tile(t->symsize, &T);
+	if (!fn || len > t->max_msg || n_rows < T)
+		return 0;
+
+	col = malloc((size_t)len * T * w);
+	out = malloc((size_t)t->m_pad * T * w);
+	if (!col || !out) {
+		free(col);
+		free(out);
+		return 0;
+	}
+
+	tbl = t->gtab + (size_t)(t->max_msg - len) * t->m_pad * t->tb;
+	for (n = 0; n + T <= n_rows; n += T) {
+		char *tile = (char *)data + (long)n * stride * w;
+
+		transpose_in(t, tile, stride, step, T, len, col);
+		fn(tbl, len, t->m_pad, col, out, symbol_mask(t->symsize));
+		for (r = 0; r < T; r++) {
+			if (w == 1) {
+				uint8_t *row = (uint8_t *)tile + (long)r * stride;
+
+				for (j = 0; j < t->nroots; j++)
+					row[(long)(len + j) * step] = out[j * T + r];
+			} else {
+				uint16_t *row = (uint16_t *)tile + (long)r * stride;
+
+				for (j = 0; j < t->nroots; j++)
+					row[(long)(len + j) * step] =
+						out[2 * j * T + r] |
+						out[(2 * j + 1) * T + r] << 8;
+			}
+		}
+	}
+
+	free(col);
+	free(out);
+	return n;
+}
+
+int rs_simd_clean(struct rs_simd *t, const void *data, int n_rows,
+		  int stride, int step, int len, uint8_t *clean)
+{
+	uint8_t *col, *out;
+	tile_fn fn;
+	int T, n, r, j, w = t->symsize <= 8 ? 1 : 2;
+	int n_sym = len + t->nroots;
+	const uint8_t *tbl;
+
+	fn = pick_tile(t->symsize, &T);
+	if (!fn || n_sym > t->max_len || n_rows < T)
+		return 0;
+
+	col = malloc((size_t)n_sym * T * w);
+	out = malloc((size_t)t->m_pad * T * w);
+	if (!col || !out) {
+		free(col);
+		free(out);
+		return 0;
+	}
+
+	tbl = t->htab + (size_t)(t->max_len - n_sym) * t->m_pad * t->tb;
+	for (n = 0; n + T <= n_rows; n += T) {
+		const char *tile = (const char *)data + (long)n * stride * w;
+
+		transpose_in(t, tile, stride, step, T, n_sym, col);
+		fn(tbl, n_sym, t->m_pad, col, out, symbol_mask(t->symsize));
+		for (r = 0; r < T; r++) {
+			uint8_t any = 0;
+
+			for (j = 0; j < t->nroots * w; j++)
+				any |= out[j * T + r];
+			clean[n + r] = !any;
+		}
+	}
+
+	free(col);
+	free(out);
+	return n;
+}
+
+/* ------------------------------------------------------------------------ */
+/* products with an arbitrary matrix */
+
+struct rs_gf *rs_gf_new(int symsize, int gfpoly)
+{
+	struct rs_gf *gf = calloc(1, sizeof(*gf));
+
+	if (!gf)
+		return NULL;
+	if (gf_init(gf, symsize, gfpoly) < 0) {
+		rs_gf_free(gf);
+		return NULL;
+	}
+	return gf;
+}
+
+void rs_gf_free(struct rs_gf *gf)
+{
+	if (!gf)
+		return;
+	gf_free(gf);
+	free(gf);
+}
+
+static unsigned get_symbol(const void *buf, int w, long i)
+{
+	return w == 1 ? ((const uint8_t *)buf)[i] : ((const uint16_t *)buf)[i];
+}
+
+/* positions [p0, len) of the rows, one symbol at a time */
+static void matmul_scalar(const struct rs_gf *gf, const uint16_t *coef, int k,
+			  int m, const void *src, long src_stride, void *dst,
+			  long dst_stride, long p0, long len)
+{
+	int i, j, lc, nn = gf->nn, w = gf->symsize <= 8 ? 1 : 2;
+	unsigned c, s, v;
+	long p;
+
+	for (j = 0; j < m; j++) {
+		for (p = p0; p < len; p++) {
+			v = 0;
+			for (i = 0; i < k; i++) {
+				c = coef[i * m + j] & nn;
+				s = get_symbol(src, w, i * src_stride + p) & nn;
+				if (!c || !s)
+					continue;
+				lc = gf->index_of[c] + gf->index_of[s];
+				v ^= gf->alpha_to[lc >= nn ? lc - nn : lc];
+			}
+			if (w == 1)
+				((uint8_t *)dst)[j * dst_stride + p] = v;
+			else
+				((uint16_t *)dst)[j * dst_stride + p] = v;
+		}
+	}
+}
+
+int rs_gf_matmul(const struct rs_gf *gf, const uint16_t *coef, int k, int m,
+		 const void *src, long src_stride, void *dst, long dst_stride,
+		 long len)
+{
+	uint8_t *tbl, *col, *out;
+	tile_fn fn;
+	int T, i, j, r, m_pad, tb, w = gf->symsize <= 8 ? 1 : 2;
+	long p = 0;
+
+	fn = pick_tile(gf->symsize, &T);
+	if (!fn || len < T) {
+		matmul_scalar(gf, coef, k, m, src, src_stride, dst, dst_stride,
+			      0, len);
+		return 0;
+	}
+
+	m_pad = (m + J_BLOCK - 1) / J_BLOCK * J_BLOCK;
+	tb = w == 1 ? 32 : 128;
+	tbl = calloc((size_t)k * m_pad, tb);
+	col = malloc((size_t)k * T * w);
+	out = malloc((size_t)m_pad * T * w);
+	if (!tbl || !col || !out) {
+		free(tbl);
+		free(col);
+		free(out);
+		return -1;
+	}
+	for (i = 0; i < k; i++) {
+		for (j = 0; j < m; j++)
+			split_table(gf, gf->symsize, coef[i * m + j] & gf->nn,
+				    tbl + ((size_t)i * m_pad + j) * tb);
+	}
+
+	for (p = 0; p + T <= len; p += T) {
+		if (w == 1) {
+			for (i = 0; i < k; i++)
+				memcpy(col + i * T, (const uint8_t *)src +
+				       i * src_stride + p, T);
+		} else {
+			for (i = 0; i < k; i++) {
+				const uint16_t *s = (const uint16_t *)src +
+					i * src_stride + p;
+
+				for (r = 0; r < T; r++) {
+					col[2 * i * T + r] = s[r] & 0xff;
+					col[(2 * i + 1) * T + r] = s[r] >> 8;
+				}
+			}
+		}
+		fn(tbl, k, m_pad, col, out, symbol_mask(gf->symsize));
+		if (w == 1) {
+			for (j = 0; j < m; j++)
+				memcpy((uint8_t *)dst + j * dst_stride + p,
+				       out + j * T, T);
+		} else {
+			for (j = 0; j < m; j++) {
+				uint16_t *d = (uint16_t *)dst + j * dst_stride + p;
+
+				for (r = 0; r < T; r++)
+					d[r] = out[2 * j * T + r] |
+						out[(2 * j + 1) * T + r] << 8;
+			}
+		}
+	}
+	matmul_scalar(gf, coef, k, m, src, src_stride, dst, dst_stride, p, len);
+
+	free(tbl);
+	free(col);
+	free(out);
+	return 0;
+}
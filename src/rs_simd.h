@@ -0,0 +1,86 @@
+/*
+ * Original Author    : Edwin G. W. Peters @ epeters
+ * ------------------------------------------------------------------------------
+ * File Name          : rs_simd.h
+ * Description        : Vectorized parity and syndrome kernels, see rs_simd.c
+ * ------------------------------------------------------------------------------
+ * Copyright          : License GPL3
+ * ------------------------------------------------------------------------------
+ */
+
+#ifndef RS_SIMD_H
+#define RS_SIMD_H
+
+#include <stddef.h>
+#include <stdint.h>
+
+enum rs_simd_level {
+	RS_SIMD_SCALAR = 0,
+	RS_SIMD_SSSE3,
+	RS_SIMD_AVX2,
+};
+
+struct rs_simd;
+
+/* best level supported by the cpu, and the level currently in use */
+enum rs_simd_level rs_simd_detect(void);
+enum rs_simd_level rs_simd_get_level(void);
+int rs_simd_set_level(enum rs_simd_level level);
+const char *rs_simd_level_name(enum rs_simd_level level);
+
+/*
+ * Tables for codewords of up to max_len symbols. Returns NULL when the code is
+ * not supported or the tables would be too large, the callers then stay with
+ * the scalar library
+ */
+struct rs_simd *rs_simd_new(int symsize, int gfpoly, int fcr, int prim,
+			    int nroots, int max_len);
+void rs_simd_free(struct rs_simd *t);
+
+/*
+ * Version of the layout of the stored tables below. Bump it whenever the
+ * content or the order of the tables changes, blocks of another version are
+ * rebuilt by their users
+ */
+#define RS_SIMD_TABLES_VERSION	1
+
+/*
+ * The tables are a single block of rs_simd_size bytes, which does not depend
+ * on the instruction set. rs_simd_tables gives the block of a codec, to be
+ * stored, and rs_simd_wrap makes a codec on a stored block without copying it.
+ * The block has to outlive that codec. rs_simd_size is 0 when rs_simd_new
+ * would return NULL
+ */
+size_t rs_simd_size(int symsize, int nroots, int max_len);
+const uint8_t *rs_simd_tables(const struct rs_simd *t, size_t *size);
+struct rs_simd *rs_simd_wrap(int symsize, int nroots, int max_len,
+			     const uint8_t *tables, size_t size);
+
+/*
+ * Both work on whole tiles of rows and return the number of rows they handled,
+ * always the first rows. The remaining rows are left to the scalar library.
+ *
+ * rs_simd_encode writes the parity of each row, rs_simd_clean sets clean[n] to
+ * 1 when all syndromes of row n are zero and to 0 otherwise. Rows start stride
+ * symbols apart and their symbols are step symbols apart, see rs_batch.c
+ */
+int rs_simd_encode(struct rs_simd *t, void *data, int n_rows, int stride,
+		   int step, int len);
+int rs_simd_clean(struct rs_simd *t, const void *data, int n_rows,
+		  int stride, int step, int len, uint8_t *clean);
+
+/*
+ * Field arithmetic for rs_gf_matmul: dst[j][p] = sum_i src[i][p] * coef[i][j]
+ * for p < len, with k rows in src, m rows in dst, their strides in symbols and
+ * coef a k x m matrix of field elements. Symbols are uint8_t for symsize <= 8
+ * and uint16_t otherwise. Returns -1 when out of memory
+ */
+struct rs_gf;
+
+struct rs_gf *rs_gf_new(int symsize, int gfpoly);
+void rs_gf_free(struct rs_gf *gf);
+int rs_gf_matmul(const struct rs_gf *gf, const uint16_t *coef, int k, int m,
+		 const void *src, long src_stride, void *dst, long dst_stride,
+		 long len);
+
+#endif
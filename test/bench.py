@@ -93,6 +93,8 @@ for rs_p in rs_params:
 
 
     print(f'RS ({total_len}, {msg_len}, {sym_size}) -- encoding and decoding {N_TESTS} runs\n')
+    if pyreedsolomon.lib is not None:
+        print(f'vector instructions: {pyreedsolomon.lib.simd_level()}\n')
 
     print('| test name | encoding | decoding | num errors|\n| :------- | -------: | ------: | :----: |')
 
@@ -163,6 +165,118 @@ for rs_p in rs_params:
     print(f'| {"pyreedsolomon fast":29} | {t_e1-t_b1:.3f} s {(t_e1-t_b1)/N_TESTS*1000:.3f} ms each | {t_e2-t_b2:.3f} s {(t_e2-t_b2)/N_TESTS*1000:.3f} ms each | {np.sum(n_errors2<0)} |')
     # print(f'{"fast":21} -- encoding time {t_e1-t_b1:.3f} s {(t_e1-t_b1)/N_TESTS*1000:.3f} ms each - decoding time {t_e2-t_b2:.3f} s {(t_e2-t_b2)/N_TESTS*1000:.3f} ms each - num_errors: {np.sum(n_errors2<0)}')
 
+    t_fast = (t_e1-t_b1, t_e2-t_b2)
+
+    # batch: all codewords in one call
+    data_batch = np.array(data)
+
+    t_b1 = time.time()
+    rs_dr.encode_batch(data_batch)
+    t_e1 = time.time()
+
+    t_b2 = time.time()
+    _, n_errors3 = rs_dr.decode_batch(data_batch)
+    t_e2 = time.time()
+
+    assert np.all(data_batch == np.array(d_dec2)), 'batch and fast results differ'
+
+    test_names.append('batch')
+    encoding_times.append((t_e1-t_b1)/N_TESTS*1000000)
+    decoding_times.append((t_e2-t_b2)/N_TESTS*1000000)
+
+    print(f'| {"pyreedsolomon batch":29} | {t_e1-t_b1:.3f} s {(t_e1-t_b1)/N_TESTS*1000:.3f} ms each | {t_e2-t_b2:.3f} s {(t_e2-t_b2)/N_TESTS*1000:.3f} ms each | {np.sum(n_errors3<0)} |')
+
+    t_batch = (t_e1-t_b1, t_e2-t_b2)
+
+    # the vectorized kernels have to agree with the scalar library
+    if pyreedsolomon.lib is not None:
+        level = pyreedsolomon.lib.simd_level()
+        data_scalar = np.array(data)
+        pyreedsolomon.lib.set_simd_level('scalar')
+        try:
+            rs_dr.encode_batch(data_scalar)
+            assert np.all(data_scalar == data_batch), f'{level} and scalar parity differ'
+            _, n_errors_scalar = rs_dr.decode_batch(data_scalar)
+            assert np.all(n_errors_scalar == n_errors3), f'{level} and scalar decoding differ'
+        finally:
+            pyreedsolomon.lib.set_simd_level(level)
+
+    # the FFT decoder of long codes has to agree with the library, also on codewords with
+    # errors, some of them beyond what can be corrected
+    if pyreedsolomon.lib is not None and sym_size > 8:
+        threshold = pyreedsolomon.lib.fft_threshold()
+        data_lib = rs_dr.encode_batch(np.array(data[:1000]))
+        rows = np.arange(len(data_lib))[:,None]
+        data_lib[rows,np.random.randint(0,total_len,(len(data_lib),par_len//2+1))] ^= 1
+        data_fft = data_lib.copy()
+        try:
+            pyreedsolomon.lib.set_fft_threshold(-1)
+            _, n_errors_lib = rs_dr.decode_batch(data_lib)
+            pyreedsolomon.lib.set_fft_threshold(0)
+            _, n_errors_fft = rs_dr.decode_batch(data_fft)
+        finally:
+            pyreedsolomon.lib.set_fft_threshold(threshold)
+        assert np.all(data_fft == data_lib) and np.all(n_errors_fft == n_errors_lib), 'FFT decoder and library differ'
+
+    # an interleaved frame is coded through a strided view and has to match its codewords
+    # coded one by one, with a burst that is too long for some of them
+    depth = 64
+    il = pyreedsolomon.Interleaved(rs_dr,depth)
+    data_il = np.array(data[:depth])
+    data_il[:,msg_len:] = 0
+    frame = np.ascontiguousarray(data_il.T).ravel()
+    rs_dr.encode_batch(data_il)
+    il.encode(frame)
+    assert np.all(frame.reshape(-1,depth).T == data_il), 'interleaved and batch parity differ'
+    frame[100:100+depth*par_len//2+depth//2] ^= 1
+    data_il = frame.reshape(-1,depth).T.copy()
+    _, n_errors_il = il.decode(frame)
+    _, n_errors_ref = rs_dr.decode_batch(data_il)
+    assert np.all(frame.reshape(-1,depth).T == data_il) and np.all(n_errors_il == n_errors_ref), 'interleaved and batch decoding differ'
+
+    # parallel: the batch split over a pool with a thread per cpu
+    data_par = np.array(data)
+
+    t_b1 = time.time()
+    rs_dr.parallel_encode(data_par)
+    t_e1 = time.time()
+
+    t_b2 = time.time()
+    _, n_errors4 = rs_dr.parallel_decode(data_par)
+    t_e2 = time.time()
+
+    assert np.all(data_par == data_batch), 'parallel and batch results differ'
+
+    test_names.append('parallel')
+    encoding_times.append((t_e1-t_b1)/N_TESTS*1000000)
+    decoding_times.append((t_e2-t_b2)/N_TESTS*1000000)
+
+    print(f'| {"pyreedsolomon parallel":29} | {t_e1-t_b1:.3f} s {(t_e1-t_b1)/N_TESTS*1000:.3f} ms each | {t_e2-t_b2:.3f} s {(t_e2-t_b2)/N_TESTS*1000:.3f} ms each | {np.sum(n_errors4<0)} |')
+
+    t_parallel = (t_e1-t_b1, t_e2-t_b2)
+
+    # numpy backend: the same batch, vectorized in numpy
+    rs_np = pyreedsolomon.Reed_Solomon(sym_size,msg_len,total_len,pol,0,1,par_len,backend='numpy')
+    data_np = np.array(data)
+
+    t_b1 = time.time()
+    rs_np.encode_batch(data_np)
+    t_e1 = time.time()
+
+    t_b2 = time.time()
+    _, n_errors5 = rs_np.decode_batch(data_np)
+    t_e2 = time.time()
+
+    assert np.all(data_np == data_batch), 'numpy backend and batch results differ'
+
+    test_names.append('numpy')
+    encoding_times.append((t_e1-t_b1)/N_TESTS*1000000)
+    decoding_times.append((t_e2-t_b2)/N_TESTS*1000000)
+
+    print(f'| {"pyreedsolomon numpy":29} | {t_e1-t_b1:.3f} s {(t_e1-t_b1)/N_TESTS*1000:.3f} ms each | {t_e2-t_b2:.3f} s {(t_e2-t_b2)/N_TESTS*1000:.3f} ms each | {np.sum(n_errors5<0)} |')
+
+    t_numpy = (t_e1-t_b1, t_e2-t_b2)
+
 
 
     if HAS_UNIREEDSOLOMON:
@@ -243,6 +357,13 @@ for rs_p in rs_params:
 
 
 
+    # throughput in MB/s of message data
+    n_bytes = N_TESTS * msg_len * np.dtype(data_dtype).itemsize
+    print(f'\nthroughput fast:  encoding {n_bytes/t_fast[0]/1e6:.2f} MB/s | decoding {n_bytes/t_fast[1]/1e6:.2f} MB/s')
+    print(f'throughput batch: encoding {n_bytes/t_batch[0]/1e6:.2f} MB/s | decoding {n_bytes/t_batch[1]/1e6:.2f} MB/s')
+    print(f'throughput parallel: encoding {n_bytes/t_parallel[0]/1e6:.2f} MB/s | decoding {n_bytes/t_parallel[1]/1e6:.2f} MB/s')
+    print(f'throughput numpy: encoding {n_bytes/t_numpy[0]/1e6:.2f} MB/s | decoding {n_bytes/t_numpy[1]/1e6:.2f} MB/s\n')
+
     ### plot results
 
     try:
@@ -0,0 +1,229 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : benchmark.py
+# Description        : Benchmark suite with JSON results and baseline comparison
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Benchmark suite for pyreedsolomon
+
+Times encoding and decoding, clean and with correctable errors, for every input type of
+encode/decode, the fast single codeword calls, batches of different sizes and the thread
+pool with different numbers of threads. Every case is run a number of times after a warmup,
+each run timed with time.perf_counter_ns, and reported as throughput of message data in
+MB/s together with the p50 and p99 latency of a single run.
+
+The results are written as JSON. Given a baseline from an earlier run, every case whose
+median latency is above the baseline by more than the tolerance is reported and the exit
+status is 1, so the suite can be used as a regression check:
+
+    python benchmark.py --out base.json
+    python benchmark.py --baseline base.json --tolerance 0.15
+"""
+
+import sys
+sys.path.append('..')
+import argparse
+import json
+import os
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pyreedsolomon
+
+# name: (symsize, message_size, total_size, gfpoly, fcr, prim, nroots)
+CODES = {
+    'rs973_935_10': (10,935,973,0x409,0,1,38),
+    'rs255_223_8': (8,223,255,0x11d,0,1,32),
+    'rs15_11_4': (4,11,15,0x13,0,1,4),
+}
+
+INPUT_TYPES = ['ndarray','list','bytearray','bytes']
+BATCH_SIZES = [16,256,4096]
+THREAD_COUNTS = [1,2,4]
+POOL_SIZE = 64 # distinct messages the single codeword cases cycle through
+
+
+def _measure(run,prepare,warmup,repeat):
+    """
+    Time repeat runs of run() after warmup runs. prepare(i) is called before run i, outside
+    of the timed section
+
+    returns the duration of each run in ns
+    """
+    for i in range(warmup):
+        prepare(i)
+        run()
+    times = np.empty(repeat,dtype=np.int64)
+    for i in range(repeat):
+        prepare(i)
+        t0 = time.perf_counter_ns()
+        run()
+        times[i] = time.perf_counter_ns() - t0
+    return times
+
+
+def _result(name,times,n_bytes,**info):
+    """
+    Summary of a case, n_bytes is the message data handled by a single run
+    """
+    return dict(name=name,mb_s=n_bytes*len(times)/times.sum()*1e3,
+                p50_us=float(np.percentile(times,50))/1e3,p99_us=float(np.percentile(times,99))/1e3,
+                mean_us=float(times.mean())/1e3,runs=len(times),**info)
+
+
+def _corrupt(rs,cw,rng):
+    """
+    Add par_size // 2 symbol errors at random message and parity positions of each row of cw
+    """
+    n_err = rs.par_size // 2
+    rows = np.arange(len(cw))[:,None]
+    pos = np.argsort(rng.random(cw.shape),axis=1)[:,:n_err]
+    cw[rows,pos] ^= rng.integers(1,1 << rs.symsize,(len(cw),n_err)).astype(cw.dtype)
+    return cw
+
+
+def _as_type(msg,input_type):
+    if input_type == 'ndarray':
+        return msg
+    elif input_type == 'list':
+        return msg.tolist()
+    elif input_type == 'bytearray':
+        return bytearray(msg.tobytes())
+    return msg.tobytes()
+
+
+def bench_code(code_name,args,backend,warmup,repeat,batch_repeat):
+    """
+    All cases for one code, returns a list of results
+    """
+    rs = pyreedsolomon.Reed_Solomon(*args,backend=backend)
+    rng = np.random.default_rng(1)
+    msg_bytes = rs.message_size * np.dtype(rs.dtype).itemsize
+    info = dict(code=code_name,backend=backend)
+    results = []
+
+    msgs = rng.integers(0,1 << rs.symsize,(POOL_SIZE,rs.message_size)).astype(rs.dtype)
+    cws = np.zeros((POOL_SIZE,rs.total_size),dtype=rs.dtype)
+    cws[:,:rs.message_size] = msgs
+    rs.encode_batch(cws)
+    bad = _corrupt(rs,cws.copy(),rng)
+
+    # encode/decode with every input type
+    for input_type in INPUT_TYPES:
+        src_msg = [_as_type(m,input_type) for m in msgs]
+        src_cw = [_as_type(c,input_type) for c in cws]
+        src_bad = [_as_type(c,input_type) for c in bad]
+        k = [0]
+        def pick(i):
+            k[0] = i % POOL_SIZE
+        for op, src, fn in [('encode',src_msg,rs.encode),('decode',src_cw,rs.decode),
+                            ('decode_errors',src_bad,rs.decode)]:
+            times = _measure(lambda: fn(src[k[0]]),pick,warmup,repeat)
+            results.append(_result(f'{code_name}/{op}/{input_type}',times,msg_bytes,op=op,
+                                   input=input_type,batch=1,threads=1,**info))
+
+    # encode_fast/decode_fast on a working copy
+    work = np.empty(rs.total_size,dtype=rs.dtype)
+    for op, src, fn in [('encode_fast',cws,rs.encode_fast),('decode_fast',cws,rs.decode_fast),
+                        ('decode_fast_errors',bad,rs.decode_fast)]:
+        times = _measure(lambda: fn(work),lambda i: np.copyto(work,src[i % POOL_SIZE]),warmup,repeat)
+        results.append(_result(f'{code_name}/{op}',times,msg_bytes,op=op,input='ndarray',
+                               batch=1,threads=1,**info))
+
+    # batches, and the thread pool on the largest batch
+    executors = []
+    for batch in BATCH_SIZES + [None]:
+        n = batch or BATCH_SIZES[-1]
+        src = cws[np.arange(n) % POOL_SIZE]
+        src_bad = _corrupt(rs,src.copy(),rng)
+        work = np.empty_like(src)
+        cases = [('encode_batch',src,rs.encode_batch),('decode_batch',src,rs.decode_batch),
+                 ('decode_batch_errors',src_bad,rs.decode_batch)]
+        if batch is None:
+            cases = []
+            for threads in THREAD_COUNTS:
+                executor = ThreadPoolExecutor(threads)
+                executors.append(executor)
+                cases += [(f'parallel_encode/{threads}',src,lambda d, t=threads, e=executor: rs.parallel_encode(d,t,e)),
+                          (f'parallel_decode/{threads}',src,lambda d, t=threads, e=executor: rs.parallel_decode(d,t,e)),
+                          (f'parallel_decode_errors/{threads}',src_bad,lambda d, t=threads, e=executor: rs.parallel_decode(d,t,e))]
+        for op, data, fn in cases:
+            times = _measure(lambda: fn(work),lambda i: np.copyto(work,data),min(warmup,2),batch_repeat)
+            threads = int(op.split('/')[1]) if '/' in op else 1
+            results.append(_result(f'{code_name}/{op}/{n}',times,n*msg_bytes,op=op.split('/')[0],
+                                   input='ndarray',batch=n,threads=threads,**info))
+
+    for executor in executors:
+        executor.shutdown()
+    return results
+
+
+def metadata(backend):
+    return dict(time=time.strftime('%Y-%m-%dT%H:%M:%S%z'),python=platform.python_version(),
+                numpy=np.__version__,platform=platform.platform(),processor=platform.processor(),
+                cpus=os.cpu_count(),backend=backend,
+                simd=pyreedsolomon.lib.simd_level() if pyreedsolomon.lib is not None else None)
+
+
+def compare(results,baseline,tolerance):
+    """
+    Cases whose median latency exceeds the baseline by more than tolerance (a fraction). The
+    median is compared rather than the throughput, which is sensitive to outliers
+
+    returns a list of (name, baseline p50 in us, p50 in us)
+    """
+    base = {r['name']: r for r in baseline['results']}
+    slower = []
+    for r in results:
+        b = base.get(r['name'])
+        if b is not None and r['p50_us'] > b['p50_us'] * (1 + tolerance):
+            slower.append((r['name'],b['p50_us'],r['p50_us']))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--codes',nargs='+',default=list(CODES),choices=list(CODES),help='codes to run')
+    parser.add_argument('--backend',default=None,help="'native' or 'numpy', see Reed_Solomon")
+    parser.add_argument('--filter',default='',help='only report cases with this substring in the name')
+    parser.add_argument('--warmup',type=int,default=20,help='untimed runs before each case')
+    parser.add_argument('--repeat',type=int,default=500,help='timed runs of each single codeword case')
+    parser.add_argument('--batch-repeat',type=int,default=10,help='timed runs of each batch case')
+    parser.add_argument('--out',default=None,help='write the results to this JSON file')
+    parser.add_argument('--baseline',default=None,help='JSON file of an earlier run to compare with')
+    parser.add_argument('--tolerance',type=float,default=0.1,help='allowed slowdown against the baseline')
+    args = parser.parse_args(argv)
+
+    backend = args.backend or pyreedsolomon.pyreedsolomon._default_backend()
+    results = []
+    for code_name in args.codes:
+        results += [r for r in bench_code(code_name,CODES[code_name],backend,args.warmup,args.repeat,args.batch_repeat)
+                    if args.filter in r['name']]
+
+    print(f'| {"case":48} | {"MB/s":>9} | {"p50 us":>10} | {"p99 us":>10} |')
+    print(f'| :{"-"*47} | {"-"*8}: | {"-"*9}: | {"-"*9}: |')
+    for r in results:
+        print(f'| {r["name"]:48} | {r["mb_s"]:9.2f} | {r["p50_us"]:10.2f} | {r["p99_us"]:10.2f} |')
+
+    if args.out:
+        with open(args.out,'w') as f:
+            json.dump(dict(meta=metadata(backend),results=results),f,indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        slower = compare(results,baseline,args.tolerance)
+        for name, base, now in slower:
+            print(f'regression: {name} p50 {now:.2f} us, baseline {base:.2f} us ({now/base-1:+.1%})')
+        if slower:
+            return 1
+        print(f'no regressions beyond {args.tolerance:.0%} against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : ber.py
+# Description        : Frame and bit error rate curves from the channel simulator
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Frame and bit error rates of a code versus the channel error probability
+
+Runs pyreedsolomon.simulate for a range of error probabilities of one of the channel models
+of simulation.py and prints a table, optionally written as CSV as well:
+
+    python ber.py --code rs255_223_8 --channel symbol --p 0.02 0.03 0.04 0.05 --codewords 1e7
+    python ber.py --channel burst --length 48 --p 1e-4 3e-4 1e-3 --csv burst.csv
+"""
+
+import sys
+sys.path.append('..')
+import argparse
+import csv
+import time
+
+import pyreedsolomon
+from pyreedsolomon.simulation import CHANNELS
+
+# name: (symsize, message_size, total_size, gfpoly, fcr, prim, nroots)
+CODES = {
+    'rs973_935_10': (10,935,973,0x409,0,1,38),
+    'rs255_223_8': (8,223,255,0x11d,0,1,32),
+    'rs255_239_8': (8,239,255,0x11d,0,1,16),
+    'rs15_11_4': (4,11,15,0x13,0,1,4),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--code',default='rs255_223_8',choices=list(CODES),help='code to simulate')
+    parser.add_argument('--channel',default='symbol',choices=list(CHANNELS),help='channel model')
+    parser.add_argument('--p',type=float,nargs='+',default=[0.02,0.03,0.04,0.05,0.06],
+                        help='channel error probabilities')
+    parser.add_argument('--codewords',type=float,default=1e6,help='codewords per probability')
+    parser.add_argument('--max-frame-errors',type=int,default=None,
+                        help='stop a probability once this many frames were wrong')
+    parser.add_argument('--length',type=int,default=None,help='burst length of the burst channel')
+    parser.add_argument('--threads',type=int,default=None,help='threads, defaults to the number of cpus')
+    parser.add_argument('--seed',type=int,default=None,help='seed for a reproducible run')
+    parser.add_argument('--zero',action='store_true',help='send the all-zero codeword instead of random messages')
+    parser.add_argument('--csv',default=None,help='write the results to this CSV file')
+    args = parser.parse_args(argv)
+
+    rs = pyreedsolomon.Reed_Solomon(*CODES[args.code])
+    kwargs = dict(length=args.length) if args.channel == 'burst' else dict()
+
+    t0 = time.perf_counter()
+    results = pyreedsolomon.simulate(rs,args.channel,args.p,int(args.codewords),n_threads=args.threads,
+                                     seed=args.seed,max_frame_errors=args.max_frame_errors,
+                                     random_messages=not args.zero,**kwargs)
+    dt = time.perf_counter() - t0
+
+    print(f'| {"p":>10} | {"codewords":>12} | {"frame errors":>12} | {"failed":>10} | {"FER":>10} | {"BER":>10} |')
+    print(f'| {"-"*9}: | {"-"*11}: | {"-"*11}: | {"-"*9}: | {"-"*9}: | {"-"*9}: |')
+    for r in results:
+        print(f'| {r.p:10.3g} | {r.n_codewords:12d} | {r.frame_errors:12d} | {r.failed:10d} | {r.fer:10.3e} | {r.ber:10.3e} |')
+    n_symbols = sum(r.n_codewords for r in results) * rs.total_size
+    print(f'{n_symbols:.3g} symbols in {dt:.1f} s, {n_symbols/dt/1e6:.1f} M symbols/s')
+
+    if args.csv:
+        with open(args.csv,'w',newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(pyreedsolomon.simulation.Result._fields)
+            writer.writerows(results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,39 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : conftest.py
+# Description        : Fixtures shared by the tests
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import pytest
+
+import pyreedsolomon
+
+BACKENDS = ['numpy'] + (['native'] if pyreedsolomon.lib is not None else [])
+
+
+@pytest.fixture(autouse=True)
+def table_cache(tmp_path,monkeypatch):
+    """
+    Keep the tables of tablecache.py in a directory of the test, not in ~/.cache
+    """
+    path = tmp_path / 'tables'
+    monkeypatch.setenv('PYREEDSOLOMON_TABLE_CACHE',str(path))
+    return path
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    """
+    Every backend available, the numpy one and the native one when it is built
+    """
+    return request.param
+
+
+@pytest.fixture
+def rs(backend):
+    """
+    RS(255,223) of every backend. Test files with another code override it
+    """
+    return pyreedsolomon.Reed_Solomon(8,223,255,0x11d,0,1,32,backend=backend)
@@ -0,0 +1,103 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_aio.py
+# Description        : Micro-batching of concurrent requests, see aio.py
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from pyreedsolomon import AsyncReedSolomon
+
+
+def _batch_sizes(rs):
+    """
+    Record the number of rows of every call to encode_batch and decode_batch of rs
+    """
+    sizes = []
+    for name in ('encode_batch','decode_batch'):
+        func = getattr(rs,name)
+        def wrapper(dat,*args,_func=func,_name=name):
+            sizes.append((_name,len(dat)))
+            return _func(dat,*args)
+        setattr(rs,name,wrapper)
+    return sizes
+
+
+def _messages(rs,n,length):
+    rng = np.random.default_rng(length)
+    return [rng.integers(0,256,length).astype(rs.dtype) for _ in range(n)]
+
+
+def test_round_trip(rs):
+    msgs = _messages(rs,50,rs.message_size)
+    async def run():
+        ars = AsyncReedSolomon(rs)
+        cws = await asyncio.gather(*[ars.encode(m) for m in msgs])
+        for cw in cws:
+            cw[[0,5,rs.total_size-1]] ^= 1
+        return cws, await asyncio.gather(*[ars.decode(cw) for cw in cws])
+    cws, decoded = asyncio.run(run())
+    for msg, cw, (res, n_errors) in zip(msgs,cws,decoded):
+        ref = rs.encode(msg)
+        ref[[0,5,rs.total_size-1]] ^= 1
+        assert np.all(cw == ref)
+        assert n_errors == 3 and np.all(res == msg)
+
+
+def test_batching(rs):
+    """
+    Concurrent requests of the same length share a batch, of at most max_batch of them
+    """
+    sizes = _batch_sizes(rs)
+    msgs = _messages(rs,20,100) + _messages(rs,3,50)
+    async def run():
+        # a long delay, so only max_batch or the end of the delay start a batch
+        ars = AsyncReedSolomon(rs,max_batch=8,max_delay=0.05)
+        return await asyncio.gather(*[ars.encode(m) for m in msgs])
+    cws = asyncio.run(run())
+    assert sorted(sizes) == [('encode_batch',3),('encode_batch',4),('encode_batch',8),('encode_batch',8)]
+    for msg, cw in zip(msgs,cws):
+        assert np.all(cw == rs.encode(msg))
+
+
+def test_input_types(rs):
+    msg = _messages(rs,1,30)[0]
+    cw = rs.encode(msg)
+    async def run():
+        ars = AsyncReedSolomon(rs)
+        return await asyncio.gather(ars.encode(msg.tobytes()),ars.encode(msg.tolist()),
+                                    ars.encode(bytearray(msg)),ars.decode(cw.tobytes()))
+    as_bytes, as_list, as_bytearray, (decoded, n_errors) = asyncio.run(run())
+    assert as_bytes == cw.tobytes() and as_list == cw.tolist()
+    assert type(as_bytearray) == bytearray and as_bytearray == bytearray(cw)
+    assert decoded == msg.tobytes() and n_errors == 0
+
+
+def test_invalid(rs):
+    async def run(op,dat):
+        return await getattr(AsyncReedSolomon(rs),op)(dat)
+    with pytest.raises(ValueError,match='input data is empty'):
+        asyncio.run(run('encode',b''))
+    with pytest.raises(ValueError,match='larger than max allowed'):
+        asyncio.run(run('encode',bytes(rs.message_size + 1)))
+    with pytest.raises(ValueError,match='between'):
+        asyncio.run(run('decode',bytes(rs.par_size)))
+
+
+def test_failed_batch(rs,monkeypatch):
+    """
+    An exception in a batch is raised in every request of that batch
+    """
+    def fail(dat):
+        raise RuntimeError('library failure')
+    monkeypatch.setattr(rs,'encode_batch',fail)
+    async def run():
+        ars = AsyncReedSolomon(rs,max_batch=4)
+        return await asyncio.gather(*[ars.encode(m) for m in _messages(rs,4,10)],return_exceptions=True)
+    res = asyncio.run(run())
+    assert len(res) == 4 and all(isinstance(r,RuntimeError) for r in res)
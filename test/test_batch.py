@@ -0,0 +1,105 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_batch.py
+# Description        : encode_batch/decode_batch against the single codeword calls
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+
+# (symsize, message_size, total_size, gfpoly, fcr, prim, nroots)
+CODES = [
+    (4,11,15,0x13,0,1,4),
+    (8,223,255,0x11d,0,1,32),
+    (10,935,973,0x409,0,1,38),
+    (16,200,240,0x1100b,1,1,40),
+]
+
+code_ids = lambda c: f'rs{c[2]}_{c[1]}_{c[0]}'
+
+
+def _messages(rs,rng,n_rows,n_symbols):
+    dat = np.zeros((n_rows,n_symbols),dtype=rs.dtype)
+    dat[:,:n_symbols-rs.par_size] = rng.integers(0,1 << rs.symsize,(n_rows,n_symbols-rs.par_size))
+    return dat
+
+
+@pytest.mark.parametrize('code',CODES,ids=code_ids)
+def test_same_as_single(backend,code):
+    rs = pyreedsolomon.Reed_Solomon(*code,backend=backend)
+    rng = np.random.default_rng(code[2])
+    for n_symbols in (rs.total_size,rs.total_size - 5):
+        msg_len = n_symbols - rs.par_size
+        dat = _messages(rs,rng,50,n_symbols)
+        assert rs.encode_batch(dat) is dat
+        for row in dat:
+            assert np.all(row == rs.encode(row[:msg_len]))
+
+        # up to t errors in every row, in the message and the parity
+        bad = dat.copy()
+        for row in bad:
+            pos = rng.choice(n_symbols,rng.integers(0,rs.par_size // 2 + 1),replace=False)
+            row[pos] ^= rng.integers(1,1 << rs.symsize,len(pos)).astype(rs.dtype)
+        single = [rs.decode(row) for row in bad]
+
+        res, n_errors = rs.decode_batch(bad)
+        assert res is bad and n_errors.dtype == np.intc and n_errors.shape == (50,)
+        for row, cw, (msg, n) in zip(bad,dat,single):
+            assert np.all(row[:msg_len] == cw[:msg_len]) and np.all(msg == cw[:msg_len])
+        assert n_errors.tolist() == [n for _, n in single]
+
+
+def test_failed_rows(rs):
+    rng = np.random.default_rng(0)
+    dat = rs.encode_batch(_messages(rs,rng,10,rs.total_size))
+    bad = dat.copy()
+    # far too many errors in row 3, so decoding it fails and leaves it as is
+    bad[3,:100] ^= 0x55
+    failed = bad[3].copy()
+    bad[7,5] ^= 1
+
+    _, n_errors = rs.decode_batch(bad)
+    assert n_errors[3] == -pyreedsolomon.EBADMSG and np.all(bad[3] == failed)
+    assert n_errors[7] == 1 and np.all(np.delete(n_errors,[3,7]) == 0)
+    assert np.all(np.delete(bad,3,axis=0) == np.delete(dat,3,axis=0))
+
+
+def test_erasures(rs):
+    rng = np.random.default_rng(1)
+    dat = rs.encode_batch(_messages(rs,rng,4,rs.total_size))
+    eras = [[0,1,2],[],np.arange(rs.par_size),[200,254]]
+    bad = dat.copy()
+    for row, e in zip(bad,eras):
+        row[e] = 0
+
+    # a sequence of positions, and the same as an array padded with -1
+    padded = np.full((4,rs.par_size),-1)
+    for row, e in zip(padded,eras):
+        row[:len(e)] = e
+    for erasures in (eras,padded):
+        res = bad.copy()
+        _, n_errors = rs.decode_batch(res,erasures)
+        assert np.all(n_errors >= 0)
+        assert np.all(res[:,:rs.message_size] == dat[:,:rs.message_size])
+
+    with pytest.raises(ValueError,match='erasures for 4 codewords'):
+        rs.decode_batch(bad.copy(),eras[:3])
+
+
+def test_empty_and_invalid(rs):
+    empty = np.zeros((0,rs.total_size),dtype=rs.dtype)
+    assert rs.encode_batch(empty) is empty
+    _, n_errors = rs.decode_batch(empty)
+    assert len(n_errors) == 0
+
+    for bad in (np.zeros(rs.total_size,dtype=rs.dtype),np.zeros((2,rs.total_size + 1),dtype=rs.dtype),
+                np.zeros((2,rs.par_size),dtype=rs.dtype),np.zeros((2,rs.total_size),dtype=np.uint16),
+                np.zeros((2,rs.total_size),dtype=rs.dtype).tolist()):
+        with pytest.raises(ValueError):
+            rs.encode_batch(bad)
+        with pytest.raises(ValueError):
+            rs.decode_batch(bad)
@@ -0,0 +1,90 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_buffers.py
+# Description        : out= buffers and buffer protocol inputs of encode/decode
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import array
+import mmap
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+
+
+def _message(rs,n=100):
+    return np.random.default_rng(n).integers(0,256,n).astype(rs.dtype)
+
+
+def test_input_types(rs):
+    msg = _message(rs)
+    cw = rs.encode(msg)
+    assert type(cw) == np.ndarray and len(cw) == 100 + rs.par_size
+
+    assert rs.encode(msg.tolist()) == cw.tolist()
+    assert rs.encode(msg.tobytes()) == cw.tobytes()
+    res = rs.encode(bytearray(msg))
+    assert type(res) == bytearray and res == bytearray(cw)
+    for buf in (memoryview(msg.tobytes()),array.array('B',msg.tobytes())):
+        res = rs.encode(buf)
+        assert type(res) == np.ndarray and np.all(res == cw)
+
+    bad = cw.copy()
+    bad[[1,50,120]] ^= 1
+    for dat, kind in ((bad,np.ndarray),(bad.tolist(),list),(bad.tobytes(),bytes),
+                      (bytearray(bad),bytearray),(memoryview(bad.tobytes()),np.ndarray)):
+        res, n_errors = rs.decode(dat)
+        assert type(res) == kind and n_errors == 3
+        assert np.all(np.asarray(res if kind is list else np.frombuffer(res,dtype=rs.dtype)) == msg)
+
+
+def test_mmap(rs,tmp_path):
+    msg = _message(rs)
+    path = tmp_path / 'msg'
+    path.write_bytes(msg.tobytes())
+    with open(path,'rb') as f, mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ) as m:
+        assert np.all(rs.encode(m) == rs.encode(msg))
+
+
+def test_out(rs):
+    msg = _message(rs)
+    cw = rs.encode(msg)
+
+    # the parity is written straight into a numpy array or a writable buffer
+    out = np.zeros(len(cw),dtype=rs.dtype)
+    assert rs.encode(msg,out=out) is out and np.all(out == cw)
+    out = bytearray(len(cw))
+    assert rs.encode(msg.tobytes(),out=out) is out and out == bytearray(cw)
+    # a view that is not contiguous goes through the scratch buffer
+    out = np.zeros(2 * len(cw),dtype=rs.dtype)
+    rs.encode(msg,out=out[::2])
+    assert np.all(out[::2] == cw) and np.all(out[1::2] == 0)
+
+    bad = cw.copy()
+    bad[7] ^= 1
+    out = np.zeros(100,dtype=rs.dtype)
+    res, n_errors = rs.decode(bad,out=out)
+    assert res is out and n_errors == 1 and np.all(out == msg)
+    out = memoryview(bytearray(100))
+    res, n_errors = rs.decode(bytes(bad),out=out)
+    assert res is out and bytes(out) == msg.tobytes()
+
+    with pytest.raises(ValueError,match='out holds'):
+        rs.encode(msg,out=np.zeros(len(cw) - 1,dtype=rs.dtype))
+    with pytest.raises(ValueError,match='out holds'):
+        rs.decode(bad,out=bytearray(101))
+
+
+def test_uint16_buffers(backend):
+    rs = pyreedsolomon.Reed_Solomon(10,935,973,0x409,0,1,38,backend=backend)
+    msg = np.arange(935,dtype=np.uint16)
+    cw = rs.encode(msg)
+    # the bytes of a buffer are read as symbols of the dtype of the codec
+    assert rs.encode(msg.tobytes()) == cw.tobytes()
+    assert np.all(rs.encode(array.array('H',msg.tolist())) == cw)
+    out = bytearray(2 * len(cw))
+    rs.encode(msg,out=out)
+    assert out == cw.tobytes()
@@ -0,0 +1,53 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_check.py
+# Description        : The syndrome check of check/check_batch
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+
+def test_check(rs):
+    rng = np.random.default_rng(0)
+    for msg_len in (1,100,rs.message_size):
+        cw = rs.encode(rng.integers(0,256,msg_len).astype(rs.dtype))
+        assert rs.check(cw) is True
+        # a single error anywhere, also in the parity, is seen
+        for pos in (0,msg_len - 1,msg_len,len(cw) - 1):
+            bad = cw.copy()
+            bad[pos] ^= 0x80
+            assert rs.check(bad) is False
+
+
+@pytest.mark.parametrize('n_symbols',[255,60])
+def test_check_batch(rs,n_symbols):
+    rng = np.random.default_rng(n_symbols)
+    dat = np.zeros((100,n_symbols),dtype=rs.dtype)
+    dat[:,:n_symbols-rs.par_size] = rng.integers(0,256,(100,n_symbols-rs.par_size))
+    rs.encode_batch(dat)
+    assert np.all(rs.check_batch(dat))
+
+    bad_rows = rng.choice(100,30,replace=False)
+    for r in bad_rows:
+        dat[r,rng.choice(n_symbols,rng.integers(1,50),replace=False)] ^= 1
+    before = dat.copy()
+    clean = rs.check_batch(dat)
+    assert clean.dtype == np.bool_ and clean.shape == (100,)
+    assert sorted(np.flatnonzero(~clean)) == sorted(bad_rows)
+    assert np.all(clean == [rs.check(row) for row in dat])
+    # nothing is corrected
+    assert np.all(dat == before)
+
+    # the same for a strided view on the rows
+    assert np.all(rs.check_batch(dat[::3]) == clean[::3])
+
+
+def test_check_batch_invalid(rs):
+    assert len(rs.check_batch(np.zeros((0,rs.total_size),dtype=rs.dtype))) == 0
+    with pytest.raises(ValueError):
+        rs.check_batch(np.zeros(rs.total_size,dtype=rs.dtype))
+    with pytest.raises(ValueError):
+        rs.check_batch(np.zeros((2,rs.par_size),dtype=rs.dtype))
@@ -0,0 +1,111 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_codec_cache.py
+# Description        : The LRU cache of Reed_Solomon.get
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import gc
+import threading
+import weakref
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+from pyreedsolomon import Reed_Solomon
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    Reed_Solomon.cache_clear()
+    yield
+    Reed_Solomon.cache_resize(pyreedsolomon.CODEC_CACHE_SIZE)
+    Reed_Solomon.cache_clear()
+
+
+def _get(nroots,backend):
+    return Reed_Solomon.get(8,0x11d,0,1,nroots,backend=backend)
+
+
+def test_hits_and_defaults(backend):
+    rs = _get(32,backend)
+    assert (rs.message_size,rs.total_size,rs.backend) == (223,255,backend)
+    assert _get(32,backend) is rs
+    # another shortened length is another codec
+    short = Reed_Solomon.get(8,0x11d,0,1,32,100,132,backend=backend)
+    assert short is not rs and short.total_size == 132
+    info = Reed_Solomon.cache_info()
+    assert (info.hits,info.misses,info.evictions,info.currsize) == (1,2,0,2)
+    assert info.maxsize == pyreedsolomon.CODEC_CACHE_SIZE
+
+
+def test_backends_are_separate():
+    rs = _get(32,'numpy')
+    assert type(rs) is pyreedsolomon.NumpyReedSolomon
+    if pyreedsolomon.lib is not None:
+        native = _get(32,'native')
+        assert native is not rs and type(native) is Reed_Solomon
+
+
+def test_lru_eviction(backend):
+    Reed_Solomon.cache_resize(3)
+    codecs = [_get(n,backend) for n in (2,4,6)]
+    # using the first makes the second the least recently used one
+    assert _get(2,backend) is codecs[0]
+    _get(8,backend)
+    info = Reed_Solomon.cache_info()
+    assert (info.evictions,info.currsize,info.maxsize) == (1,3,3)
+    assert _get(2,backend) is codecs[0] and _get(6,backend) is codecs[2]
+    assert _get(4,backend) is not codecs[1]
+
+    # shrinking evicts the least recently used ones right away
+    Reed_Solomon.cache_resize(1)
+    assert Reed_Solomon.cache_info().currsize == 1
+    assert _get(4,backend) is not codecs[1]
+
+
+def test_release(backend):
+    """
+    An evicted codec stays usable while it is referenced, and is released with its native
+    structures as soon as it is not
+    """
+    Reed_Solomon.cache_resize(1)
+    rs = _get(32,backend)
+    ref = weakref.ref(rs)
+    msg = np.arange(100,dtype=np.uint8)
+    cw = rs.encode(msg)
+
+    _get(16,backend)
+    assert Reed_Solomon.cache_info().evictions == 1
+    assert np.all(rs.encode(msg) == cw)
+
+    del rs
+    gc.collect()
+    assert ref() is None
+
+    # cleared codecs are released as well
+    ref = weakref.ref(_get(16,backend))
+    Reed_Solomon.cache_clear()
+    gc.collect()
+    assert ref() is None
+    assert Reed_Solomon.cache_info() == (0,0,0,1,0)
+
+
+def test_threads(backend):
+    """
+    Threads asking for the same code at the same time all get the same codec
+    """
+    barrier = threading.Barrier(8)
+    codecs = []
+    def run():
+        barrier.wait()
+        codecs.append(_get(32,backend))
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(codecs) == 8 and all(c is codecs[0] for c in codecs)
+    assert Reed_Solomon.cache_info().misses == 1
@@ -0,0 +1,150 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_container.py
+# Description        : The container format of container.py
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import io
+import struct
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+from pyreedsolomon import container
+from pyreedsolomon.container import write_container, ContainerReader
+
+
+# (symsize, message_size, total_size, gfpoly, fcr, prim, nroots)
+CODES = {
+    4: (4,11,15,0x13,0,1,4),
+    8: (8,223,255,0x11d,0,1,32),
+    10: (10,935,973,0x409,0,1,38),
+    16: (16,200,240,0x1100b,1,1,40),
+}
+
+BLOCK_CODEWORDS = 3
+
+
+def _container(symsize,n_bytes,backend='numpy'):
+    rs = pyreedsolomon.Reed_Solomon(*CODES[symsize],backend=backend)
+    payload = np.random.default_rng(n_bytes).integers(0,256,n_bytes,dtype=np.uint8).tobytes()
+    f = io.BytesIO()
+    assert write_container(rs,f,payload,BLOCK_CODEWORDS) == n_bytes
+    f.seek(0)
+    return rs, payload, f
+
+
+@pytest.mark.parametrize('symsize',sorted(CODES))
+def test_round_trip(symsize,backend):
+    rs = pyreedsolomon.Reed_Solomon(*CODES[symsize],backend=backend)
+    bpc = rs.message_size * symsize // 8
+    for n_bytes in (0,1,bpc,bpc + 1,BLOCK_CODEWORDS * bpc,5 * BLOCK_CODEWORDS * bpc - 3):
+        _, payload, f = _container(symsize,n_bytes,backend)
+        with ContainerReader(f,backend=backend) as reader:
+            assert len(reader) == n_bytes and reader.bytes_per_codeword == bpc
+            assert len(reader.index) == -(-n_bytes // (BLOCK_CODEWORDS * bpc))
+            assert reader.read() == payload
+            assert reader.n_corrected == 0 and reader.n_failed == 0
+
+
+def test_file_source(tmp_path):
+    rs, payload, f = _container(8,5000)
+    path = tmp_path / 'payload.rsc'
+    path.write_bytes(f.getvalue())
+
+    # the data also reads from a file-like object that is not a BytesIO
+    rs2 = pyreedsolomon.Reed_Solomon(*CODES[8])
+    out = io.BytesIO()
+    write_container(rs2,out,io.BufferedReader(io.BytesIO(payload)),BLOCK_CODEWORDS)
+    assert out.getvalue() == f.getvalue()
+
+    with ContainerReader(path) as reader:
+        assert reader.read() == payload
+    assert reader._file.closed
+
+
+@pytest.mark.parametrize('symsize',sorted(CODES))
+def test_read_range(symsize):
+    rs = pyreedsolomon.Reed_Solomon(*CODES[symsize])
+    bpc = rs.message_size * symsize // 8
+    block = BLOCK_CODEWORDS * bpc
+    n_bytes = 4 * block + 2 * bpc + bpc // 2 # ends with a shortened codeword in a partial block
+    _, payload, f = _container(symsize,n_bytes)
+    reader = ContainerReader(f)
+
+    ranges = [(0,1),(0,bpc),(bpc - 1,2),(block - 1,1),(block - 1,2),(block,block),
+              (block - bpc,bpc + 1),(2 * block - 1,block + 2),(n_bytes - bpc // 2,bpc // 2),
+              (n_bytes - bpc // 2 - 1,2),(n_bytes - 1,1),(4 * block,n_bytes),(n_bytes - 5,100),
+              (n_bytes,10),(n_bytes + 10,10),(3,0)]
+    for offset, length in ranges:
+        assert reader.read_range(offset,length) == payload[offset:offset+length]
+
+    with pytest.raises(ValueError):
+        reader.read_range(-1,10)
+
+
+def _codeword_offset(f,block,codeword):
+    reader = ContainerReader(io.BytesIO(f.getvalue()))
+    return int(reader.index['offset'][block]) + codeword * reader._cw_bytes
+
+
+def test_corrupt_codeword(backend):
+    rs, payload, f = _container(8,10 * 223,backend)
+    raw = bytearray(f.getvalue())
+
+    # correctable errors in block 1, too many for block 2
+    pos = _codeword_offset(f,1,1)
+    raw[pos:pos+10] = bytes(b ^ 0x5a for b in raw[pos:pos+10])
+    bad = _codeword_offset(f,2,0)
+    raw[bad+5:bad+5+40] = bytes(b ^ 0xff for b in raw[bad+5:bad+5+40])
+
+    reader = ContainerReader(io.BytesIO(bytes(raw)),backend=backend)
+    assert reader.read_range(3 * 223,3 * 223) == payload[3*223:6*223]
+    assert reader.n_corrected == 10 and reader.n_failed == 0
+
+    with pytest.raises(ValueError,match='block 2'):
+        reader.read_range(6 * 223,10)
+    assert reader.n_failed == 1
+    # the data before it still reads
+    assert reader.read_range(0,6 * 223) == payload[:6*223]
+
+    data = reader.read(strict=False)
+    assert reader.n_failed == 2
+    assert len(data) == len(payload)
+    assert data[:6*223] == payload[:6*223] and data[7*223:] == payload[7*223:]
+    assert data[6*223:7*223] != payload[6*223:7*223]
+
+
+@pytest.mark.parametrize('field',['length','symsize','crc'])
+def test_corrupt_header(field,tmp_path,monkeypatch):
+    _, _, f = _container(8,1000)
+    raw = bytearray(f.getvalue())
+    offset = {'length': struct.calcsize(container.HEADER_FORMAT[:12]),
+              'symsize': struct.calcsize(container.HEADER_FORMAT[:4]),
+              'crc': container.HEADER_SIZE - 4}[field]
+    raw[offset] ^= 1
+
+    with pytest.raises(ValueError,match='corrupt'):
+        ContainerReader(io.BytesIO(bytes(raw)))
+
+    # the file opened from a path is closed again
+    path = tmp_path / 'payload.rsc'
+    path.write_bytes(raw)
+    opened = []
+    def _open(*args):
+        opened.append(open(*args))
+        return opened[-1]
+    monkeypatch.setattr(container,'open',_open,raising=False)
+    with pytest.raises(ValueError,match='corrupt'):
+        ContainerReader(path)
+    assert len(opened) == 1 and opened[0].closed
+
+
+def test_not_a_container():
+    with pytest.raises(ValueError,match='not a pyreedsolomon container'):
+        ContainerReader(io.BytesIO(b'\0' * 200))
+    with pytest.raises(ValueError,match='end of the container'):
+        ContainerReader(io.BytesIO(b'PYRS'))
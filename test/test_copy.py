@@ -0,0 +1,37 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_copy.py
+# Description        : Copies and pickles of codecs
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import copy
+import pickle
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+
+
+@pytest.mark.parametrize('copier',[copy.copy,copy.deepcopy])
+def test_copy_is_a_new_codec(backend,copier):
+    rs = pyreedsolomon.Reed_Solomon.get(8,0x11d,0,1,32,backend=backend)
+    rs_copy = copier(rs)
+    assert rs_copy is not rs and type(rs_copy) is type(rs)
+    assert rs_copy is not pyreedsolomon.Reed_Solomon.get(8,0x11d,0,1,32,backend=backend)
+
+    # statistics of the copy do not show up on the original
+    rs_copy.enable_stats()
+    rs_copy.encode(np.arange(100,dtype=np.uint8))
+    assert rs_copy.stats().encoded == 1
+    assert rs._stats is None
+
+    msg = np.arange(rs.message_size,dtype=np.uint8)
+    assert np.all(rs_copy.encode(msg) == rs.encode(msg))
+
+
+def test_pickle_shares_the_cached_codec(backend):
+    rs = pyreedsolomon.Reed_Solomon.get(8,0x11d,0,1,32,backend=backend)
+    assert pickle.loads(pickle.dumps(rs)) is rs
@@ -0,0 +1,76 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_corrections.py
+# Description        : Positions and values of the corrected symbols
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+
+
+def _corrupt(rs,rng,dat,n_errors):
+    """
+    n_errors[r] errors in row r of dat, returns the positions and values xor-ed in each row
+    """
+    errors = []
+    for row, n in zip(dat,n_errors):
+        pos = np.sort(rng.choice(dat.shape[1],n,replace=False))
+        val = rng.integers(1,256,n).astype(rs.dtype)
+        row[pos] ^= val
+        errors.append((pos,val))
+    return errors
+
+
+@pytest.mark.parametrize('n_symbols',[255,100])
+def test_decode_batch_corrections(rs,n_symbols):
+    rng = np.random.default_rng(n_symbols)
+    dat = np.zeros((30,n_symbols),dtype=rs.dtype)
+    dat[:,:n_symbols-rs.par_size] = rng.integers(0,256,(30,n_symbols-rs.par_size))
+    ref = rs.encode_batch(dat).copy()
+    errors = _corrupt(rs,rng,dat,[r % (rs.par_size // 2 + 1) for r in range(30)])
+    # row 29 fails, it reports no corrections
+    dat[29,:120] ^= 0x33
+
+    _, n_errors, (offsets, positions, values) = rs.decode_batch(dat,corrections=True)
+    assert offsets.shape == (31,) and offsets[0] == 0 and np.all(np.diff(offsets) >= 0)
+    assert positions.dtype == np.intc and values.dtype == np.uint16
+    assert len(positions) == len(values) == offsets[-1]
+    for r, (pos, val) in enumerate(errors[:29]):
+        found = slice(offsets[r],offsets[r+1])
+        assert n_errors[r] == len(pos) == offsets[r+1] - offsets[r]
+        order = np.argsort(positions[found])
+        assert np.all(positions[found][order] == pos) and np.all(values[found][order] == val)
+        assert np.all(dat[r,:n_symbols-rs.par_size] == ref[r,:n_symbols-rs.par_size])
+    assert n_errors[29] == -pyreedsolomon.EBADMSG and offsets[30] == offsets[29]
+
+
+def test_decode_fast_err_pos(rs):
+    rng = np.random.default_rng(0)
+    cw = rs.encode(rng.integers(0,256,rs.message_size).astype(rs.dtype))
+    bad = cw.copy()
+    (pos, val), = _corrupt(rs,rng,bad[None],[rs.par_size // 2])
+
+    err_pos = np.full(rs.par_size,-1,dtype=np.intc)
+    err_val = np.full(rs.par_size,9,dtype=np.uint16)
+    _, n_errors = rs.decode_fast(bad,err_pos=err_pos,err_val=err_val)
+    assert n_errors == len(pos)
+    order = np.argsort(err_pos[:n_errors])
+    assert np.all(err_pos[:n_errors][order] == pos) and np.all(err_val[:n_errors][order] == val)
+    assert np.all(err_val[n_errors:] == 0)
+    assert np.all(bad[:rs.message_size] == cw[:rs.message_size])
+
+    # together with erasures, whose values are reported as well
+    bad = cw.copy()
+    bad[[3,4]] ^= 5
+    bad[10] ^= 1
+    _, n_errors = rs.decode_fast(bad,[3,4],err_pos,err_val)
+    assert n_errors == 3 and sorted(zip(err_pos[:3],err_val[:3])) == [(3,5),(4,5),(10,1)]
+
+    with pytest.raises(ValueError,match='at least'):
+        rs.decode_fast(bad,err_pos=err_pos[:4],err_val=err_val)
+    with pytest.raises(ValueError,match='dtype'):
+        rs.decode_fast(bad,err_pos=err_pos.astype(np.int64),err_val=err_val)
@@ -0,0 +1,33 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_erasures.py
+# Description        : Validation of erasure positions
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+
+def _codeword(rs):
+    dat = rs.encode(np.arange(rs.message_size,dtype=np.uint8))
+    dat[10] ^= 3
+    return dat
+
+
+@pytest.mark.parametrize('erasures',[[-1,10],[10,-1],[-5]])
+def test_negative_positions_rejected(rs,erasures):
+    with pytest.raises(ValueError):
+        rs.decode(_codeword(rs),erasures=erasures)
+    with pytest.raises(ValueError):
+        rs.decode_batch(_codeword(rs)[None],[erasures])
+
+
+def test_padding_of_2d_array(rs):
+    # negative values are padding in a 2-D array, wherever they are in the row
+    for eras in ([[-1,10]],[[10,-1]]):
+        dat = _codeword(rs)[None]
+        _, n_errors = rs.decode_batch(dat,np.array(eras))
+        assert n_errors[0] == 1
+        assert np.all(dat[0,:rs.message_size] == np.arange(rs.message_size))
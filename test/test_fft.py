@@ -0,0 +1,124 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_fft.py
+# Description        : The additive FFT decoder against the library decoder
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+The decoder of src/rs_fft.c, used for every codeword with lib.set_fft_threshold(0), has to
+give the same corrections and results as decode_rs16 of the library, used for every
+codeword with lib.set_fft_threshold(-1)
+"""
+
+import errno
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+
+lib = pyreedsolomon.lib
+pytestmark = pytest.mark.skipif(lib is None,reason='the native extension is not available')
+
+# (symsize, message_size, total_size, gfpoly, fcr, prim, nroots), shortened with other fcr/prim
+CODES = [
+    (11,2047-32,2047,0x805,0,1,32),
+    (11,300,340,0x805,5,3,40),
+    (12,1000,1050,0x1053,120,11,50),
+    (12,4095-64,4095,0x1053,1,1,64),
+    (16,2000,2128,0x1100b,1,7,128),
+    (16,500,533,0x1100b,0,1,33),
+]
+
+
+@pytest.fixture
+def threshold():
+    current = lib.fft_threshold()
+    yield
+    lib.set_fft_threshold(current)
+
+
+def _decode_both(rs,dat,erasures=None):
+    """
+    Decode copies of dat with the library and with the FFT decoder, check that they agree
+
+    returns the result of the library
+    """
+    res = []
+    for t in (-1,0):
+        lib.set_fft_threshold(t)
+        d = dat.copy()
+        _, n_errors, corr = rs.decode_batch(d,erasures,True)
+        res.append((d,n_errors,corr))
+    (d_lib,n_lib,corr_lib), (d_fft,n_fft,corr_fft) = res
+    assert np.all(d_fft == d_lib)
+    assert np.all(n_fft == n_lib)
+    for a, b in zip(corr_fft,corr_lib):
+        assert np.all(a == b)
+    return d_lib, n_lib
+
+
+def _codewords(rs,rng,n_rows,n_symbols):
+    dat = np.zeros((n_rows,n_symbols),dtype=rs.dtype)
+    dat[:,:n_symbols-rs.par_size] = rng.integers(0,1 << rs.symsize,(n_rows,n_symbols-rs.par_size))
+    return rs.encode_batch(dat)
+
+
+def _corrupt(rs,rng,dat,n_err):
+    """
+    n_err errors at random positions of each row, returns their positions
+    """
+    pos = np.argsort(rng.random(dat.shape),axis=1)[:,:n_err]
+    rows = np.arange(len(dat))[:,None]
+    dat[rows,pos] ^= rng.integers(1,1 << rs.symsize,pos.shape).astype(rs.dtype)
+    return pos
+
+
+@pytest.mark.parametrize('code',CODES,ids=lambda c: f'rs{c[2]}_{c[1]}_{c[0]}_fcr{c[4]}_prim{c[5]}')
+def test_errors(threshold,code):
+    rs = pyreedsolomon.Reed_Solomon(*code)
+    rng = np.random.default_rng(code[2])
+    for n_symbols in (rs.total_size,rs.total_size - 17):
+        clean = _codewords(rs,rng,8,n_symbols)
+        for n_err in (0,1,rs.par_size // 2):
+            dat = clean.copy()
+            _corrupt(rs,rng,dat,n_err)
+            d, n_errors = _decode_both(rs,dat)
+            assert np.all(n_errors == n_err)
+            k = n_symbols - rs.par_size
+            assert np.all(d[:,:k] == clean[:,:k])
+
+
+@pytest.mark.parametrize('code',CODES,ids=lambda c: f'rs{c[2]}_{c[1]}_{c[0]}_fcr{c[4]}_prim{c[5]}')
+def test_erasures(threshold,code):
+    rs = pyreedsolomon.Reed_Solomon(*code)
+    rng = np.random.default_rng(code[2] + 1)
+    n_symbols = rs.total_size - 3
+    k = n_symbols - rs.par_size
+    clean = _codewords(rs,rng,8,n_symbols)
+
+    # erasures only, and erasures with as many errors as still fit
+    for n_eras in (rs.par_size,rs.par_size // 2):
+        n_err = (rs.par_size - n_eras) // 2
+        dat = clean.copy()
+        pos = _corrupt(rs,rng,dat,n_eras + n_err)
+        d, n_errors = _decode_both(rs,dat,pos[:,:n_eras])
+        assert np.all(n_errors >= 0)
+        assert np.all(d[:,:k] == clean[:,:k])
+
+
+@pytest.mark.parametrize('code',CODES,ids=lambda c: f'rs{c[2]}_{c[1]}_{c[0]}_fcr{c[4]}_prim{c[5]}')
+def test_too_many_errors(threshold,code):
+    rs = pyreedsolomon.Reed_Solomon(*code)
+    rng = np.random.default_rng(code[2] + 2)
+    dat = _codewords(rs,rng,16,rs.total_size)
+    _corrupt(rs,rng,dat,rs.par_size // 2 + 1)
+    _, n_errors = _decode_both(rs,dat)
+    assert np.all(n_errors == -errno.EBADMSG)
+
+    # more erasures than parity symbols
+    dat = _codewords(rs,rng,4,rs.total_size)
+    pos = _corrupt(rs,rng,dat,rs.par_size + 1)
+    _, n_errors = _decode_both(rs,dat,pos)
+    assert np.all(n_errors == -errno.EBADMSG)
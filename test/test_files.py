@@ -0,0 +1,107 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_files.py
+# Description        : In place encoding and repair of files, see files.py
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import io
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+from pyreedsolomon import encode_file, decode_file, encode_stream
+
+BATCH_SIZE = 3
+
+
+def _file(rs,tmp_path,n_codewords,rest=0):
+    """
+    File of n_codewords codewords and a shortened one of rest message symbols, with the
+    parity still zero. Returns its path and the encoded codewords
+    """
+    rng = np.random.default_rng(n_codewords)
+    dat = np.zeros(n_codewords * rs.total_size + (rest and rest + rs.par_size),dtype=rs.dtype)
+    full = dat[:n_codewords*rs.total_size].reshape(-1,rs.total_size)
+    full[:,:rs.message_size] = rng.integers(0,1 << rs.symsize,(n_codewords,rs.message_size))
+    if rest:
+        dat[-rest-rs.par_size:-rs.par_size] = rng.integers(0,1 << rs.symsize,rest)
+    path = tmp_path / 'codewords'
+    path.write_bytes(dat.tobytes())
+
+    ref = dat.copy()
+    rs.encode_batch(ref[:n_codewords*rs.total_size].reshape(-1,rs.total_size))
+    if rest:
+        rs.encode_fast(ref[-rest-rs.par_size:])
+    return path, ref
+
+
+def _read(rs,path):
+    return np.fromfile(path,dtype=rs.dtype)
+
+
+@pytest.mark.parametrize('n_codewords,rest',[(0,1),(1,0),(BATCH_SIZE,0),(BATCH_SIZE + 1,5),(7,100)])
+def test_encode_file(rs,tmp_path,n_codewords,rest):
+    path, ref = _file(rs,tmp_path,n_codewords,rest)
+    assert encode_file(rs,path,BATCH_SIZE) == n_codewords + (rest > 0)
+    assert np.all(_read(rs,path) == ref)
+
+    # the same bytes as encode_stream writes
+    msg = ref[:n_codewords*rs.total_size].reshape(-1,rs.total_size)[:,:rs.message_size]
+    payload = msg.tobytes() + (ref[-rest-rs.par_size:-rs.par_size].tobytes() if rest else b'')
+    encoded = io.BytesIO()
+    encode_stream(rs,io.BytesIO(payload),encoded)
+    assert encoded.getvalue() == path.read_bytes()
+
+
+@pytest.mark.parametrize('repair',[True,False])
+def test_decode_file(rs,tmp_path,repair):
+    n_codewords = 2 * BATCH_SIZE + 1
+    path, ref = _file(rs,tmp_path,n_codewords,50)
+    bad = ref.copy()
+    starts = np.arange(0,len(bad),rs.total_size)
+    # errors in the message and the parity of every codeword
+    for i, start in enumerate(starts):
+        bad[start+i] ^= 1
+        bad[min(start+rs.total_size,len(bad))-1] ^= 2
+    # too many errors in codeword 4, in the second block
+    bad[4*rs.total_size:4*rs.total_size+100] ^= 0x77
+    path.write_bytes(bad.tobytes())
+
+    n_corrected, n_failed = decode_file(rs,path,BATCH_SIZE,repair)
+    # blocks of 3, 3 and 1 codewords and the shortened one
+    assert n_corrected.tolist() == [6,4,2,2]
+    assert n_failed.tolist() == [0,1,0,0]
+
+    if not repair:
+        assert np.all(_read(rs,path) == bad)
+        return
+    # the message and the parity are both repaired, the failed codeword is left as it was
+    repaired = _read(rs,path)
+    failed = slice(4*rs.total_size,5*rs.total_size)
+    assert np.all(repaired[failed] == bad[failed])
+    repaired[failed] = ref[failed]
+    assert np.all(repaired == ref)
+
+    # all but the failed codeword are clean now
+    n_corrected, n_failed = decode_file(rs,path,BATCH_SIZE)
+    assert n_corrected.tolist() == [0,0,0,0] and n_failed.tolist() == [0,1,0,0]
+
+
+def test_invalid_files(backend,tmp_path):
+    rs = pyreedsolomon.Reed_Solomon(8,223,255,0x11d,0,1,32,backend=backend)
+    path = tmp_path / 'codewords'
+    path.write_bytes(bytes(255 + 20))
+    with pytest.raises(ValueError,match='truncated codeword'):
+        decode_file(rs,path)
+
+    rs16 = pyreedsolomon.Reed_Solomon(16,200,240,0x1100b,1,1,40,backend=backend)
+    path.write_bytes(bytes(481))
+    with pytest.raises(ValueError,match='multiple of the symbol size'):
+        encode_file(rs16,path)
+
+    path.write_bytes(b'')
+    assert encode_file(rs,path) == 0
+    assert [len(a) for a in decode_file(rs,path)] == [0,0]
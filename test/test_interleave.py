@@ -0,0 +1,107 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_interleave.py
+# Description        : Symbol interleaved frames, see interleave.py
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+from pyreedsolomon import Interleaved
+
+
+DEPTH = 5
+
+
+@pytest.fixture
+def rs(backend):
+    return pyreedsolomon.Reed_Solomon(8,40,60,0x11d,0,1,20,backend=backend)
+
+
+def _frame(il,rng,n=None):
+    n = n or il.rs.total_size
+    frame = np.zeros(il.depth * n,dtype=il.rs.dtype)
+    frame[:il.depth*(n-il.rs.par_size)] = rng.integers(0,1 << il.rs.symsize,il.depth*(n-il.rs.par_size))
+    return frame
+
+
+@pytest.mark.parametrize('n',[60,45])
+def test_parity_through_strided_view(rs,n):
+    il = Interleaved(rs,DEPTH)
+    frame = _frame(il,np.random.default_rng(n),n)
+    msg = frame[:DEPTH*(n-rs.par_size)].copy()
+
+    view = il.codewords(frame)
+    assert view.shape == (DEPTH,n) and view.base is not None and np.shares_memory(view,frame)
+    assert view.strides == (frame.itemsize,DEPTH * frame.itemsize)
+
+    assert il.encode(frame) is frame
+    assert np.all(frame[:len(msg)] == msg)
+
+    # symbol k of codeword i at k * depth + i
+    ref = np.ascontiguousarray(frame.reshape(n,DEPTH).T)
+    ref[:,n-rs.par_size:] = 0
+    rs.encode_batch(ref)
+    assert np.all(frame == ref.T.reshape(-1))
+    assert np.all(il.check(frame))
+
+
+def test_bytearray_frame(rs):
+    il = Interleaved(rs,DEPTH)
+    frame = _frame(il,np.random.default_rng(0))
+    buf = bytearray(frame.tobytes())
+    il.encode(buf)
+    assert np.all(np.frombuffer(buf,dtype=rs.dtype) == il.encode(frame))
+
+
+def test_bursts(rs):
+    """
+    Every burst of up to depth * par_size // 2 symbols is corrected, wherever it starts
+    """
+    il = Interleaved(rs,DEPTH)
+    rng = np.random.default_rng(1)
+    frame = il.encode(_frame(il,rng))
+    t = rs.par_size // 2
+    longest = DEPTH * t
+    for length in (1,DEPTH,longest - 1,longest):
+        for start in range(0,il.frame_size - length + 1,7):
+            bad = frame.copy()
+            bad[start:start+length] ^= rng.integers(1,256,length).astype(rs.dtype)
+            _, n_errors = il.decode(bad)
+            # the decoder corrects the messages, errors in the parity are only counted
+            assert np.all(bad[:il.message_size] == frame[:il.message_size])
+            assert np.all(n_errors >= 0) and n_errors.sum() == length
+
+    # one symbol more puts t + 1 errors in a codeword
+    bad = frame.copy()
+    bad[:longest+1] ^= 1
+    il.decode(bad)
+    assert not np.all(bad[:il.message_size] == frame[:il.message_size])
+
+
+def test_erasures(rs):
+    il = Interleaved(rs,DEPTH)
+    rng = np.random.default_rng(2)
+    frame = il.encode(_frame(il,rng))
+
+    # a burst twice as long is recovered when its positions are known
+    length = DEPTH * rs.par_size
+    bad = frame.copy()
+    bad[100:100+length] = 0
+    _, n_errors = il.decode(bad,np.arange(100,100+length))
+    assert np.all(bad[:il.message_size] == frame[:il.message_size]) and np.all(n_errors >= 0)
+
+    with pytest.raises(ValueError):
+        il.decode(bad,[il.frame_size])
+
+
+def test_invalid(rs):
+    with pytest.raises(ValueError):
+        Interleaved(rs,0)
+    il = Interleaved(rs,DEPTH)
+    for size in (il.frame_size + DEPTH,il.frame_size - 1,DEPTH * rs.par_size):
+        with pytest.raises(ValueError):
+            il.codewords(np.zeros(size,dtype=rs.dtype))
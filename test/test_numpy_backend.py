@@ -0,0 +1,204 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_numpy_backend.py
+# Description        : The numpy backend against the library
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+The codec of numpy_backend.py has to give the same parity, clean flags and decoding results
+as the native library, for full and shortened codewords, with and without erasures
+"""
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+from pyreedsolomon.numpy_backend import NumpyReedSolomon
+
+lib = pyreedsolomon.lib
+needs_lib = pytest.mark.skipif(lib is None,reason='the native extension is not available')
+
+# (symsize, message_size, total_size, gfpoly, fcr, prim, nroots)
+CODES = [
+    (4,11,15,0x13,0,1,4),
+    (8,223,255,0x11d,0,1,32),
+    (8,100,120,0x11d,1,1,20),
+    (8,40,60,0x11d,3,7,20),
+    (10,935,973,0x409,0,1,38),
+    (16,200,240,0x1100b,1,1,40),
+]
+
+code_ids = lambda c: f'rs{c[2]}_{c[1]}_{c[0]}_fcr{c[4]}_prim{c[5]}'
+
+
+def test_backend_argument():
+    code = (8,223,255,0x11d,0,1,32)
+    assert type(pyreedsolomon.Reed_Solomon(*code,backend='numpy')) is NumpyReedSolomon
+    if lib is not None:
+        assert type(pyreedsolomon.Reed_Solomon(*code,backend='native')) is pyreedsolomon.Reed_Solomon
+
+    # backend is keyword only, so it can not be passed by position and silently ignored
+    with pytest.raises(TypeError):
+        pyreedsolomon.Reed_Solomon(*code,'numpy')
+
+    with pytest.raises(ValueError):
+        pyreedsolomon.Reed_Solomon(*code,backend='fortran')
+
+
+def test_environment_backend(monkeypatch):
+    code = (8,223,255,0x11d,0,1,32)
+    monkeypatch.delenv('PYREEDSOLOMON_BACKEND',raising=False)
+    default = pyreedsolomon.Reed_Solomon if lib is not None else NumpyReedSolomon
+    assert type(pyreedsolomon.Reed_Solomon(*code)) is default
+
+    monkeypatch.setenv('PYREEDSOLOMON_BACKEND','numpy')
+    assert type(pyreedsolomon.Reed_Solomon(*code)) is NumpyReedSolomon
+    assert pyreedsolomon.Reed_Solomon.get(8,0x11d,0,1,32).backend == 'numpy'
+    if lib is not None:
+        # the argument takes precedence over the environment
+        assert type(pyreedsolomon.Reed_Solomon(*code,backend='native')) is pyreedsolomon.Reed_Solomon
+        monkeypatch.setenv('PYREEDSOLOMON_BACKEND','native')
+        assert type(pyreedsolomon.Reed_Solomon(*code)) is pyreedsolomon.Reed_Solomon
+        assert pyreedsolomon.Reed_Solomon.get(8,0x11d,0,1,32).backend == 'native'
+
+    monkeypatch.setenv('PYREEDSOLOMON_BACKEND','fortran')
+    with pytest.raises(ValueError,match="unknown backend 'fortran'"):
+        pyreedsolomon.Reed_Solomon(*code)
+
+
+def _errors(rs,rng,dat,max_errors):
+    """
+    Random errors in every row of dat, up to max_errors each
+    """
+    n_symbols = dat.shape[-1]
+    for r, n in enumerate(rng.integers(0,max_errors+1,len(dat))):
+        pos = rng.choice(n_symbols,n,replace=False)
+        dat[r,pos] ^= rng.integers(1,1 << rs.symsize,n).astype(rs.dtype)
+
+
+@needs_lib
+@pytest.mark.parametrize('code',CODES,ids=code_ids)
+def test_batch(code):
+    rs = pyreedsolomon.Reed_Solomon(*code,backend='native')
+    rs_np = pyreedsolomon.Reed_Solomon(*code,backend='numpy')
+    rng = np.random.default_rng(code[2])
+    for n_symbols in (rs.total_size,rs.total_size - 7):
+        k = n_symbols - rs.par_size
+        dat = np.zeros((40,n_symbols),dtype=rs.dtype)
+        dat[:,:k] = rng.integers(0,1 << rs.symsize,(40,k))
+        ref = dat.copy()
+        rs_np.encode_batch(dat)
+        rs.encode_batch(ref)
+        assert np.all(dat == ref)
+
+        # errors within and beyond the capability, and erasures in the message and parity
+        _errors(rs,rng,dat,rs.par_size // 2 + 2)
+        eras = [rng.choice(n_symbols,rng.integers(0,rs.par_size // 2),replace=False) for _ in range(len(dat))]
+        for r, e in enumerate(eras):
+            dat[r,e] = 0
+        assert np.all(rs_np.check_batch(dat) == rs.check_batch(dat))
+
+        for erasures in (None,eras):
+            ref = dat.copy()
+            d_np = dat.copy()
+            _, n_ref, corr_ref = rs.decode_batch(ref,erasures,True)
+            _, n_np, corr_np = rs_np.decode_batch(d_np,erasures,True)
+            assert np.all(d_np == ref)
+            assert np.all(n_np == n_ref)
+            for a, b in zip(corr_np,corr_ref):
+                assert np.all(a == b)
+
+            # a single codeword, with the corrections in err_pos/err_val
+            for r in range(4):
+                res = []
+                for codec in (rs,rs_np):
+                    d = dat[r].copy()
+                    err_pos = np.zeros(rs.par_size,dtype=np.intc)
+                    err_val = np.zeros(rs.par_size,dtype=np.uint16)
+                    e = None if erasures is None else erasures[r]
+                    _, n = codec.decode_fast(d,e,err_pos,err_val)
+                    res.append((d,n,err_pos[:max(n,0)],err_val[:max(n,0)]))
+                for a, b in zip(*res):
+                    assert np.all(a == b)
+
+
+@needs_lib
+@pytest.mark.parametrize('code',CODES,ids=code_ids)
+def test_shortened_messages(code):
+    """
+    encode/decode of messages shorter than message_size, as shortened codewords
+    """
+    rs = pyreedsolomon.Reed_Solomon(*code,backend='native')
+    rs_np = pyreedsolomon.Reed_Solomon(*code,backend='numpy')
+    rng = np.random.default_rng(code[1])
+    for msg_len in (1,2,rs.message_size // 2,rs.message_size - 1,rs.message_size):
+        msg = rng.integers(0,1 << rs.symsize,msg_len).astype(rs.dtype)
+        cw = rs.encode(msg)
+        assert len(cw) == msg_len + rs.par_size
+        assert np.all(rs_np.encode(msg) == cw)
+        assert rs_np.encode(msg.tolist()) == cw.tolist()
+
+        bad = cw[None].copy()
+        _errors(rs,rng,bad,rs.par_size // 2)
+        res = [codec.decode(bad[0]) for codec in (rs,rs_np)]
+        assert np.all(res[0][0] == res[1][0]) and res[0][1] == res[1][1]
+        assert np.all(res[0][0] == msg)
+
+
+@needs_lib
+@pytest.mark.parametrize('code',CODES,ids=code_ids)
+def test_erasures(code):
+    """
+    decode with erasures up to par_size, and errors on top of them
+    """
+    rs = pyreedsolomon.Reed_Solomon(*code,backend='native')
+    rs_np = pyreedsolomon.Reed_Solomon(*code,backend='numpy')
+    rng = np.random.default_rng(code[0])
+    for msg_len in (rs.message_size,rs.message_size // 2):
+        msg = rng.integers(0,1 << rs.symsize,msg_len).astype(rs.dtype)
+        cw = rs.encode(msg)
+        for n_eras, n_err in ((rs.par_size,0),(rs.par_size - 2,1),(rs.par_size // 2,rs.par_size // 4),(rs.par_size - 1,1)):
+            bad = cw.copy()
+            eras = rng.choice(len(cw),n_eras + n_err,replace=False)
+            bad[eras] ^= rng.integers(1,1 << rs.symsize,len(eras)).astype(rs.dtype)
+            eras = eras[:n_eras]
+            res = [codec.decode(bad,eras) for codec in (rs,rs_np)]
+            assert np.all(res[0][0] == res[1][0]) and res[0][1] == res[1][1]
+            if 2 * n_err + n_eras <= rs.par_size:
+                assert np.all(res[0][0] == msg)
+
+
+@needs_lib
+@pytest.mark.parametrize('code',[CODES[1],CODES[5]],ids=code_ids)
+def test_out(code):
+    """
+    encode/decode into out= buffers of the codec dtype, of another dtype and into a bytearray
+    """
+    rs = pyreedsolomon.Reed_Solomon(*code,backend='native')
+    rs_np = pyreedsolomon.Reed_Solomon(*code,backend='numpy')
+    rng = np.random.default_rng(3)
+    msg = rng.integers(0,1 << rs.symsize,rs.message_size - 10).astype(rs.dtype)
+    cw = rs.encode(msg)
+
+    other = np.uint32
+    for codec in (rs,rs_np):
+        for dtype in (rs.dtype,other):
+            out = np.zeros(len(cw),dtype=dtype)
+            assert codec.encode(msg,out=out) is out
+            assert np.all(out == cw)
+
+        bad = cw.copy()
+        bad[[0,5,len(msg)+1]] ^= 1
+        for dtype in (rs.dtype,other):
+            out = np.zeros(len(msg),dtype=dtype)
+            res, n_errors = codec.decode(bad,out=out)
+            assert res is out and n_errors == 3
+            assert np.all(out == msg)
+
+        buf = bytearray(len(cw) * np.dtype(rs.dtype).itemsize)
+        assert codec.encode(msg,out=buf) is buf
+        assert np.all(np.frombuffer(buf,dtype=rs.dtype) == cw)
+
+        with pytest.raises(ValueError):
+            codec.encode(msg,out=np.zeros(len(cw) - 1,dtype=rs.dtype))
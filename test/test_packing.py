@@ -0,0 +1,148 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_packing.py
+# Description        : Bit-packed symbols of packing.py and encode_packed/decode_packed
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+from pyreedsolomon import pack_symbols, unpack_symbols, packed_size
+
+
+SYMSIZES = range(2,17)
+
+# a primitive polynomial of every field
+GFPOLY = {2: 0x7, 3: 0xb, 4: 0x13, 5: 0x25, 6: 0x43, 7: 0x89, 8: 0x11d, 9: 0x211, 10: 0x409,
+          11: 0x805, 12: 0x1053, 13: 0x201b, 14: 0x4443, 15: 0x8003, 16: 0x1100b}
+
+
+def _reference(symbols,symsize):
+    """
+    The bitstream built one bit at a time
+    """
+    bits = ''.join(format(int(s) & ((1 << symsize) - 1),f'0{symsize}b') for s in symbols)
+    bits += '0' * (-len(bits) % 8)
+    return np.array([int(bits[i:i+8],2) for i in range(0,len(bits),8)],dtype=np.uint8)
+
+
+def _symbols(rng,symsize,shape):
+    dtype = np.uint16 if symsize > 8 else np.uint8
+    return rng.integers(0,1 << symsize,shape).astype(dtype)
+
+
+@pytest.mark.parametrize('symsize',SYMSIZES)
+def test_round_trip(symsize):
+    rng = np.random.default_rng(symsize)
+    # lengths that end on a byte and in every position of a partial last byte
+    for n in list(range(0,17)) + [63,64,65,100,255]:
+        symbols = _symbols(rng,symsize,n)
+        packed = pack_symbols(symbols,symsize)
+        assert packed.dtype == np.uint8 and len(packed) == packed_size(n,symsize)
+        assert np.all(packed == _reference(symbols,symsize))
+
+        out = unpack_symbols(packed,symsize,n)
+        assert out.dtype == symbols.dtype and np.all(out == symbols)
+        assert np.all(unpack_symbols(packed.tobytes(),symsize,n) == symbols)
+
+        # by default as many symbols as fit, with a partial last byte only when the padding is
+        # shorter than a symbol
+        default = unpack_symbols(packed,symsize)
+        assert len(default) == len(packed) * 8 // symsize
+        assert np.all(default[:n] == symbols) and np.all(default[n:] == 0)
+
+
+@pytest.mark.parametrize('symsize',SYMSIZES)
+def test_rows(symsize):
+    rng = np.random.default_rng(symsize)
+    symbols = _symbols(rng,symsize,(5,37))
+    packed = pack_symbols(symbols,symsize)
+    assert packed.shape == (5,packed_size(37,symsize))
+    for row, p in zip(symbols,packed):
+        assert np.all(p == _reference(row,symsize))
+    assert np.all(unpack_symbols(packed,symsize,37) == symbols)
+
+
+@pytest.mark.parametrize('symsize',[4,9,10,11,13,15])
+def test_high_bits_ignored(symsize):
+    rng = np.random.default_rng(0)
+    symbols = _symbols(rng,symsize,21)
+    high = np.uint16(0xffff) & ~np.uint16((1 << symsize) - 1)
+    noisy = symbols.astype(np.uint16) | high
+    assert np.all(pack_symbols(noisy,symsize) == pack_symbols(symbols,symsize))
+    assert np.all(pack_symbols(noisy.tolist(),symsize) == _reference(symbols,symsize))
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        pack_symbols([1,2],17)
+    with pytest.raises(ValueError):
+        unpack_symbols(b'\x00',0)
+    with pytest.raises(ValueError,match='need 2 bytes'):
+        unpack_symbols(b'\x00',10,1)
+
+
+def _codec(symsize,backend):
+    nn = (1 << symsize) - 1
+    total = min(nn,60)
+    nroots = min(8,nn - 1)
+    return pyreedsolomon.Reed_Solomon(symsize,total - nroots,total,GFPOLY[symsize],1,1,nroots,backend=backend)
+
+
+@pytest.mark.parametrize('symsize',SYMSIZES)
+def test_encode_decode_packed(symsize,backend):
+    rs = _codec(symsize,backend)
+    rng = np.random.default_rng(symsize)
+    for n in sorted({1,max(1,rs.message_size // 2),rs.message_size}):
+        msg = _symbols(rng,symsize,n)
+        cw = rs.encode(msg)
+
+        frame = rs.encode_packed(pack_symbols(msg,symsize).tobytes(),n)
+        assert type(frame) == bytes and frame == pack_symbols(cw,symsize).tobytes()
+
+        # one error per two parity symbols, in the message and in the parity
+        bad = cw.copy()
+        pos = rng.choice(len(cw),rs.par_size // 2,replace=False)
+        bad[pos] ^= _symbols(rng,symsize,len(pos)) | 1
+        packed_msg, n_errors = rs.decode_packed(bytearray(pack_symbols(bad,symsize)),len(cw))
+        assert type(packed_msg) == bytearray and n_errors == len(pos)
+        assert np.all(unpack_symbols(packed_msg,symsize,n) == msg)
+
+        # a batch of rows
+        msgs = _symbols(rng,symsize,(6,n))
+        frames = rs.encode_packed(pack_symbols(msgs,symsize),n)
+        assert np.all(unpack_symbols(frames,symsize,n + rs.par_size) == rs.encode_batch(
+            np.concatenate([msgs,np.zeros((6,rs.par_size),dtype=msgs.dtype)],axis=1)))
+        packed_msgs, n_errors = rs.decode_packed(frames,n + rs.par_size)
+        assert np.all(n_errors == 0)
+        assert np.all(unpack_symbols(packed_msgs,symsize,n) == msgs)
+
+
+def test_default_n_symbols(backend):
+    # 935 symbols of 10 bits leave 6 bits of padding, less than a symbol
+    rs = pyreedsolomon.Reed_Solomon(10,935,973,0x409,0,1,38,backend=backend)
+    msg = np.arange(935,dtype=np.uint16)
+    frame = rs.encode_packed(pack_symbols(msg,10).tobytes())
+    assert len(frame) == packed_size(973,10)
+    assert frame == pack_symbols(rs.encode(msg),10).tobytes()
+    packed_msg, n_errors = rs.decode_packed(frame)
+    assert n_errors == 0 and np.all(unpack_symbols(packed_msg,10,935) == msg)
+
+    # 11 symbols of 4 bits leave a whole symbol of padding, which is read as a message symbol
+    # unless n_symbols says otherwise
+    rs = pyreedsolomon.Reed_Solomon(4,11,15,0x13,0,1,4,backend=backend)
+    msg = np.arange(11,dtype=np.uint8)
+    packed = pack_symbols(msg,4).tobytes()
+    with pytest.raises(ValueError,match='larger than max allowed'):
+        rs.encode_packed(packed)
+    frame = rs.encode_packed(packed,11)
+    assert frame == pack_symbols(rs.encode(msg),4).tobytes()
+
+    # the 15 symbol codeword also leaves 4 bits, one symbol too many for decode_packed
+    with pytest.raises(ValueError,match='larger than max allowed'):
+        rs.decode_packed(frame)
+    packed_msg, n_errors = rs.decode_packed(frame,15)
+    assert n_errors == 0 and np.all(unpack_symbols(packed_msg,4,11) == msg)
@@ -0,0 +1,82 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_parallel.py
+# Description        : parallel_encode/parallel_decode and codecs shared between threads
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+
+def _batch(rs,rng,n_rows):
+    dat = np.zeros((n_rows,rs.total_size),dtype=rs.dtype)
+    dat[:,:rs.message_size] = rng.integers(0,256,(n_rows,rs.message_size))
+    return dat
+
+
+@pytest.mark.parametrize('n_rows',[0,1,3,100])
+@pytest.mark.parametrize('n_threads',[1,4,None])
+def test_parallel_same_as_batch(rs,n_rows,n_threads):
+    rng = np.random.default_rng(n_rows)
+    dat = _batch(rs,rng,n_rows)
+    ref = rs.encode_batch(dat.copy())
+    assert rs.parallel_encode(dat,n_threads) is dat
+    assert np.all(dat == ref)
+
+    for r in range(n_rows):
+        pos = rng.choice(rs.total_size,r % (rs.par_size // 2 + 1),replace=False)
+        dat[r,pos] ^= rng.integers(1,256,len(pos)).astype(rs.dtype)
+    bad = dat.copy()
+    _, ref_errors = rs.decode_batch(bad)
+    res, n_errors = rs.parallel_decode(dat,n_threads)
+    assert res is dat and np.all(dat == bad)
+    assert n_errors.shape == (n_rows,) and np.all(n_errors == ref_errors)
+
+
+def test_executor_and_erasures(rs):
+    rng = np.random.default_rng(0)
+    dat = _batch(rs,rng,40)
+    with ThreadPoolExecutor(3) as executor:
+        rs.parallel_encode(dat,6,executor)
+        ref = dat.copy()
+        assert np.all(ref == rs.encode_batch(dat.copy()))
+
+        # the erasures are split in the same chunks as the rows
+        erasures = [np.arange(r % rs.par_size + 1) + r for r in range(40)]
+        for row, e in zip(dat,erasures):
+            row[e] = 0
+        _, n_errors = rs.parallel_decode(dat,6,executor,erasures)
+        assert np.all(n_errors >= 0) and np.all(dat == ref)
+
+    with pytest.raises(ValueError):
+        rs.parallel_encode(dat[:,:rs.par_size])
+
+
+def test_shared_between_threads(rs):
+    """
+    Threads encoding and decoding with one codec at the same time each get their own results
+    """
+    n_threads = 8
+    barrier = threading.Barrier(n_threads)
+    failures = []
+    def run(seed):
+        rng = np.random.default_rng(seed)
+        barrier.wait()
+        for _ in range(200):
+            msg = rng.integers(0,256,rng.integers(1,rs.message_size + 1)).astype(rs.dtype)
+            cw = rs.encode(msg)
+            cw[rng.integers(len(cw))] ^= 1
+            res, n_errors = rs.decode(cw)
+            if n_errors != 1 or not np.all(res == msg):
+                failures.append(seed)
+    threads = [threading.Thread(target=run,args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert failures == []
@@ -0,0 +1,98 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_procpool.py
+# Description        : Batches in shared memory coded by worker processes, see procpool.py
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from pyreedsolomon import ProcessPool, procpool
+
+
+@pytest.fixture
+def pool(rs):
+    with ProcessPool(rs,n_workers=2) as pool:
+        yield pool
+
+
+def _fill(rs,dat):
+    rng = np.random.default_rng(len(dat))
+    dat[:,:rs.message_size] = rng.integers(0,256,(len(dat),rs.message_size))
+    return dat
+
+
+def _corrupt(rs,dat):
+    for r, row in enumerate(dat):
+        row[np.arange(r % (rs.par_size // 2 + 1)) * 7] ^= 1
+
+
+def test_shared_round_trip(rs,pool,monkeypatch):
+    dat = _fill(rs,pool.array(51))
+    ref = rs.encode_batch(dat.copy())
+
+    # arrays of the pool are coded in place, without a temporary segment
+    created = []
+    SharedMemory = shared_memory.SharedMemory
+    def counted(*args,**kwargs):
+        if kwargs.get('create'):
+            created.append(kwargs)
+        return SharedMemory(*args,**kwargs)
+    monkeypatch.setattr(procpool.shared_memory,'SharedMemory',counted)
+
+    assert pool.encode_batch(dat) is dat
+    assert np.all(dat == ref)
+
+    _corrupt(rs,dat)
+    bad = dat.copy()
+    _, ref_errors = rs.decode_batch(bad)
+    res, n_errors = pool.decode_batch(dat)
+    assert res is dat and np.all(n_errors == ref_errors) and np.all(dat == bad)
+
+    # rows sliced from a pool array are shared as well
+    dat[10:30,rs.message_size:] = 0
+    pool.encode_batch(dat[10:30])
+    assert np.all(dat == bad)
+    assert created == []
+
+
+def test_copied_round_trip(rs,pool):
+    dat = _fill(rs,np.zeros((20,rs.total_size),dtype=rs.dtype))
+    ref = rs.encode_batch(dat.copy())
+    segments = list(pool._segments)
+    assert pool.encode_batch(dat) is dat and np.all(dat == ref)
+
+    erasures = [np.arange(r % rs.par_size) for r in range(20)]
+    for row, e in zip(dat,erasures):
+        row[e] = 0
+    _, n_errors = pool.decode_batch(dat,erasures)
+    assert np.all(n_errors >= 0) and np.all(dat[:,:rs.message_size] == ref[:,:rs.message_size])
+    # the temporary segments are gone again
+    assert pool._segments == segments
+
+    assert len(pool.decode_batch(np.zeros((0,rs.total_size),dtype=rs.dtype))[1]) == 0
+    with pytest.raises(ValueError):
+        pool.encode_batch(dat.tolist())
+
+
+def test_map(rs,pool):
+    msgs = [bytes(range(i,i+50)) for i in range(30)]
+    cws = pool.encode(msgs,chunksize=7)
+    assert cws == [rs.encode(m) for m in msgs]
+    bad = [bytes([cw[0] ^ 1]) + cw[1:] for cw in cws]
+    assert pool.decode(bad) == [(m,1) for m in msgs]
+
+
+def test_close_releases_segments(rs):
+    pool = ProcessPool(rs,n_workers=1)
+    dat = pool.array(4)
+    name = pool._segments[0].name
+    pool.encode_batch(dat)
+    del dat
+    pool.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
@@ -0,0 +1,105 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_shards.py
+# Description        : Erasure coding of shards, see shards.py
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import itertools
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+from pyreedsolomon import encode_shards, reconstruct_shards
+
+
+K, M = 6, 4
+
+
+def _setup(backend,symsize=8,length=1000):
+    if symsize == 8:
+        rs = pyreedsolomon.Reed_Solomon(8,255-M,255,0x11d,0,1,M,backend=backend)
+    else:
+        rs = pyreedsolomon.Reed_Solomon(16,1000,1000+M,0x1100b,1,1,M,backend=backend)
+    rng = np.random.default_rng(symsize)
+    data = [rng.integers(0,1 << symsize,length).astype(rs.dtype) for _ in range(K)]
+    return rs, data + encode_shards(rs,data)
+
+
+def test_parity_is_the_code(backend):
+    # every position across the shards is a codeword
+    rs, shards = _setup(backend)
+    assert len(shards) == K + M
+    assert np.all(rs.check_batch(np.ascontiguousarray(np.array(shards).T)))
+
+
+@pytest.mark.parametrize('symsize',[8,16])
+def test_every_loss(backend,symsize):
+    """
+    Every combination of up to M lost data and parity shards
+    """
+    rs, shards = _setup(backend,symsize,300)
+    for n_lost in range(1,M+1):
+        for lost in itertools.combinations(range(K+M),n_lost):
+            given = [None if i in lost else s for i, s in enumerate(shards)]
+            rebuilt = reconstruct_shards(rs,given,batch_size=128)
+            for i in range(K+M):
+                assert np.all(rebuilt[i] == shards[i])
+                if i not in lost:
+                    assert rebuilt[i] is shards[i]
+
+
+def test_missing(backend):
+    rs, shards = _setup(backend)
+    corrupt = list(shards)
+    corrupt[1] = shards[1] ^ 1
+    corrupt[K+2] = shards[K+2] ^ 7
+    given = list(corrupt)
+    given[3] = None
+
+    rebuilt = reconstruct_shards(rs,given,missing=[1,K+2])
+    for a, b in zip(rebuilt,shards):
+        assert np.all(a == b)
+
+    # a shard both None and missing counts once
+    rebuilt = reconstruct_shards(rs,given,missing=np.array([1,3,K+2,K+3]))
+    for a, b in zip(rebuilt,shards):
+        assert np.all(a == b)
+
+    with pytest.raises(ValueError,match='between 0 and'):
+        reconstruct_shards(rs,given,missing=[K+M])
+
+
+def test_nothing_lost(backend):
+    rs, shards = _setup(backend)
+    rebuilt = reconstruct_shards(rs,shards)
+    assert all(a is b for a, b in zip(rebuilt,shards))
+
+
+def test_too_many_lost(backend):
+    rs, shards = _setup(backend)
+    given = [None] * (M + 1) + shards[M+1:]
+    with pytest.raises(ValueError,match=f'at most {M} shards'):
+        reconstruct_shards(rs,given)
+    with pytest.raises(ValueError,match=f'at most {M} shards'):
+        reconstruct_shards(rs,[None] * M + shards[M:],missing=[K+M-1])
+    with pytest.raises(ValueError):
+        reconstruct_shards(rs,shards[:M])
+
+
+def test_bytes_shards(backend):
+    rs = pyreedsolomon.Reed_Solomon(8,255-M,255,0x11d,0,1,M,backend=backend)
+    data = [bytes(range(i,i+50)) for i in range(K)]
+    parity = encode_shards(rs,data)
+    assert np.all(parity[0] == encode_shards(rs,[list(d) for d in data])[0])
+    assert np.all(parity[0] == encode_shards(rs,np.array([list(d) for d in data],dtype=np.uint8))[0])
+
+    given = [None,None] + data[2:] + [None,parity[1],parity[2],parity[3]]
+    rebuilt = reconstruct_shards(rs,given)
+    assert rebuilt[0].tobytes() == data[0] and rebuilt[1].tobytes() == data[1]
+    assert np.all(rebuilt[K] == parity[0])
+
+    with pytest.raises(ValueError,match='same length'):
+        encode_shards(rs,data[:-1] + [data[-1][:-1]])
@@ -0,0 +1,50 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_shortened.py
+# Description        : Messages shorter than message_size
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('msg_len',[1,2,100,222,223])
+def test_length(rs,msg_len):
+    msg = bytes(range(msg_len))
+    cw = rs.encode(msg)
+    assert len(cw) == msg_len + rs.par_size
+
+    # the same codeword as the zero padded full length message
+    full = rs.encode(bytes(rs.message_size - msg_len) + msg)
+    assert cw[msg_len:] == full[rs.message_size:]
+
+    bad = bytearray(cw)
+    bad[0] ^= 0xff
+    bad[-1] ^= 0x01
+    dec, n_errors = rs.decode(bad)
+    assert dec == bytearray(msg) and n_errors == 2
+
+
+@pytest.mark.parametrize('empty',[b'',bytearray(),[],np.zeros(0,dtype=np.uint8),memoryview(b'')],
+                         ids=['bytes','bytearray','list','ndarray','memoryview'])
+def test_empty_message(rs,empty):
+    with pytest.raises(ValueError,match='empty'):
+        rs.encode(empty)
+    with pytest.raises(ValueError,match='empty'):
+        rs.encode(empty,out=np.zeros(rs.par_size,dtype=np.uint8))
+
+
+def test_empty_packed(rs):
+    with pytest.raises(ValueError,match='empty'):
+        rs.encode_packed(b'')
+    with pytest.raises(ValueError,match='empty'):
+        rs.encode_packed(np.zeros((4,0),dtype=np.uint8))
+
+
+def test_parity_only_codeword(rs):
+    with pytest.raises(ValueError):
+        rs.decode(bytes(rs.par_size))
+    with pytest.raises(ValueError):
+        rs.encode_fast(np.zeros(rs.par_size,dtype=np.uint8))
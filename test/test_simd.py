@@ -0,0 +1,154 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_simd.py
+# Description        : The vectorized kernels against the library
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+"""
+Every instruction set of the kernels in src/rs_simd.c has to give the same parity, clean
+flags and decoding results as the scalar library, which is selected with
+lib.set_simd_level('scalar')
+"""
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+
+lib = pyreedsolomon.lib
+pytestmark = pytest.mark.skipif(lib is None,reason='the native extension is not available')
+
+# (symsize, message_size, total_size, gfpoly, fcr, prim, nroots)
+CODES = [
+    (4,11,15,0x13,0,1,4),
+    (8,223,255,0x11d,0,1,32),
+    (8,100,120,0x11d,1,1,20),
+    (10,935,973,0x409,0,1,38),
+    (16,200,240,0x1100b,1,1,40),
+]
+
+# around the 16 and 32 rows of an SSSE3 and an AVX2 tile
+N_ROWS = [1,15,16,17,31,32,33,65]
+
+
+def _levels():
+    if lib is None:
+        return []
+    levels = []
+    current = lib.simd_level()
+    for level in ('ssse3','avx2'):
+        try:
+            lib.set_simd_level(level)
+            levels.append(level)
+        except ValueError:
+            pass
+    lib.set_simd_level(current)
+    return levels
+
+
+@pytest.fixture(params=_levels() or [pytest.param(None,marks=pytest.mark.skip('no vector instructions'))])
+def level(request):
+    current = lib.simd_level()
+    yield request.param
+    lib.set_simd_level(current)
+
+
+def _run(level,func,*args):
+    lib.set_simd_level(level)
+    return func(*args)
+
+
+def _codewords(rs,rng,n_rows,n_symbols=None):
+    """
+    Encoded random codewords of n_symbols (default total_size), computed by the scalar library
+    """
+    n_symbols = n_symbols or rs.total_size
+    dat = np.zeros((n_rows,n_symbols),dtype=rs.dtype)
+    dat[:,:n_symbols-rs.par_size] = rng.integers(0,1 << rs.symsize,(n_rows,n_symbols-rs.par_size))
+    return _run('scalar',rs.encode_batch,dat)
+
+
+def _compare_decode(level,rs,dat,erasures=None):
+    ref = dat.copy()
+    _, n_ref, corr_ref = _run('scalar',rs.decode_batch,ref,erasures,True)
+    _, n_errors, corr = _run(level,rs.decode_batch,dat,erasures,True)
+    assert np.all(dat == ref)
+    assert np.all(n_errors == n_ref)
+    for a, b in zip(corr,corr_ref):
+        assert np.all(a == b)
+
+
+@pytest.mark.parametrize('code',CODES,ids=lambda c: f'rs{c[2]}_{c[1]}_{c[0]}')
+@pytest.mark.parametrize('n_rows',N_ROWS)
+def test_encode_check_decode(level,code,n_rows):
+    rs = pyreedsolomon.Reed_Solomon(*code)
+    rng = np.random.default_rng(n_rows)
+    for n_symbols in (rs.total_size,rs.total_size - 5):
+        ref = _codewords(rs,rng,n_rows,n_symbols)
+        dat = ref.copy()
+        dat[:,n_symbols-rs.par_size:] = 0
+        _run(level,rs.encode_batch,dat)
+        assert np.all(dat == ref)
+
+        # errors in about half of the rows, some beyond what can be corrected
+        rows = rng.random(n_rows) < 0.5
+        for r in np.flatnonzero(rows):
+            n_err = rng.integers(1,rs.par_size)
+            pos = rng.choice(n_symbols,n_err,replace=False)
+            dat[r,pos] ^= rng.integers(1,1 << rs.symsize,n_err).astype(rs.dtype)
+        assert np.all(_run(level,rs.check_batch,dat) == _run('scalar',rs.check_batch,dat))
+        assert np.all(_run(level,rs.check_batch,dat) == ~rows)
+        _compare_decode(level,rs,dat)
+
+
+@pytest.mark.parametrize('n_rows',[16,33,64])
+def test_strided_rows(level,n_rows):
+    rs = pyreedsolomon.Reed_Solomon(8,223,255,0x11d,0,1,32)
+    rng = np.random.default_rng(1)
+    ref = _codewords(rs,rng,2 * n_rows)
+
+    # every other row
+    dat = ref.copy()
+    dat[:,rs.message_size:] = 0
+    _run(level,rs.encode_batch,dat[::2])
+    assert np.all(dat[::2] == ref[::2]) and np.all(dat[1::2,rs.message_size:] == 0)
+
+    # the columns of a frame, symbols n_rows apart
+    frame = np.ascontiguousarray(ref[:n_rows].T)
+    frame[rs.message_size:] = 0
+    _run(level,rs.encode_batch,frame.T)
+    assert np.all(frame.T == ref[:n_rows])
+    assert np.all(_run(level,rs.check_batch,frame.T))
+
+    # and through the library, which gathers every codeword into a buffer
+    frame[rs.message_size:] = 0
+    _run('scalar',rs.encode_batch,frame.T)
+    assert np.all(frame.T == ref[:n_rows])
+    assert np.all(_run('scalar',rs.check_batch,frame.T))
+
+    frame[3:3+rs.par_size//2] ^= 1
+    frame[rs.message_size+1] ^= 7
+    _compare_decode(level,rs,frame.T)
+
+
+@pytest.mark.parametrize('code',[CODES[0],CODES[3]],ids=lambda c: f'rs{c[2]}_{c[1]}_{c[0]}')
+def test_high_bits(level,code):
+    """
+    Symbols with bits set above symsize, in the message and in the parity
+    """
+    rs = pyreedsolomon.Reed_Solomon(*code)
+    rng = np.random.default_rng(2)
+    high = np.iinfo(rs.dtype).max & ~((1 << rs.symsize) - 1)
+    ref = _codewords(rs,rng,64)
+    ref[::3,:rs.message_size] |= rng.integers(0,high+1,(len(ref[::3]),rs.message_size)).astype(rs.dtype) & high
+
+    dat = ref.copy()
+    _run('scalar',rs.encode_batch,ref)
+    _run(level,rs.encode_batch,dat)
+    assert np.all(dat == ref)
+
+    dat[::2,-1] |= high
+    assert np.all(_run(level,rs.check_batch,dat) == _run('scalar',rs.check_batch,dat))
+    _compare_decode(level,rs,dat)
+
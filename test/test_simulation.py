@@ -0,0 +1,73 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_simulation.py
+# Description        : The Monte Carlo channel simulator of simulation.py
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import pytest
+
+import pyreedsolomon
+from pyreedsolomon import simulate
+from pyreedsolomon.simulation import CHANNELS
+
+
+@pytest.fixture
+def rs(backend):
+    return pyreedsolomon.Reed_Solomon(8,40,60,0x11d,0,1,20,backend=backend)
+
+
+@pytest.mark.parametrize('channel',sorted(CHANNELS))
+@pytest.mark.parametrize('random_messages',[True,False])
+def test_noiseless(rs,channel,random_messages):
+    res, = simulate(rs,channel,[0.0],1000,batch_size=300,seed=1,random_messages=random_messages)
+    assert res.n_codewords == 1000
+    assert res.frame_errors == res.bit_errors == res.failed == 0
+    assert res.fer == 0 and res.ber == 0
+
+
+@pytest.mark.parametrize('channel',sorted(CHANNELS))
+@pytest.mark.parametrize('random_messages',[True,False])
+def test_beyond_capacity(rs,channel,random_messages):
+    # every symbol is hit, far more than the par_size // 2 errors or par_size erasures
+    res, = simulate(rs,channel,[1.0],500,batch_size=128,seed=2,random_messages=random_messages)
+    assert res.n_codewords == 500
+    assert res.frame_errors == 500 and res.fer == 1
+    assert 0 < res.ber <= 1
+    if channel == 'erasure':
+        assert res.failed == 500
+
+
+def test_reproducible(rs):
+    probabilities = [0.1,0.2,0.3]
+    runs = [simulate(rs,'symbol',probabilities,2000,batch_size=256,n_threads=n,seed=7) for n in (1,4)]
+    assert runs[0] == runs[1]
+    assert simulate(rs,'symbol',probabilities,2000,batch_size=256,seed=8) != runs[0]
+
+    # the error rate grows with the error probability around the capacity of 10 errors
+    fer = [r.fer for r in runs[0]]
+    assert fer[0] < fer[1] < fer[2]
+
+
+def test_max_frame_errors(rs):
+    res, = simulate(rs,'symbol',[0.5],100000,batch_size=100,n_threads=2,seed=3,max_frame_errors=300)
+    assert 300 <= res.frame_errors == res.n_codewords < 100000
+
+
+def test_burst_length(rs):
+    short, = simulate(rs,'burst',[0.05],2000,seed=4,length=1)
+    long, = simulate(rs,'burst',[0.05],2000,seed=4,length=rs.par_size)
+    assert short.fer < long.fer
+
+
+def test_custom_channel(rs):
+    def flip_first(rs,dat,p,rng):
+        dat[:,0] ^= 1
+    res, = simulate(rs,flip_first,[0.0],100,seed=5)
+    assert res.frame_errors == 0 and res.failed == 0
+
+    with pytest.raises(ValueError,match='unknown channel'):
+        simulate(rs,'gaussian',[0.1],100)
+    with pytest.raises(ValueError):
+        simulate(rs,'symbol',[0.1],0)
@@ -0,0 +1,92 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_stats.py
+# Description        : The runtime statistics of enable_stats/stats, see metrics.py
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import numpy as np
+
+import pyreedsolomon
+from pyreedsolomon import metrics
+
+
+def _calls(hist):
+    return sum(hist.counts)
+
+
+def test_disabled_by_default(rs):
+    rs.encode(np.arange(10,dtype=np.uint8))
+    stats = rs.stats()
+    assert stats[:6] == (0,0,0,0,0,0)
+    assert _calls(stats.encode_latency) == 0 and stats.encode_latency.total_ns == 0
+    # no wrappers on the instance
+    assert 'encode_fast' not in vars(rs) and 'decode_batch' not in vars(rs)
+
+
+def test_counters(rs):
+    rs.enable_stats()
+    msg = np.arange(100,dtype=np.uint8)
+    cw = rs.encode(msg)
+    rs.encode(msg[:50])
+    batch = np.zeros((10,rs.total_size),dtype=rs.dtype)
+    rs.encode_batch(batch)
+
+    bad = cw.copy()
+    bad[[1,2,3]] ^= 1
+    rs.decode(bad)
+    batch[0,:100] ^= 0x21 # fails
+    batch[1,7] ^= 1
+    rs.decode_batch(batch)
+
+    stats = rs.stats()
+    assert (stats.encoded,stats.decoded,stats.corrected,stats.failed) == (12,11,4,1)
+    assert stats.bytes_encoded == len(cw) + 50 + rs.par_size + batch.nbytes
+    assert stats.bytes_decoded == len(cw) + batch.nbytes
+    # one latency per call, not per codeword
+    assert _calls(stats.encode_latency) == 3 and _calls(stats.decode_latency) == 2
+    assert stats.encode_latency.total_ns > 0 and stats.decode_latency.total_ns > 0
+    assert metrics.percentile(stats.encode_latency,100) >= metrics.percentile(stats.encode_latency,10) > 0
+
+
+def test_reset(rs):
+    rs.enable_stats()
+    rs.encode(np.arange(10,dtype=np.uint8))
+    assert rs.stats(reset=True).encoded == 1
+    stats = rs.stats()
+    assert stats.encoded == 0 and stats.bytes_encoded == 0 and _calls(stats.encode_latency) == 0
+
+    # disabling keeps the counters, enabling again adds to them
+    rs.encode(np.arange(10,dtype=np.uint8))
+    rs.enable_stats(False)
+    assert 'encode_fast' not in vars(rs)
+    rs.encode(np.arange(10,dtype=np.uint8))
+    assert rs.stats().encoded == 1
+    rs.enable_stats()
+    rs.parallel_encode(np.zeros((8,rs.total_size),dtype=rs.dtype),4)
+    assert rs.stats().encoded == 9
+
+
+def test_environment(backend,monkeypatch):
+    monkeypatch.setenv('PYREEDSOLOMON_STATS','1')
+    rs = pyreedsolomon.Reed_Solomon(10,935,973,0x409,0,1,38,backend=backend)
+    rs.encode(np.arange(900,dtype=np.uint16))
+    # the bytes of the symbols, two per symbol
+    stats = rs.stats()
+    assert stats.encoded == 1 and stats.bytes_encoded == 2 * (900 + 38)
+
+    monkeypatch.setenv('PYREEDSOLOMON_STATS','0')
+    rs = pyreedsolomon.Reed_Solomon(10,935,973,0x409,0,1,38,backend=backend)
+    rs.encode(np.arange(900,dtype=np.uint16))
+    assert rs.stats().encoded == 0
+
+
+def test_percentile():
+    counts = [0] * metrics.N_BUCKETS
+    counts[2], counts[5] = 9, 1
+    hist = metrics.Histogram(tuple(counts),0)
+    assert metrics.percentile(hist,50) == metrics.LATENCY_BOUNDS_NS[2]
+    assert metrics.percentile(hist,90) == metrics.LATENCY_BOUNDS_NS[2]
+    assert metrics.percentile(hist,99) == metrics.LATENCY_BOUNDS_NS[5]
+    assert metrics.percentile(metrics.Histogram((0,) * metrics.N_BUCKETS,0),50) == 0
@@ -0,0 +1,113 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_stream.py
+# Description        : Stream round trips across batch boundaries, see stream.py
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import io
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+from pyreedsolomon import encode_stream, decode_stream, iter_encode, iter_decode
+
+BATCH_SIZE = 4
+
+
+class ShortReader(object):
+    """
+    Reader with only a read method, which returns at most 100 bytes per call like a socket
+    """
+    def __init__(self,data):
+        self._f = io.BytesIO(data)
+
+    def read(self,n):
+        return self._f.read(min(n,100))
+
+
+def _payload(n_bytes):
+    return np.random.default_rng(n_bytes).integers(0,256,n_bytes,dtype=np.uint8).tobytes()
+
+
+@pytest.fixture(params=[8,16])
+def codec(backend,request):
+    if request.param == 8:
+        return pyreedsolomon.Reed_Solomon(8,40,60,0x11d,0,1,20,backend=backend)
+    return pyreedsolomon.Reed_Solomon(16,200,240,0x1100b,1,1,40,backend=backend)
+
+
+def test_round_trip(codec):
+    rs = codec
+    sym_bytes = rs.symsize // 8
+    msg_bytes = rs.message_size * sym_bytes
+    batch = BATCH_SIZE * msg_bytes
+    for n_bytes in (0,sym_bytes,msg_bytes - sym_bytes,msg_bytes,batch - msg_bytes,batch,
+                    batch + sym_bytes,2 * batch,3 * batch + 5 * sym_bytes):
+        payload = _payload(n_bytes)
+        encoded = io.BytesIO()
+        n_codewords = encode_stream(rs,io.BytesIO(payload),encoded,BATCH_SIZE)
+        assert n_codewords == -(-n_bytes // msg_bytes)
+        full, rest = divmod(n_bytes,msg_bytes)
+        assert len(encoded.getvalue()) == (full * rs.total_size + (rest and rest // sym_bytes + rs.par_size)) * sym_bytes
+
+        # every codeword of the stream is a codeword of the code
+        cw = np.frombuffer(encoded.getvalue()[:full*rs.total_size*sym_bytes],dtype=rs.dtype)
+        assert np.all(rs.check_batch(cw.reshape(-1,rs.total_size)))
+
+        decoded = io.BytesIO()
+        assert decode_stream(rs,io.BytesIO(encoded.getvalue()),decoded,BATCH_SIZE) == (n_codewords,0,0)
+        assert decoded.getvalue() == payload
+
+        # the batch size does not change the stream, nor does a reader without readinto
+        assert b''.join(bytes(c) for c in iter_encode(rs,ShortReader(payload),3)) == encoded.getvalue()
+        decoded = b''.join(bytes(c) for c, _ in iter_decode(rs,ShortReader(encoded.getvalue()),5))
+        assert decoded == payload
+
+
+def test_errors(codec):
+    rs = codec
+    sym_bytes = rs.symsize // 8
+    payload = _payload((2 * BATCH_SIZE * rs.message_size + 7) * sym_bytes)
+    encoded = io.BytesIO()
+    encode_stream(rs,io.BytesIO(payload),encoded,BATCH_SIZE)
+    raw = np.frombuffer(bytearray(encoded.getvalue()),dtype=rs.dtype)
+
+    # an error in the first and the last symbol of every codeword, one codeword that fails
+    starts = np.arange(0,len(raw),rs.total_size)
+    raw[starts] ^= 1
+    raw[np.append(starts[1:],len(raw)) - 1] ^= 1
+    raw[3*rs.total_size:4*rs.total_size-rs.par_size] ^= 0x5a
+
+    decoded = io.BytesIO()
+    n_codewords, n_corrected, n_failed = decode_stream(rs,io.BytesIO(raw.tobytes()),decoded,BATCH_SIZE)
+    assert n_codewords == len(starts) and n_failed == 1
+    assert n_corrected == 2 * (len(starts) - 1)
+    out = decoded.getvalue()
+    block = rs.message_size * sym_bytes
+    assert len(out) == len(payload)
+    assert out[:3*block] == payload[:3*block] and out[4*block:] == payload[4*block:]
+    # a failed codeword is passed on as received
+    assert out[3*block:4*block] == raw[3*rs.total_size:3*rs.total_size+rs.message_size].tobytes()
+
+    n_errors = np.concatenate([n for _, n in iter_decode(rs,io.BytesIO(raw.tobytes()),BATCH_SIZE)])
+    assert n_errors[3] == -pyreedsolomon.EBADMSG and np.all(np.delete(n_errors,3) == 2)
+
+
+def test_invalid_streams(backend):
+    rs = pyreedsolomon.Reed_Solomon(8,40,60,0x11d,0,1,20,backend=backend)
+    encoded = io.BytesIO()
+    # two codewords and one shortened to 20 + 20 symbols, cut to 15
+    encode_stream(rs,io.BytesIO(_payload(100)),encoded)
+    with pytest.raises(ValueError,match='truncated codeword'):
+        decode_stream(rs,io.BytesIO(encoded.getvalue()[:-25]),io.BytesIO())
+
+    rs16 = pyreedsolomon.Reed_Solomon(16,200,240,0x1100b,1,1,40,backend=backend)
+    with pytest.raises(ValueError,match='multiple of the symbol size'):
+        encode_stream(rs16,io.BytesIO(b'abc'),io.BytesIO())
+
+    rs10 = pyreedsolomon.Reed_Solomon(10,935,973,0x409,0,1,38,backend=backend)
+    with pytest.raises(ValueError,match='symsize of 8 or 16'):
+        encode_stream(rs10,io.BytesIO(b'ab'),io.BytesIO())
@@ -0,0 +1,216 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_tablecache.py
+# Description        : The on-disk cache of the tables
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+from pyreedsolomon import tablecache
+
+lib = pyreedsolomon.lib
+
+
+class Builder(object):
+    """
+    build function of tablecache.load that counts its calls
+    """
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self,n_rows):
+        self.calls.append(n_rows)
+        return (np.arange(n_rows * 3,dtype=np.int32) * 7).reshape(n_rows,3)
+
+
+def _path(name='tab'):
+    return os.path.join(tablecache.cache_dir(),'key',f'{name}.npy')
+
+
+def test_miss_store_hit(monkeypatch):
+    build = Builder()
+    table = tablecache.load('key','tab',10,build)
+    assert build.calls == [10]
+    assert isinstance(table,np.memmap) and not table.flags.writeable
+    assert np.all(table == Builder()(10))
+    assert os.path.exists(_path()) and os.path.exists(_path() + '.meta')
+
+    # the next load maps the stored table without building it, or reading all of it
+    monkeypatch.setattr(tablecache,'_checksum',None)
+    again = tablecache.load('key','tab',10,build)
+    assert build.calls == [10]
+    assert isinstance(again,np.memmap) and np.all(again == table)
+
+    # fewer rows come from the same file
+    assert len(tablecache.load('key','tab',4,build)) == 10 and build.calls == [10]
+
+
+def test_regrow():
+    build = Builder()
+    tablecache.load('key','tab',10,build)
+    table = tablecache.load('key','tab',25,build)
+    assert build.calls == [10,25]
+    assert len(table) == 25 and np.all(table == Builder()(25))
+
+    assert len(tablecache.load('key','tab',15,build)) == 25
+    assert build.calls == [10,25]
+
+
+@pytest.mark.parametrize('value',['','0'])
+def test_disabled(value,table_cache,monkeypatch):
+    monkeypatch.setenv('PYREEDSOLOMON_TABLE_CACHE',value)
+    assert tablecache.cache_dir() is None
+    build = Builder()
+    for _ in range(2):
+        table = tablecache.load('key','tab',10,build)
+        assert not isinstance(table,np.memmap) and np.all(table == Builder()(10))
+    assert build.calls == [10,10]
+    assert not table_cache.exists()
+
+
+def test_unwritable(table_cache,monkeypatch):
+    # a file where the directory should be
+    table_cache.write_bytes(b'')
+    build = Builder()
+    table = tablecache.load('key','tab',10,build)
+    assert build.calls == [10] and np.all(table == Builder()(10))
+    assert not table.flags.writeable
+
+
+@pytest.mark.parametrize('damage',['truncate','extend','header','size','no meta'])
+def test_damaged_file(damage):
+    tablecache.load('key','tab',10,Builder())
+    path = _path()
+    with open(path,'r+b') as f:
+        size = f.seek(0,os.SEEK_END)
+        if damage == 'truncate':
+            f.truncate(size - 8)
+        elif damage == 'header':
+            f.seek(0)
+            f.write(b'garbage!')
+        elif damage == 'extend':
+            f.write(b'\0' * 12)
+    if damage == 'size':
+        with open(path + '.meta','w') as f:
+            f.write(f'00000000 {size - 12}')
+    elif damage == 'no meta':
+        os.remove(path + '.meta')
+
+    build = Builder()
+    table = tablecache.load('key','tab',10,build)
+    assert build.calls == [10]
+    assert np.all(table == Builder()(10))
+
+    # and it is stored again
+    tablecache.load('key','tab',10,build)
+    assert build.calls == [10]
+
+
+@pytest.mark.parametrize('verify',['0','1'])
+def test_corrupt_data(verify,monkeypatch):
+    """
+    A value changed in a file of the right size is only found when PYREEDSOLOMON_TABLE_CACHE_VERIFY
+    checks the CRC-32 on every load
+    """
+    monkeypatch.setenv('PYREEDSOLOMON_TABLE_CACHE_VERIFY',verify)
+    tablecache.load('key','tab',10,Builder())
+    with open(_path(),'r+b') as f:
+        f.seek(-4,os.SEEK_END)
+        f.write(b'\xff\xff\xff\xff')
+
+    build = Builder()
+    table = tablecache.load('key','tab',10,build)
+    if verify == '1':
+        assert build.calls == [10] and np.all(table == Builder()(10))
+    else:
+        assert build.calls == [] and table[-1,-1] == -1
+
+
+def test_write_checked(monkeypatch):
+    # a file that does not read back as written is not stored
+    crcs = iter([1,2])
+    monkeypatch.setattr(tablecache,'_checksum',lambda table: next(crcs))
+    build = Builder()
+    table = tablecache.load('key','tab',10,build)
+    assert build.calls == [10] and np.all(table == Builder()(10))
+    assert not isinstance(table,np.memmap)
+    assert os.listdir(os.path.dirname(_path())) == []
+
+
+def test_threads():
+    """
+    Threads storing the same table at the same time all get it, and leave no temporary files
+    """
+    barrier = threading.Barrier(8)
+    results = []
+    def run():
+        barrier.wait()
+        results.append(tablecache.load('key','tab',1000,Builder()))
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 8
+    for table in results:
+        assert np.all(table == Builder()(1000))
+    assert sorted(os.listdir(os.path.dirname(_path()))) == ['tab.npy','tab.npy.meta']
+
+
+def test_clear():
+    tablecache.load('key','tab',10,Builder())
+    tablecache.clear()
+    assert not os.path.exists(_path())
+
+
+def test_numpy_backend_tables(monkeypatch):
+    monkeypatch.setenv('PYREEDSOLOMON_TABLE_CACHE_VERIFY','1')
+    code = (8,223,255,0x11d,0,1,32)
+    msg = np.arange(200,dtype=np.uint8)
+    cw = pyreedsolomon.Reed_Solomon(*code,backend='numpy').encode(msg)
+    assert os.listdir(tablecache.cache_dir())
+
+    # corrupt every stored table, a new codec rebuilds them
+    for root, _, files in os.walk(tablecache.cache_dir()):
+        for name in files:
+            if name.endswith('.npy'):
+                with open(os.path.join(root,name),'r+b') as f:
+                    f.seek(-2,os.SEEK_END)
+                    f.write(b'\x01\x01')
+    assert np.all(pyreedsolomon.Reed_Solomon(*code,backend='numpy').encode(msg) == cw)
+
+
+@pytest.mark.skipif(lib is None,reason='the native extension is not available')
+def test_native_tables(monkeypatch):
+    # an extension built without it does not cache its tables at all
+    assert hasattr(lib,'SIMD_TABLES_VERSION')
+    simd_version = lib.SIMD_TABLES_VERSION
+    if lib.simd_tables_size(8,32,255) == 0:
+        pytest.skip('the native extension has no vectorized kernels on this machine')
+    code = (8,223,255,0x11d,0,1,32)
+    path = os.path.join(tablecache.cache_dir(),'rs8_11d_0_1_32',f'simd_v{simd_version}_255.npy')
+    rng = np.random.default_rng(0)
+    dat = np.zeros((64,255),dtype=np.uint8)
+    dat[:,:223] = rng.integers(0,256,(64,223))
+    ref = pyreedsolomon.Reed_Solomon(*code,backend='numpy').encode_batch(dat.copy())
+
+    assert np.all(pyreedsolomon.Reed_Solomon(*code,backend='native').encode_batch(dat.copy()) == ref)
+    assert os.path.exists(path)
+    # mapped from the cache
+    assert np.all(pyreedsolomon.Reed_Solomon(*code,backend='native').encode_batch(dat.copy()) == ref)
+
+    # a corrupt table of the right size is not used when it is verified
+    monkeypatch.setenv('PYREEDSOLOMON_TABLE_CACHE_VERIFY','1')
+    with open(path,'r+b') as f:
+        f.seek(-64,os.SEEK_END)
+        f.write(bytes(range(1,65)))
+    rs = pyreedsolomon.Reed_Solomon(*code,backend='native')
+    assert np.all(rs.encode_batch(dat.copy()) == ref)
+    assert np.all(rs.check_batch(ref))
@@ -0,0 +1,124 @@
+# Original Author    : Edwin G. W. Peters @ epeters
+# ------------------------------------------------------------------------------
+# File Name          : test_update_parity.py
+# Description        : Incremental parity updates against a full encode
+# ------------------------------------------------------------------------------
+# Copyright          : License GPL3
+# ------------------------------------------------------------------------------
+
+import numpy as np
+import pytest
+
+import pyreedsolomon
+
+
+# (symsize, message_size, total_size, gfpoly, fcr, prim, nroots)
+CODES = [
+    (4,11,15,0x13,0,1,4),
+    (8,223,255,0x11d,0,1,32),
+    (8,40,60,0x11d,3,7,20),
+    (10,935,973,0x409,0,1,38),
+    (16,200,240,0x1100b,1,1,40),
+]
+
+code_ids = lambda c: f'rs{c[2]}_{c[1]}_{c[0]}'
+
+
+def _encoded(rs,rng,n_rows,n_symbols):
+    dat = np.zeros((n_rows,n_symbols),dtype=rs.dtype)
+    dat[:,:n_symbols-rs.par_size] = rng.integers(0,1 << rs.symsize,(n_rows,n_symbols-rs.par_size))
+    return rs.encode_batch(dat)
+
+
+def _reencoded(rs,dat):
+    ref = dat.copy()
+    ref[...,-rs.par_size:] = 0
+    return rs.encode_batch(ref[None] if ref.ndim == 1 else ref).reshape(dat.shape)
+
+
+@pytest.mark.parametrize('code',CODES,ids=code_ids)
+def test_update_parity(backend,code):
+    rs = pyreedsolomon.Reed_Solomon(*code,backend=backend)
+    rng = np.random.default_rng(code[2])
+    for n_symbols in (rs.total_size,rs.total_size - 3,rs.par_size + 1):
+        msg_len = n_symbols - rs.par_size
+        dat = _encoded(rs,rng,1,n_symbols)[0]
+        for n_changes in sorted({1,min(3,msg_len),msg_len}):
+            positions = rng.choice(msg_len,n_changes,replace=False)
+            new_values = rng.integers(0,1 << rs.symsize,n_changes).astype(rs.dtype)
+            assert rs.update_parity(dat,positions,new_values) is dat
+            assert np.all(dat[positions] == new_values)
+            assert np.all(dat == _reencoded(rs,dat))
+
+
+@pytest.mark.parametrize('code',CODES,ids=code_ids)
+def test_update_parity_batch(backend,code):
+    rs = pyreedsolomon.Reed_Solomon(*code,backend=backend)
+    rng = np.random.default_rng(code[1])
+    n_rows = 20
+    for n_symbols in (rs.total_size,rs.total_size - 3):
+        msg_len = n_symbols - rs.par_size
+        dat = _encoded(rs,rng,n_rows,n_symbols)
+
+        # the same positions in every row
+        positions = rng.choice(msg_len,4,replace=False)
+        new_values = rng.integers(0,1 << rs.symsize,(n_rows,4)).astype(rs.dtype)
+        assert rs.update_parity_batch(dat,positions,new_values) is dat
+        assert np.all(dat[:,positions] == new_values)
+        assert np.all(dat == _reencoded(rs,dat))
+
+        # other positions in every row
+        positions = np.array([rng.choice(msg_len,4,replace=False) for _ in range(n_rows)])
+        new_values = rng.integers(0,1 << rs.symsize,(n_rows,4)).astype(rs.dtype)
+        rs.update_parity_batch(dat,positions,new_values)
+        assert np.all(np.take_along_axis(dat,positions,axis=1) == new_values)
+        assert np.all(dat == _reencoded(rs,dat))
+        assert np.all(rs.check_batch(dat))
+
+
+def test_update_parity_strided(backend):
+    rs = pyreedsolomon.Reed_Solomon(8,223,255,0x11d,0,1,32,backend=backend)
+    rng = np.random.default_rng(0)
+    dat = _encoded(rs,rng,10,255)
+    view = dat[::2]
+    rs.update_parity_batch(view,[0,100,222],rng.integers(0,256,(5,3)).astype(np.uint8))
+    assert np.all(dat == _reencoded(rs,dat))
+
+
+def test_backends_agree():
+    if pyreedsolomon.lib is None:
+        pytest.skip('the native extension is not available')
+    code = CODES[3]
+    rng = np.random.default_rng(1)
+    dat = _encoded(pyreedsolomon.Reed_Solomon(*code,backend='native'),rng,8,code[2])
+    positions = np.array([rng.choice(code[1],5,replace=False) for _ in range(8)])
+    new_values = rng.integers(0,1 << code[0],(8,5)).astype(np.uint16)
+    res = [pyreedsolomon.Reed_Solomon(*code,backend=b).update_parity_batch(dat.copy(),positions,new_values)
+           for b in ('native','numpy')]
+    assert np.all(res[0] == res[1])
+
+
+def test_invalid(backend):
+    rs = pyreedsolomon.Reed_Solomon(8,223,255,0x11d,0,1,32,backend=backend)
+    dat = _encoded(rs,np.random.default_rng(2),4,200)
+    with pytest.raises(ValueError,match='in the message'):
+        rs.update_parity(dat[0],[168],[1])
+    with pytest.raises(ValueError,match='in the message'):
+        rs.update_parity(dat[0],[-1],[1])
+    with pytest.raises(ValueError,match='unique'):
+        rs.update_parity(dat[0],[3,3],[1,2])
+    with pytest.raises(ValueError,match='do not match'):
+        rs.update_parity(dat[0],[3,4],[1])
+    with pytest.raises(ValueError,match='do not match'):
+        rs.update_parity_batch(dat,[3,4],np.zeros((3,2),dtype=np.uint8))
+
+    # codewords that are too long, parity only, of another dtype or not 1-D
+    for bad in (np.zeros(300,dtype=np.uint8),np.zeros(256,dtype=np.uint8),np.zeros(32,dtype=np.uint8),
+                np.zeros(255,dtype=np.uint16),dat,dat[0].tolist()):
+        with pytest.raises(ValueError,match='expected'):
+            rs.update_parity(bad,[3],[5])
+    for bad in (np.zeros((2,300),dtype=np.uint8),np.zeros((2,255),dtype=np.uint16),dat[0]):
+        with pytest.raises(ValueError,match='expected'):
+            rs.update_parity_batch(bad,[3],np.full((2,1),5,dtype=np.uint8))
+    with pytest.raises(ValueError,match='unique'):
+        rs.update_parity_batch(dat,[[1,2],[3,3],[4,5],[6,7]],np.zeros((4,2),dtype=np.uint8))